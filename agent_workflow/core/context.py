@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import contextvars
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Set
+
+from agent_workflow.utils.retry import RetryBudget
+
+
+class RequestCancelledError(Exception):
+    """请求已被取消"""
+
+
+class CancellationToken:
+    """
+    请求取消令牌
+
+    同一请求的所有任务共享一个令牌，调用cancel后各执行点通过raise_if_cancelled及时退出；
+    通过bind登记的asyncio任务会被直接取消，正在等待的工具调用随之收到CancelledError
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self.reason: Optional[str] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def bind(self, task: Optional[asyncio.Task]) -> None:
+        """登记执行请求的任务，取消令牌时一并取消；任务结束后自动移除"""
+        if task is None or task.done():
+            return
+        if self._event.is_set():
+            task.cancel()
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def cancel(self, reason: str = "请求已取消") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+            for task in list(self._tasks):
+                task.cancel()
+
+    async def wait(self) -> None:
+        """等待取消"""
+        await self._event.wait()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RequestCancelledError(self.reason)
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """
+    单次请求的执行上下文（不可变）
+
+    执行器、参数优化器和工具是所有请求共享的，请求相关的信息不再保存在实例属性上，
+    而是随调用链传递，同时通过contextvar提供给工具等无法显式传参的位置
+    """
+    message_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    # 截止时间（time.monotonic()），为None表示不限时
+    deadline: Optional[float] = None
+    cancel_token: CancellationToken = field(default_factory=CancellationToken, compare=False)
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # 调用方能否接收增量输出（delta事件），工具据此决定是否返回StreamingResult
+    stream: bool = False
+    started_at: float = field(default_factory=time.monotonic, compare=False)
+    # 请求内各层共享的重试预算
+    retry_budget: RetryBudget = field(default_factory=RetryBudget, compare=False)
+
+    @classmethod
+    def create(cls, message_id: Optional[str] = None, conversation_id: Optional[str] = None,
+               timeout: Optional[float] = None, stream: bool = False) -> 'RequestContext':
+        """
+        创建请求上下文
+
+        Args:
+            message_id: 消息ID
+            conversation_id: 会话ID
+            timeout: 超时时间（秒），为None表示不限时
+            stream: 是否接收增量输出
+        """
+        return cls(
+            message_id=message_id,
+            conversation_id=conversation_id,
+            deadline=time.monotonic() + timeout if timeout else None,
+            stream=stream
+        )
+
+    @property
+    def remaining(self) -> Optional[float]:
+        """距截止时间的剩余秒数"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token.is_cancelled
+
+    def check(self) -> None:
+        """请求已取消或已超时时抛出异常"""
+        self.cancel_token.raise_if_cancelled()
+        if self.expired:
+            raise asyncio.TimeoutError(f"请求 {self.message_id} 已超时")
+
+
+_current_context: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar(
+    "request_context", default=None
+)
+
+
+def current_context() -> RequestContext:
+    """获取当前请求上下文，不在请求中时返回一个空上下文"""
+    ctx = _current_context.get()
+    return ctx if ctx is not None else RequestContext()
+
+
+@contextmanager
+def use_context(ctx: RequestContext) -> Iterator[RequestContext]:
+    """在当前协程（及其创建的任务、to_thread线程）中设置请求上下文"""
+    token = _current_context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current_context.reset(token)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional, Type
+
+import httpx
+
+from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.metrics import metrics
+
+logger = loadingInfo("health")
+
+
+class BackendUnavailableError(Exception):
+    """工具依赖的后端服务不可用（熔断器打开）"""
+    retryable = False
+
+    def __init__(self, tool_name: str, backends: List[str]):
+        self.tool_name = tool_name
+        self.backends = backends
+        super().__init__(f"工具 {tool_name} 暂不可用：依赖的服务 {', '.join(backends)} 无法连接，请确认服务已启动后重试")
+
+
+class BreakerState(str, Enum):
+    """熔断器状态"""
+    CLOSED = "closed"  # 正常
+    OPEN = "open"  # 熔断，直接拒绝请求
+    HALF_OPEN = "half_open"  # 熔断超时后放行试探请求，成功则恢复
+
+
+class CircuitBreaker:
+    """
+    单个后端服务的熔断器
+
+    连续failure_threshold次连接失败或健康探测失败时打开；
+    有探测地址的后端由探测成功关闭，没有探测地址的在recovery_timeout后放行试探请求
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._state = BreakerState.CLOSED
+
+    @property
+    def state(self) -> BreakerState:
+        if self._state == BreakerState.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._state = BreakerState.HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        return self.state != BreakerState.OPEN
+
+    def record_success(self) -> None:
+        if self._state != BreakerState.CLOSED:
+            logger.info(f"服务 {self.name} 已恢复")
+            metrics.incr(f"health.{self.name}.closed")
+        self._state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def record_failure(self, error: str) -> None:
+        self.failures += 1
+        self.last_error = error
+        if self.state == BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trip(error)
+
+    def trip(self, error: str) -> None:
+        """打开熔断器"""
+        if self._state != BreakerState.OPEN:
+            logger.warning(f"服务 {self.name} 不可用，已熔断: {error}")
+            metrics.incr(f"health.{self.name}.opened")
+        self._state = BreakerState.OPEN
+        self.opened_at = time.monotonic()
+        self.last_error = error
+
+
+class HealthMonitor:
+    """
+    后端服务健康监测
+
+    功能：
+    1. 每个后端服务（ComfyUI、Perplexica、高德API、F5-TTS、GPT-SoVITS等）一个熔断器
+    2. 后台定期探测已注册工具用到的服务，熔断中的服务按较短间隔探测，恢复后立即关闭熔断
+    3. 工具通过backends声明依赖的服务，依赖的服务熔断时工具不放入任务规划，执行时直接失败
+    """
+
+    def __init__(self, tools: Dict[str, Type[BaseTool]], backends: Dict[str, Dict[str, Any]],
+                 interval: float = 30, open_interval: float = 10, probe_timeout: float = 3,
+                 failure_threshold: int = 3, recovery_timeout: float = 30):
+        """
+        Args:
+            tools: 工具名称到工具类的映射
+            backends: {服务名: {"url": 探测地址}}，url为None时只根据请求结果熔断
+            interval: 正常服务的探测间隔（秒）
+            open_interval: 熔断中服务的探测间隔（秒）
+            probe_timeout: 单次探测的超时时间（秒）
+            failure_threshold: 连续失败多少次后熔断
+            recovery_timeout: 没有探测地址的服务熔断多久后放行试探请求（秒）
+        """
+        self.tools = tools
+        self.backends = backends
+        self.interval = interval
+        self.open_interval = open_interval
+        self.probe_timeout = probe_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(name, failure_threshold, recovery_timeout) for name in backends
+        }
+        self._next_probe: Dict[str, float] = {}
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def tool_backends(self, tool_name: str) -> List[str]:
+        """工具依赖的已配置服务（LazyTool的backends取自清单，不导入模块）"""
+        tool_class = self.tools.get(tool_name)
+        if tool_class is None:
+            return []
+        return [backend for backend in (getattr(tool_class, "backends", None) or ()) if backend in self.breakers]
+
+    def unavailable_backends(self, tool_name: str) -> List[str]:
+        return [backend for backend in self.tool_backends(tool_name) if not self.breakers[backend].allow_request()]
+
+    def is_available(self, tool_name: str) -> bool:
+        return not self.unavailable_backends(tool_name)
+
+    def unavailable_tools(self) -> List[str]:
+        """依赖的服务处于熔断状态的工具"""
+        return [name for name in self.tools if not self.is_available(name)]
+
+    def check(self, tool_name: str) -> None:
+        """工具依赖的服务熔断时抛出BackendUnavailableError"""
+        backends = self.unavailable_backends(tool_name)
+        if backends:
+            metrics.incr("health.rejected")
+            raise BackendUnavailableError(tool_name, backends)
+
+    @staticmethod
+    def is_backend_error(error: BaseException) -> bool:
+        """连接失败、超时等说明后端不可用的异常（参数错误等不计入熔断）"""
+        return isinstance(error, (OSError, asyncio.TimeoutError, httpx.TransportError))
+
+    def record_success(self, tool_name: str) -> None:
+        for backend in self.tool_backends(tool_name):
+            breaker = self.breakers[backend]
+            if breaker.state != BreakerState.OPEN:
+                breaker.record_success()
+
+    def record_failure(self, tool_name: str, error: BaseException) -> None:
+        if not self.is_backend_error(error):
+            return
+        for backend in self.tool_backends(tool_name):
+            self.breakers[backend].record_failure(f"{type(error).__name__}: {error}")
+
+    def record_result(self, tool_name: str, result: Any) -> None:
+        """
+        按工具返回值记录服务状态（工具大多捕获异常后返回错误信息，而不是抛出）
+
+        成功结果记为服务正常；工具判定为后端出错的失败结果（is_backend_failure）计入熔断；
+        参数错误、本地查找失败等与服务无关的失败不影响熔断状态
+        """
+        tool_class = self.tools.get(tool_name)
+        if tool_class is None:
+            return
+        if tool_class.is_result_reusable(result):
+            self.record_success(tool_name)
+        elif tool_class.is_backend_failure(result):
+            detail = str(result)[:200]
+            for backend in self.tool_backends(tool_name):
+                self.breakers[backend].record_failure(f"工具返回失败结果: {detail}")
+
+    def _monitored_backends(self) -> List[str]:
+        """已注册工具用到且配置了探测地址的服务"""
+        used = {backend for name in self.tools for backend in self.tool_backends(name)}
+        return [name for name in self.breakers if name in used and self.backends[name].get("url")]
+
+    async def probe(self, backend: str, client: httpx.AsyncClient) -> bool:
+        """探测服务：能建立连接且未返回5xx即视为可用（鉴权失败等说明服务在运行）"""
+        breaker = self.breakers[backend]
+        try:
+            response = await client.get(self.backends[backend]["url"])
+            healthy = response.status_code < 500
+            error = f"HTTP {response.status_code}"
+        except Exception as e:
+            healthy, error = False, f"{type(e).__name__}: {e}"
+
+        if healthy:
+            breaker.record_success()
+        else:
+            breaker.trip(error)
+        return healthy
+
+    async def probe_all(self, names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """探测服务，names为None时探测全部监测中的服务"""
+        names = names if names is not None else self._monitored_backends()
+        if not names:
+            return {}
+        async with httpx.AsyncClient(timeout=self.probe_timeout) as client:
+            results = await asyncio.gather(*(self.probe(name, client) for name in names))
+        now = time.monotonic()
+        for name, healthy in zip(names, results):
+            self._next_probe[name] = now + (self.interval if healthy else self.open_interval)
+        return dict(zip(names, results))
+
+    async def _probe_loop(self, tick: float) -> None:
+        while True:
+            now = time.monotonic()
+            due = [name for name in self._monitored_backends() if self._next_probe.get(name, 0) <= now]
+            if due:
+                try:
+                    await self.probe_all(due)
+                except Exception as e:
+                    logger.error(f"健康探测失败: {str(e)}")
+            await asyncio.sleep(tick)
+
+    def start(self, tick: float = 1.0) -> None:
+        """启动后台探测任务（首轮立即探测）"""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(tick))
+
+    async def stop(self) -> None:
+        """停止后台探测任务"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """各服务的熔断状态"""
+        return {
+            name: {
+                "state": breaker.state.value,
+                "failures": breaker.failures,
+                "last_error": breaker.last_error,
+                "tools": [tool for tool in self.tools if name in self.tool_backends(tool)]
+            } for name, breaker in self.breakers.items()
+        }
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.embedding import EmbeddingClient, cosine_similarity
+from agent_workflow.utils.metrics import metrics
+
+logger = loadingInfo("plan_cache")
+
+# 附件信息行，如 "images: upload/images/xx.png"
+_ATTACHMENT_LINE = re.compile(r'^\s*(images|files|audio|url|rag|text|feishu_attachment)\s*:.*$', re.MULTILINE)
+_TRAILING_PUNCTUATION = re.compile(r'[\s。？！?!~～.,，、；;]+$')
+
+
+@dataclass
+class PlanCacheEntry:
+    """规划缓存条目"""
+    key: str
+    query: str
+    tool_signature: str
+    plan: Dict[str, Any]
+    created_at: float
+    hits: int = 0
+    history_digest: str = ""
+    embedding: Optional[List[float]] = field(default=None, repr=False)
+
+
+class PlanCache:
+    """
+    任务规划缓存
+
+    功能：
+    1. 以规范化的查询文本、最近几轮对话和已注册工具集合作为键，缓存意图解析结果
+       （"再详细一点"这类依赖上文的问题不会命中其它会话的规划）
+    2. 可选的向量相似度匹配（阈值可配置），命中近似问题
+    3. LRU + TTL 淘汰
+    4. 持久化到磁盘，重启后依然有效
+    """
+
+    def __init__(self,
+                 path: str,
+                 max_entries: int = 1000,
+                 ttl: float = 7 * 24 * 3600,
+                 similarity_threshold: Optional[float] = None,
+                 embedding_client: Optional[EmbeddingClient] = None,
+                 history_turns: int = 2):
+        """
+        初始化规划缓存
+
+        Args:
+            path: 缓存文件路径
+            max_entries: 最大缓存条目数
+            ttl: 缓存有效期（秒）
+            similarity_threshold: 语义匹配阈值，为None时只做精确匹配
+            embedding_client: 向量化客户端，开启语义匹配时使用
+            history_turns: 计入缓存键的最近对话轮数，为0时不区分对话历史
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.embedding_client = embedding_client
+        self.history_turns = history_turns
+        if self.similarity_threshold is not None and self.embedding_client is None:
+            self.embedding_client = EmbeddingClient()
+
+        self._entries: "OrderedDict[str, PlanCacheEntry]" = OrderedDict()
+        self._save_lock = asyncio.Lock()
+        self._load()
+
+    @staticmethod
+    def normalize_query(query: Any) -> str:
+        """
+        规范化查询文本
+
+        附件路径替换为附件类型，去除多余空白和结尾标点，
+        使"今天北京天气"和"今天北京天气？"得到相同的键
+        """
+        text = query.text if hasattr(query, 'text') else str(query)
+        text = _ATTACHMENT_LINE.sub(lambda match: f"[{match.group(1)}]", text)
+        text = text.replace("附加信息:", " ")
+        text = re.sub(r'\s+', ' ', text).strip().lower()
+        return _TRAILING_PUNCTUATION.sub('', text)
+
+    @staticmethod
+    def tool_signature(tool_names: Iterable[str]) -> str:
+        """已注册工具集合的签名，工具变化后旧缓存自动失效"""
+        return hashlib.sha1(",".join(sorted(tool_names)).encode('utf-8')).hexdigest()[:16]
+
+    def history_digest(self, history: Any) -> str:
+        """最近history_turns轮对话的摘要，没有对话历史时为空字符串"""
+        if not history or not self.history_turns:
+            return ""
+        recent = history[-self.history_turns:] if isinstance(history, list) else str(history)
+        text = json.dumps(recent, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+    def _make_key(self, normalized_query: str, signature: str, history_digest: str = "") -> str:
+        return hashlib.sha1(f"{signature}|{history_digest}|{normalized_query}".encode('utf-8')).hexdigest()
+
+    def _is_expired(self, entry: PlanCacheEntry) -> bool:
+        return bool(self.ttl) and time.time() - entry.created_at > self.ttl
+
+    async def get(self, query: Any, tool_names: Iterable[str], history: Any = None) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存
+
+        Returns:
+            Optional[Dict[str, Any]]: 命中时返回规划结果的副本，未命中返回None
+        """
+        normalized = self.normalize_query(query)
+        signature = self.tool_signature(tool_names)
+        digest = self.history_digest(history)
+        key = self._make_key(normalized, signature, digest)
+
+        entry = self._entries.get(key)
+        if entry and self._is_expired(entry):
+            del self._entries[key]
+            entry = None
+
+        if entry is None and self.similarity_threshold is not None:
+            entry = await self._semantic_lookup(normalized, signature, digest)
+
+        if entry is None:
+            metrics.incr("plan_cache.miss")
+            return None
+
+        entry.hits += 1
+        self._entries.move_to_end(entry.key)
+        metrics.incr("plan_cache.hit")
+        return copy.deepcopy(entry.plan)
+
+    async def _semantic_lookup(self, normalized: str, signature: str,
+                               history_digest: str = "") -> Optional[PlanCacheEntry]:
+        """基于向量相似度查找近似问题的缓存（只在对话历史相同的条目中查找）"""
+        candidates = [entry for entry in self._entries.values()
+                      if entry.tool_signature == signature and entry.history_digest == history_digest
+                      and entry.embedding and not self._is_expired(entry)]
+        if not candidates:
+            return None
+
+        try:
+            query_vector = await self.embedding_client.embed_query(normalized)
+        except Exception as e:
+            logger.warning(f"规划缓存向量化失败，跳过语义匹配: {str(e)}")
+            return None
+
+        best_entry, best_score = None, -1.0
+        for entry in candidates:
+            score = cosine_similarity(query_vector, entry.embedding)
+            if score > best_score:
+                best_entry, best_score = entry, score
+
+        if best_entry is not None and best_score >= self.similarity_threshold:
+            metrics.incr("plan_cache.semantic_hit")
+            logger.info(f"规划缓存语义命中: '{normalized}' ≈ '{best_entry.query}' ({best_score:.3f})")
+            return best_entry
+        return None
+
+    async def put(self, query: Any, tool_names: Iterable[str], plan: Dict[str, Any], history: Any = None) -> None:
+        """写入缓存，空规划不缓存"""
+        if not plan or not plan.get("tasks"):
+            return
+
+        normalized = self.normalize_query(query)
+        signature = self.tool_signature(tool_names)
+        digest = self.history_digest(history)
+        key = self._make_key(normalized, signature, digest)
+
+        embedding = None
+        if self.similarity_threshold is not None:
+            try:
+                embedding = await self.embedding_client.embed_query(normalized)
+            except Exception as e:
+                logger.warning(f"规划缓存向量化失败: {str(e)}")
+
+        self._entries[key] = PlanCacheEntry(
+            key=key,
+            query=normalized,
+            tool_signature=signature,
+            plan=copy.deepcopy(plan),
+            created_at=time.time(),
+            history_digest=digest,
+            embedding=embedding
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        await self.save()
+
+    async def save(self) -> None:
+        """将缓存写入磁盘（在线程中执行，不阻塞事件循环）"""
+        async with self._save_lock:
+            entries = [asdict(entry) for entry in self._entries.values()]
+            try:
+                await asyncio.to_thread(self._write, entries)
+            except Exception as e:
+                logger.error(f"保存规划缓存失败: {str(e)}")
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def _load(self) -> None:
+        """从磁盘加载缓存，丢弃过期条目"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    entry = PlanCacheEntry(**item)
+                    if not self._is_expired(entry):
+                        self._entries[entry.key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logger.info(f"已加载规划缓存 {len(self._entries)} 条")
+        except Exception as e:
+            logger.error(f"加载规划缓存失败: {str(e)}")
+            self._entries.clear()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent_workflow.tools.tool.base import ToolCacheBackend, ToolCachePolicy
+from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.metrics import metrics
+
+logger = loadingInfo("result_cache")
+
+# 执行器附加的上下文参数，不参与缓存键
+_EXCLUDED_PARAMS = {"history"}
+
+
+@dataclass
+class ResultCacheEntry:
+    """工具结果缓存条目"""
+    key: str
+    result: Any
+    created_at: float
+    hits: int = 0
+
+
+class ToolResultCache:
+    """
+    工具结果缓存
+
+    功能：
+    1. 按工具分区，每个工具使用自身声明的ToolCachePolicy（TTL、条目上限、内存/磁盘）
+    2. 缓存键由规范化的参数生成，文件参数使用文件内容哈希
+    3. 磁盘分区保存为 <cache_dir>/<工具名>.json，首次使用时加载
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        初始化工具结果缓存
+
+        Args:
+            cache_dir: 磁盘分区的保存目录
+        """
+        self.cache_dir = cache_dir
+        self._partitions: Dict[str, "OrderedDict[str, ResultCacheEntry]"] = {}
+        self._save_locks: Dict[str, asyncio.Lock] = {}
+        # 文件路径 -> (修改时间, 大小, 内容哈希)，文件未变化时不重复计算
+        self._file_digests: Dict[str, Tuple[float, int, str]] = {}
+
+    @classmethod
+    def normalize(cls, value: Any) -> Any:
+        """规范化参数值：字符串去除首尾空白，字典按键排序并去掉None值"""
+        if isinstance(value, str):
+            return value.strip()
+        if isinstance(value, dict):
+            return {str(k): cls.normalize(v) for k, v in sorted(value.items(), key=lambda x: str(x[0]))
+                    if v is not None}
+        if isinstance(value, (list, tuple)):
+            return [cls.normalize(v) for v in value]
+        return value
+
+    async def _file_digest(self, value: Any, file_dirs: Tuple[str, ...]) -> Any:
+        """本地文件返回内容哈希，其它值（如URL）原样返回"""
+        if not isinstance(value, str):
+            return value
+        candidates = [value] + [os.path.join(directory, value) for directory in file_dirs]
+        path = next((candidate for candidate in candidates if os.path.isfile(candidate)), None)
+        if path is None:
+            return value
+        stat = os.stat(path)
+        cached = self._file_digests.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        digest = await asyncio.to_thread(self._hash_file, path)
+        self._file_digests[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha1.update(chunk)
+        return f"sha1:{sha1.hexdigest()}"
+
+    async def make_key(self, tool_name: str, policy: ToolCachePolicy, parameters: Dict[str, Any]) -> str:
+        """根据工具参数生成缓存键"""
+        params = {name: value for name, value in parameters.items()
+                  if name not in _EXCLUDED_PARAMS and (policy.key_params is None or name in policy.key_params)}
+        for name in policy.file_params:
+            if name in params:
+                params[name] = await self._file_digest(params[name], policy.file_dirs)
+        payload = json.dumps(self.normalize(params), ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(f"{tool_name}|{payload}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _is_expired(entry: ResultCacheEntry, policy: ToolCachePolicy) -> bool:
+        return bool(policy.ttl) and time.time() - entry.created_at > policy.ttl
+
+    async def _partition(self, tool_name: str, policy: ToolCachePolicy) -> "OrderedDict[str, ResultCacheEntry]":
+        """获取工具的分区，磁盘分区首次使用时从文件加载"""
+        partition = self._partitions.get(tool_name)
+        if partition is None:
+            partition = OrderedDict()
+            if policy.backend == ToolCacheBackend.DISK:
+                for entry in await asyncio.to_thread(self._load, tool_name):
+                    if not self._is_expired(entry, policy):
+                        partition[entry.key] = entry
+            self._partitions[tool_name] = partition
+        return partition
+
+    async def get(self, tool_name: str, policy: ToolCachePolicy, key: str,
+                  reusable: Callable[[Any], bool]) -> Tuple[bool, Any]:
+        """
+        查询缓存
+
+        Args:
+            reusable: 判断缓存结果能否复用（如输出文件已被删除时不能复用）
+
+        Returns:
+            Tuple[bool, Any]: (是否命中, 缓存结果)
+        """
+        partition = await self._partition(tool_name, policy)
+        entry = partition.get(key)
+        if entry is not None and (self._is_expired(entry, policy) or not reusable(entry.result)):
+            del partition[key]
+            entry = None
+
+        if entry is None:
+            metrics.incr("tool_cache.miss")
+            metrics.incr(f"tool_cache.{tool_name}.miss")
+            return False, None
+
+        entry.hits += 1
+        partition.move_to_end(key)
+        metrics.incr("tool_cache.hit")
+        metrics.incr(f"tool_cache.{tool_name}.hit")
+        return True, copy.deepcopy(entry.result)
+
+    async def put(self, tool_name: str, policy: ToolCachePolicy, key: str, result: Any) -> None:
+        """写入缓存，超出条目上限时淘汰最久未使用的条目"""
+        partition = await self._partition(tool_name, policy)
+        partition[key] = ResultCacheEntry(key=key, result=copy.deepcopy(result), created_at=time.time())
+        partition.move_to_end(key)
+        while len(partition) > policy.max_entries:
+            partition.popitem(last=False)
+
+        if policy.backend == ToolCacheBackend.DISK:
+            await self.save(tool_name)
+
+    async def save(self, tool_name: str) -> None:
+        """将磁盘分区写入文件（在线程中执行，不阻塞事件循环）"""
+        lock = self._save_locks.setdefault(tool_name, asyncio.Lock())
+        async with lock:
+            entries = [asdict(entry) for entry in self._partitions.get(tool_name, {}).values()]
+            try:
+                await asyncio.to_thread(self._write, tool_name, entries)
+            except Exception as e:
+                logger.error(f"保存工具结果缓存失败 {tool_name}: {str(e)}")
+
+    def _path(self, tool_name: str) -> str:
+        return os.path.join(self.cache_dir, f"{tool_name}.json")
+
+    def _write(self, tool_name: str, entries: List[Dict[str, Any]]) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(tool_name)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _load(self, tool_name: str) -> List[ResultCacheEntry]:
+        path = self._path(tool_name)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = [ResultCacheEntry(**item) for item in json.load(f)]
+            logger.info(f"已加载工具结果缓存 {tool_name} {len(entries)} 条")
+            return entries
+        except Exception as e:
+            logger.error(f"加载工具结果缓存失败 {tool_name}: {str(e)}")
+            return []
+
+    def clear(self, tool_name: Optional[str] = None) -> None:
+        """清空缓存（内存中的分区）"""
+        if tool_name is None:
+            self._partitions.clear()
+        else:
+            self._partitions.pop(tool_name, None)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import copy
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Type
+
+from agent_workflow.core.tool_descriptions import ToolDescriptionCache
+from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.embedding import EmbeddingClient, cosine_similarity
+from agent_workflow.utils.metrics import metrics
+from config.bot import ROUTER_RULES
+
+logger = loadingInfo("router")
+
+_PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+
+@dataclass
+class RouteResult:
+    """快速路由结果"""
+    tool_name: str
+    parameters: Optional[Dict[str, Any]]
+    confidence: float
+    source: str  # rule / embedding
+    reason: str = ""
+
+    def to_plan(self) -> Dict[str, Any]:
+        """转换为与意图解析结果相同结构的单任务规划"""
+        task = {
+            "id": "task_1",
+            "tool_name": self.tool_name,
+            "reason": self.reason,
+            "order": 1,
+            "depends_on": []
+        }
+        if self.parameters is not None:
+            task["parameters"] = self.parameters
+            # 标记参数来自快速路由，执行时单独统计
+            task["routed"] = True
+        return {
+            "tasks": [task],
+            "execution_mode": "串行",
+            "execution_strategy": {
+                "parallel_groups": [],
+                "reason": f"快速路由（{self.source}）"
+            }
+        }
+
+
+@dataclass
+class _CompiledRule:
+    tool_name: str
+    patterns: List[re.Pattern]
+    parameters: Dict[str, Any] = field(default_factory=dict)
+
+
+class IntentRouter:
+    """
+    意图快速路由
+
+    在任务规划之前执行，不调用LLM：
+    1. 关键词/正则规则（ROUTER_RULES），命中即为高置信度
+    2. 可选的向量分类器：查询与工具描述的相似度超过阈值且明显领先第二名时命中
+
+    命中时直接生成单任务规划，参数模板只依赖查询文本时同时生成确定的参数，
+    模板未给出的必需参数使用工具描述中的default，使参数能直接通过校验而不再调用参数优化器
+    """
+
+    def __init__(self,
+                 tools: Dict[str, Type[BaseTool]],
+                 description_cache: ToolDescriptionCache,
+                 rules: Optional[List[Dict[str, Any]]] = None,
+                 embedding_threshold: Optional[float] = None,
+                 embedding_margin: float = 0.05,
+                 embedding_client: Optional[EmbeddingClient] = None):
+        """
+        Args:
+            tools: 已注册工具
+            description_cache: 工具描述缓存
+            rules: 路由规则，默认使用ROUTER_RULES
+            embedding_threshold: 向量分类器的相似度阈值，为None时不启用
+            embedding_margin: 第一名需领先第二名的相似度差值
+            embedding_client: 向量化客户端
+        """
+        self.tools = tools
+        self.description_cache = description_cache
+        self.embedding_threshold = embedding_threshold
+        self.embedding_margin = embedding_margin
+        self.embedding_client = embedding_client
+        if self.embedding_threshold is not None and self.embedding_client is None:
+            self.embedding_client = EmbeddingClient()
+
+        self.rules = [
+            _CompiledRule(
+                tool_name=rule["tool_name"],
+                patterns=[re.compile(pattern, re.IGNORECASE) for pattern in rule.get("patterns", [])],
+                parameters=rule.get("parameters", {})
+            )
+            for rule in (ROUTER_RULES if rules is None else rules)
+            if rule["tool_name"] in tools
+        ]
+        self._tool_vectors: Dict[str, List[float]] = {}
+
+    @staticmethod
+    def _fill_parameters(template: Dict[str, Any], values: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """用查询文本和正则分组填充参数模板，缺少取值时返回None"""
+        parameters = {}
+        for name, value in template.items():
+            if isinstance(value, str):
+                keys = _PLACEHOLDER.findall(value)
+                if any(not values.get(key) for key in keys):
+                    return None
+                value = _PLACEHOLDER.sub(lambda match: values[match.group(1)].strip(), value)
+            parameters[name] = value
+        return parameters
+
+    def _with_defaults(self, tool_name: str, parameters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """补充模板中缺少、且工具描述给出了default的必需参数"""
+        if parameters is None:
+            return None
+        description = self.description_cache.get(tool_name) or {}
+        for name, info in (description.get("parameters") or {}).items():
+            if (name not in parameters and isinstance(info, dict) and info.get("required") is True
+                    and "default" in info):
+                parameters[name] = copy.deepcopy(info["default"])
+        return parameters
+
+    def _match_rules(self, text: str) -> Optional[RouteResult]:
+        for rule in self.rules:
+            for pattern in rule.patterns:
+                match = pattern.search(text)
+                if not match:
+                    continue
+                values = {"query": text, **{k: v for k, v in match.groupdict().items() if v}}
+                parameters = self._with_defaults(rule.tool_name, self._fill_parameters(rule.parameters, values))
+                if parameters is None:
+                    continue
+                return RouteResult(
+                    tool_name=rule.tool_name,
+                    parameters=parameters,
+                    confidence=1.0,
+                    source="rule",
+                    reason=f"命中快速路由规则: {pattern.pattern}"
+                )
+        return None
+
+    async def _ensure_tool_vectors(self) -> None:
+        """首次使用时为工具描述建立向量索引"""
+        names = [name for name in self.tools if name not in self._tool_vectors]
+        descriptions = [self.description_cache.get(name) for name in names]
+        pairs = [(name, description) for name, description in zip(names, descriptions) if description]
+        if not pairs:
+            return
+        texts = [f"{name}: {description.get('description', '')}" for name, description in pairs]
+        vectors = await self.embedding_client.embed_documents(texts)
+        for (name, _), vector in zip(pairs, vectors):
+            self._tool_vectors[name] = vector
+
+    async def _match_embedding(self, text: str) -> Optional[RouteResult]:
+        await self._ensure_tool_vectors()
+        if not self._tool_vectors:
+            return None
+
+        query_vector = await self.embedding_client.embed_query(text)
+        scores = sorted(
+            ((cosine_similarity(query_vector, vector), name) for name, vector in self._tool_vectors.items()),
+            reverse=True
+        )
+        best_score, best_name = scores[0]
+        second_score = scores[1][0] if len(scores) > 1 else -1.0
+        if best_score < self.embedding_threshold or best_score - second_score < self.embedding_margin:
+            return None
+
+        # 只有参数模板仅依赖查询文本时才能给出确定的参数，否则交给参数优化器
+        template = next((rule.parameters for rule in self.rules if rule.tool_name == best_name), None)
+        parameters = None
+        if template:
+            parameters = self._with_defaults(best_name, self._fill_parameters(template, {"query": text}))
+        return RouteResult(
+            tool_name=best_name,
+            parameters=parameters,
+            confidence=best_score,
+            source="embedding",
+            reason=f"与工具描述相似度 {best_score:.3f}"
+        )
+
+    async def route(self, query: Any) -> Optional[RouteResult]:
+        """
+        尝试快速路由
+
+        带附件的查询不做快速路由，交给任务规划处理
+
+        Returns:
+            Optional[RouteResult]: 命中时返回路由结果，否则返回None
+        """
+        if getattr(query, 'attachments', None):
+            return None
+
+        start_time = time.perf_counter()
+        text = (query.text if hasattr(query, 'text') else str(query)).strip()
+
+        result = self._match_rules(text)
+        if result is None and self.embedding_threshold is not None:
+            try:
+                result = await self._match_embedding(text)
+            except Exception as e:
+                logger.warning(f"向量路由失败，跳过: {str(e)}")
+
+        latency = time.perf_counter() - start_time
+        metrics.observe("router.latency", latency)
+        if result is None:
+            metrics.incr("router.miss")
+            return None
+
+        metrics.incr("router.hit")
+        metrics.incr(f"router.{result.source}_hit")
+        # 节省的时间按意图解析的平均耗时估算
+        metrics.observe("router.latency_saved", max(0.0, metrics.get_mean("planner.intent_latency") - latency))
+        logger.info(f"快速路由命中: {result.tool_name} ({result.source}, {result.confidence:.3f})")
+        return result
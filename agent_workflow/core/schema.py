@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from ollama import ResponseError
+
+from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.tracing import tracer
+
+logger = loadingInfo("schema")
+
+# JSON Schema支持的基本类型，工具描述中的其它写法（如"enum"）单独转换
+_JSON_TYPES = {"string", "number", "integer", "boolean", "array", "object", "null"}
+
+
+def parameter_schema(info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将工具描述中的单个参数说明转换为JSON Schema
+
+    支持type/items/properties/oneOf，以及enum（字符串列表或含name的字典列表）和
+    "type": "enum" + options的写法；无法识别的类型不做约束
+    """
+    if not isinstance(info, dict):
+        return {}
+
+    schema: Dict[str, Any] = {}
+    param_type = info.get("type")
+    if param_type in _JSON_TYPES:
+        schema["type"] = param_type
+
+    values = info.get("enum") or (info.get("options") if param_type == "enum" else None)
+    if isinstance(values, list):
+        values = [value.get("name") if isinstance(value, dict) else value for value in values]
+        values = [value for value in values if value is not None]
+        if values:
+            schema["enum"] = values
+
+    if param_type == "array":
+        schema["items"] = parameter_schema(info.get("items") or {})
+
+    if isinstance(info.get("properties"), dict):
+        schema["properties"] = {name: parameter_schema(sub) for name, sub in info["properties"].items()}
+        # 嵌套对象的required为JSON Schema写法（名称列表）
+        if isinstance(info.get("required"), list):
+            schema["required"] = info["required"]
+
+    alternatives = info.get("oneOf") or info.get("anyOf")
+    if isinstance(alternatives, list):
+        schema["anyOf"] = [parameter_schema(sub) for sub in alternatives]
+
+    return schema
+
+
+def parameters_schema(tool_description: Dict[str, Any]) -> Dict[str, Any]:
+    """工具全部参数的JSON Schema，参数上的"required": True转换为required列表"""
+    parameters = tool_description.get("parameters") or {}
+    return {
+        "type": "object",
+        "properties": {name: parameter_schema(info) for name, info in parameters.items()},
+        "required": [name for name, info in parameters.items()
+                     if isinstance(info, dict) and info.get("required") is True]
+    }
+
+
+def optimizer_schema(tool_name: str, tool_description: Dict[str, Any]) -> Dict[str, Any]:
+    """参数优化输出的JSON Schema：{tool_name: {参数}, "explanation": "..."}"""
+    return {
+        "type": "object",
+        "properties": {
+            tool_name: parameters_schema(tool_description),
+            "explanation": {"type": "string"}
+        },
+        "required": [tool_name, "explanation"]
+    }
+
+
+def plan_schema(tool_names: Iterable[str], fused: bool = False) -> Dict[str, Any]:
+    """
+    任务规划输出的JSON Schema
+
+    Args:
+        tool_names: 提示词中的工具，tool_name只能取这些值
+        fused: 融合规划模式，任务包含parameters（依赖上游结果时为null）
+    """
+    task_properties: Dict[str, Any] = {
+        "id": {"type": "string"},
+        "tool_name": {"type": "string", "enum": list(tool_names)},
+        "reason": {"type": "string"},
+        "order": {"type": "integer"},
+        "depends_on": {"type": "array", "items": {"type": "string"}}
+    }
+    required = ["id", "tool_name", "reason", "order", "depends_on"]
+    if fused:
+        # 各工具的参数不同，这里只约束为对象，具体参数由执行前的校验把关
+        task_properties["parameters"] = {"anyOf": [{"type": "object"}, {"type": "null"}]}
+        required.append("parameters")
+
+    return {
+        "type": "object",
+        "properties": {
+            "tasks": {
+                "type": "array",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": task_properties,
+                    "required": required
+                }
+            },
+            "execution_mode": {"type": "string", "enum": ["串行", "并行"]},
+            "execution_strategy": {
+                "type": "object",
+                "properties": {
+                    "parallel_groups": {
+                        "type": "array",
+                        "items": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "reason": {"type": "string"}
+                },
+                "required": ["parallel_groups", "reason"]
+            }
+        },
+        "required": ["tasks", "execution_mode", "execution_strategy"]
+    }
+
+
+def _format_rejected(error: Exception) -> bool:
+    """
+    判断请求失败是否因为不支持format参数
+
+    服务端拒绝（旧版Ollama返回4xx）或客户端不接受该参数时为True；
+    连接失败、超时、服务端5xx等与结构化输出无关的错误为False，由调用方按原逻辑处理
+    """
+    if isinstance(error, ResponseError):
+        return 400 <= error.status_code < 500
+    return isinstance(error, (TypeError, ValueError)) and "format" in str(error).lower()
+
+
+async def ainvoke_structured(llm: Any, messages: List[Any], schema: Optional[Dict[str, Any]]) -> Any:
+    """
+    请求结构化输出（Ollama的format参数），模型服务不支持时退回普通输出，其它错误直接抛出
+
+    Args:
+        llm: ChatOllama实例
+        messages: 提示消息
+        schema: 输出的JSON Schema，为None时不约束
+    """
+    with tracer.span("llm", model=getattr(llm, "model", None), structured=schema is not None) as span:
+        if schema is None:
+            response = await llm.ainvoke(messages)
+        else:
+            try:
+                response = await llm.ainvoke(messages, format=schema)
+            except Exception as e:
+                if not _format_rejected(e):
+                    raise
+                logger.warning(f"结构化输出请求失败，退回普通输出: {str(e)}")
+                span.set(structured=False)
+                response = await llm.ainvoke(messages)
+
+        usage = getattr(response, "usage_metadata", None) or {}
+        span.set(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+        return response
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import dataclasses
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent_workflow.core.context import RequestContext
+from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.metrics import metrics
+from agent_workflow.utils.retry import RetryBudget
+
+logger = loadingInfo("speculation")
+
+
+@dataclass
+class _Speculation:
+    fingerprint: str
+    task: asyncio.Task
+
+
+class ParameterSpeculator:
+    """
+    参数优化的预执行（每个请求一个实例）
+
+    执行计划确定后，依赖已满足（或无依赖）的任务立即在后台开始参数优化，与正在执行的工具重叠；
+    上游任务完成后继续为新满足依赖的任务启动优化。
+    并行模式下任务只看到声明依赖的结果，串行模式下看到之前所有任务的结果，预执行使用相同的上下文。
+    任务真正执行时，若其实际上下文与预执行时一致则直接使用，否则丢弃重新优化。
+    """
+
+    def __init__(self,
+                 optimizer: Any,
+                 tool_descriptions: Dict[str, Dict],
+                 build_context: Callable[[Dict, Dict], Dict],
+                 query: Any,
+                 intent_result: Dict[str, Any],
+                 ctx: RequestContext,
+                 verbose: bool = False,
+                 max_concurrent: int = 2,
+                 serial: bool = False):
+        """
+        Args:
+            optimizer: 参数优化器
+            tool_descriptions: 工具描述
+            build_context: 构建工具执行上下文的函数（task_info, 依赖结果）-> tool_context
+            query: 用户查询
+            intent_result: 执行计划
+            ctx: 请求上下文（预执行不重试，不占用请求的重试预算）
+            verbose: 是否输出详细信息
+            max_concurrent: 同时进行的预执行数量上限
+            serial: 是否为串行执行，串行时任务的上下文包含之前所有任务的结果
+        """
+        self.optimizer = optimizer
+        self.tool_descriptions = tool_descriptions
+        self.build_context = build_context
+        self.query = query
+        self.intent_result = intent_result
+        # 预执行失败时任务执行前会重新优化（可正常重试），预执行本身不消耗请求共享的重试预算
+        self.ctx = dataclasses.replace(ctx, retry_budget=RetryBudget(max_retries=0))
+        self.verbose = verbose
+        self.serial = serial
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self._speculations: Dict[str, _Speculation] = {}
+        self._started = set()
+
+    @staticmethod
+    def fingerprint(dependency_context: Dict[str, Any]) -> str:
+        """任务执行上下文（上游任务结果）的指纹"""
+        items = sorted(
+            (task_id, str(result.get("formatted_result", "")) if isinstance(result, dict) else str(result))
+            for task_id, result in dependency_context.items()
+        )
+        return hashlib.sha1(json.dumps(items, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def predecessors(self, task_info: Dict) -> List[str]:
+        """任务执行时上下文中包含的上游任务：串行模式为排在其前面的所有任务，并行模式为声明的依赖"""
+        if not self.serial:
+            return list(task_info.get("depends_on", []))
+        # 与串行执行相同的排序（稳定排序，order相同的保持原顺序）
+        ordered = sorted(self.intent_result.get("tasks", []), key=lambda x: x.get("order", 1))
+        predecessors = []
+        for task in ordered:
+            if task["id"] == task_info["id"]:
+                break
+            predecessors.append(task["id"])
+        return predecessors
+
+    def schedule(self, context: Dict) -> None:
+        """为依赖已全部完成且尚未开始的任务启动参数优化"""
+        for task_info in self.intent_result.get("tasks", []):
+            task_id = task_info["id"]
+            if task_id in self._started or task_info["tool_name"] not in self.tool_descriptions:
+                continue
+            predecessors = self.predecessors(task_info)
+            # 融合规划已给出参数的独立任务不需要参数优化
+            if task_info.get("parameters") is not None and not predecessors and not task_info.get("depends_on"):
+                continue
+            if any(dep not in context for dep in predecessors):
+                continue
+
+            dependency_context = {dep: context[dep] for dep in predecessors}
+            self._started.add(task_id)
+            self._speculations[task_id] = _Speculation(
+                fingerprint=self.fingerprint(dependency_context),
+                task=asyncio.create_task(self._optimize(task_info, dependency_context))
+            )
+            metrics.incr("speculation.started")
+
+    async def _optimize(self, task_info: Dict, dependency_context: Dict) -> Tuple[List[Dict], Optional[Dict]]:
+        """执行参数优化，收集过程消息和结果"""
+        tool_name = task_info["tool_name"]
+        messages, result = [], None
+        async with self._semaphore:
+            async for msg in self.optimizer.optimize_parameters(
+                    tool_name=tool_name,
+                    tool_description=self.tool_descriptions[tool_name],
+                    context=self.build_context(task_info, dependency_context),
+                    query=self.query,
+                    intent_result=self.intent_result,
+                    verbose=self.verbose,
+                    ctx=self.ctx
+            ):
+                if msg["type"] == "result":
+                    result = msg["content"]
+                else:
+                    messages.append(msg)
+        return messages, result
+
+    async def take(self, task_info: Dict, context: Dict) -> Optional[Tuple[List[Dict], Dict]]:
+        """
+        获取任务预执行的参数优化结果
+
+        Returns:
+            Optional[Tuple[List[Dict], Dict]]: (过程消息, 优化结果)，没有可用的预执行结果时返回None
+        """
+        speculation = self._speculations.pop(task_info["id"], None)
+        if speculation is None:
+            return None
+
+        # context即任务执行时实际使用的上下文，与预执行时不一致（如上游结果变化）则丢弃
+        if speculation.fingerprint != self.fingerprint(context):
+            speculation.task.cancel()
+            metrics.incr("speculation.discarded")
+            return None
+
+        try:
+            messages, result = await speculation.task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"预执行参数优化失败 {task_info['id']}: {str(e)}")
+            metrics.incr("speculation.failed")
+            return None
+
+        # 预执行不重试，优化器放弃时返回空参数，此时改为正常优化（可重试）
+        if not result or not result.get(task_info["tool_name"]):
+            metrics.incr("speculation.failed")
+            return None
+        metrics.incr("speculation.used")
+        return messages, result
+
+    def cancel_all(self) -> None:
+        """取消尚未使用的预执行"""
+        for speculation in self._speculations.values():
+            speculation.task.cancel()
+        self._speculations.clear()
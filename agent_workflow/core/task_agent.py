@@ -16,18 +16,19 @@ import re
 import shutil
 import subprocess
 import tempfile
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Dict, Any, Optional, AsyncGenerator, TypeVar, Generic
+from typing import Dict, Any, Optional, AsyncGenerator, TypeVar, Generic, Callable
 from typing import List
 
 import aiofiles
 import psutil
 import uvicorn
-from fastapi import HTTPException, FastAPI, File, UploadFile, Form
+from fastapi import HTTPException, FastAPI, File, UploadFile, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
@@ -35,13 +36,19 @@ from faster_whisper import WhisperModel
 from pydantic import BaseModel
 
 from agent_workflow.tools.base import MessageInput
-from config.config import MAX_CONCURRENT
+from config.config import MAX_CONCURRENT, REQUEST_TIMEOUT, CANCELLATION, SYSTEM_MONITOR
 from config.tool_config import LOCAL_PORT_ADDRESS, UI_HOST, UI_PORT
 from .FeiShu import Feishu
+from .context import RequestContext
 from .VChat import VChat
 from .tool_executor import ToolExecutor
 from ..rag.lightrag_mode import DocumentProcessor
 from ..utils import loadingInfo
+from ..utils.executors import ExecutionClass, run_in_executor
+from ..utils.gpu_scheduler import gpu_scheduler
+from ..utils.loop_monitor import EventLoopLagMonitor
+from ..utils.metrics import metrics
+from ..utils.tracing import tracer
 from ..utils.read_files import get_project_root
 import weakref
 
@@ -171,81 +178,59 @@ class SystemLoad:
     num_threads: int
     process_count: int
     timestamp: datetime
+    loop_lag: float = 0.0  # 事件循环延迟（秒）
+    queue_depth: int = 0  # 等待资源的请求数
+    details: Dict[str, Any] = field(default_factory=dict)  # CPU核数/频率、内存和磁盘的详细数值
 
 
 class SystemMonitor:
-    """系统负载监控器"""
+    """
+    系统负载监控器
+
+    后台任务每隔sample_interval秒在线程中采样一次CPU、内存、磁盘（psutil调用不在事件循环中执行），
+    并在事件循环中补充事件循环延迟和排队数。is_system_overloaded只读取最近一次的采样结果
+    """
     def __init__(self,
                  cpu_threshold: float = 80.0,
                  memory_threshold: float = 85.0,
-                 disk_threshold: float = 90.0):
+                 disk_threshold: float = 90.0,
+                 loop_lag_threshold: Optional[float] = None,
+                 queue_depth_threshold: Optional[int] = None,
+                 stale_after: float = 10.0,
+                 log_interval: float = 5.0,
+                 queue_depth: Optional[Callable[[], int]] = None):
         self.cpu_threshold = cpu_threshold
         self.memory_threshold = memory_threshold
         self.disk_threshold = disk_threshold
+        self.loop_lag_threshold = loop_lag_threshold
+        self.queue_depth_threshold = queue_depth_threshold
+        self.stale_after = stale_after
+        self.log_interval = log_interval
+        self._queue_depth = queue_depth
         self._monitoring = False
-        self._current_load = None
-
-    def get_current_load(self) -> SystemLoad:
-        """获取当前系统负载"""
-        try:
-            # CPU 使用率
-            cpu_percent = psutil.cpu_percent(interval=1)
-
-            # 内存使用率
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
-
-            # 磁盘使用率
-            disk = psutil.disk_usage('/')
-            disk_percent = disk.percent
-
-            # 线程和进程数量
-            current_process = psutil.Process()
-            num_threads = current_process.num_threads()
-            process_count = len(psutil.pids())
-
-            self._current_load = SystemLoad(
-                cpu_percent=cpu_percent,
-                memory_percent=memory_percent,
-                disk_usage_percent=disk_percent,
-                num_threads=num_threads,
-                process_count=process_count,
-                timestamp=datetime.now()
-            )
-
-            return self._current_load
-
-        except Exception as e:
-            sys_monitor_logger.error(f"获取系统负载失败: {e}")
-            raise
-
-    def is_system_overloaded(self) -> bool:
-        """检查系统是否过载"""
-        try:
-            load = self.get_current_load()
-            is_overloaded = (load.cpu_percent > self.cpu_threshold or
-                             load.memory_percent > self.memory_threshold or
-                             load.disk_usage_percent > self.disk_threshold)
-
-            if is_overloaded:
-                sys_monitor_logger.warning(f"系统负载过高! CPU: {load.cpu_percent}%, "
-                                           f"内存: {load.memory_percent}%, "
-                                           f"磁盘: {load.disk_usage_percent}%")
-            return is_overloaded
-        except Exception as e:
-            sys_monitor_logger.error(f"检查系统负载失败: {e}")
-            return True
-
-    def get_detailed_status(self) -> Dict[str, Any]:
-        """获取详细的系统状态"""
-        try:
-            memory = psutil.virtual_memory()
-            cpu_freq = psutil.cpu_freq()
-            disk = psutil.disk_usage('/')
-
-            status = {
+        self._current_load: Optional[SystemLoad] = None
+        self._loop_monitor = EventLoopLagMonitor(interval=0.1, max_samples=600)
+        self._last_warning = 0.0
+
+    def _sample(self) -> SystemLoad:
+        """采样CPU、内存、磁盘、线程和进程数（同步，在线程中执行）"""
+        # interval=None不等待，返回距上次调用以来的平均CPU使用率
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        cpu_freq = psutil.cpu_freq()
+        num_threads = psutil.Process().num_threads()
+        process_count = len(psutil.pids())
+
+        return SystemLoad(
+            cpu_percent=cpu_percent,
+            memory_percent=memory.percent,
+            disk_usage_percent=disk.percent,
+            num_threads=num_threads,
+            process_count=process_count,
+            timestamp=datetime.now(),
+            details={
                 'cpu': {
-                    'percent': psutil.cpu_percent(interval=1),
                     'count': psutil.cpu_count(),
                     'freq_current': cpu_freq.current if cpu_freq else None,
                     'freq_max': cpu_freq.max if cpu_freq else None
@@ -261,11 +246,81 @@ class SystemMonitor:
                     'used': disk.used,
                     'free': disk.free,
                     'percent': disk.percent
+                }
+            }
+        )
+
+    async def refresh(self) -> SystemLoad:
+        """重新采样并更新缓存的负载信息"""
+        previous = self._current_load
+        load = await run_in_executor(ExecutionClass.IO, self._sample)
+        # 事件循环延迟取上次采样以来的最大值，避免漏掉两次采样之间的阻塞
+        window = (load.timestamp - previous.timestamp).total_seconds() if previous else self._loop_monitor.interval
+        load.loop_lag = self._loop_monitor.recent_max(window)
+        load.queue_depth = self._queue_depth() if self._queue_depth else 0
+        self._current_load = load
+        return load
+
+    def get_current_load(self) -> Optional[SystemLoad]:
+        """获取最近一次采样的系统负载，采样任务未启动时为None"""
+        return self._current_load
+
+    def _overload_reasons(self, load: SystemLoad) -> List[str]:
+        """超过阈值的指标"""
+        reasons = []
+        if load.cpu_percent > self.cpu_threshold:
+            reasons.append(f"CPU({self.cpu_threshold}%): {load.cpu_percent}%")
+        if load.memory_percent > self.memory_threshold:
+            reasons.append(f"内存({self.memory_threshold}%): {load.memory_percent}%")
+        if load.disk_usage_percent > self.disk_threshold:
+            reasons.append(f"磁盘({self.disk_threshold}%): {load.disk_usage_percent}%")
+        if self.loop_lag_threshold is not None and load.loop_lag > self.loop_lag_threshold:
+            reasons.append(f"事件循环延迟({self.loop_lag_threshold}s): {load.loop_lag:.3f}s")
+        if self.queue_depth_threshold is not None and load.queue_depth > self.queue_depth_threshold:
+            reasons.append(f"排队数({self.queue_depth_threshold}): {load.queue_depth}")
+        return reasons
+
+    def _warn(self, reasons: List[str]) -> None:
+        """输出过载告警，间隔不小于log_interval"""
+        now = time.monotonic()
+        if now - self._last_warning >= self.log_interval:
+            self._last_warning = now
+            sys_monitor_logger.warning(f"系统负载警告 - {' | '.join(reasons)}")
+
+    def is_system_overloaded(self) -> bool:
+        """检查系统是否过载（读取缓存的采样结果，不阻塞）"""
+        load = self._current_load
+        if load is None:
+            return False
+        # 采样任务异常停止时，过期的结果不再作为拒绝请求的依据
+        if (datetime.now() - load.timestamp).total_seconds() > self.stale_after:
+            return False
+
+        reasons = self._overload_reasons(load)
+        if reasons:
+            self._warn(reasons)
+        return bool(reasons)
+
+    def get_detailed_status(self) -> Dict[str, Any]:
+        """获取详细的系统状态（全部取自最近一次采样，不在事件循环中调用psutil），采样任务未启动时数值为None"""
+        try:
+            load = self._current_load
+            details = load.details if load else {}
+
+            status = {
+                'cpu': {
+                    'percent': load.cpu_percent if load else None,
+                    **details.get('cpu', {})
                 },
+                'memory': details.get('memory'),
+                'disk': details.get('disk'),
                 'process': {
-                    'count': len(psutil.pids()),
-                    'threads': psutil.Process().num_threads()
+                    'count': load.process_count if load else None,
+                    'threads': load.num_threads if load else None
                 },
+                'event_loop': self._loop_monitor.snapshot(),
+                'queue_depth': load.queue_depth if load else 0,
+                'sampled_at': load.timestamp.isoformat() if load else None,
                 'timestamp': datetime.now().isoformat()
             }
 
@@ -275,28 +330,25 @@ class SystemMonitor:
             sys_monitor_logger.error(f"获取系统详细状态失败: {e}")
             raise
 
-    async def start_monitoring(self, interval: float = 5.0):
-        """开始持续监控系统负载"""
+    async def start_monitoring(self, interval: float = 1.0):
+        """开始持续采样系统负载，interval为采样间隔（秒）"""
         self._monitoring = True
-        while self._monitoring:
-            try:
-                load = self.get_current_load()
-                status = self.get_detailed_status()
-
-                # 检查是否需要报警
-                if self.is_system_overloaded():
-                    sys_monitor_logger.warning(
-                        f"系统负载警告 - "
-                        f"CPU({self.cpu_threshold}%): {status['cpu']['percent']}% | "
-                        f"内存({self.memory_threshold}%): {status['memory']['percent']}% | "
-                        f"磁盘({self.disk_threshold}%): {status['disk']['percent']}%"
-                    )
+        self._loop_monitor.start()
+        try:
+            while self._monitoring:
+                try:
+                    load = await self.refresh()
 
-                await asyncio.sleep(interval)
+                    # 检查是否需要报警
+                    reasons = self._overload_reasons(load)
+                    if reasons:
+                        self._warn(reasons)
 
-            except Exception as e:
-                sys_monitor_logger.error(f"监控过程中出错: {e}")
+                except Exception as e:
+                    sys_monitor_logger.error(f"监控过程中出错: {e}")
                 await asyncio.sleep(interval)
+        finally:
+            await self._loop_monitor.stop()
 
     def stop_monitoring(self):
         """停止监控"""
@@ -331,25 +383,47 @@ class WeakSetManager(Generic[T]):
 
 class ResourceManager:
     """资源管理器"""
-    def __init__(self, max_concurrent: int = 3):
+    def __init__(self, max_concurrent: int = 3, queue_depth: Optional[Callable[[], int]] = None):
+        """
+        Args:
+            max_concurrent: 同时执行的任务数上限
+            queue_depth: 返回外部任务队列长度的函数，与等待信号量的请求数一起计入排队数
+        """
         self.semaphore = asyncio.Semaphore(max_concurrent)
         self.active_tasks: WeakSetManager[asyncio.Task] = WeakSetManager()
         self._lock = asyncio.Lock()
+        self._waiting = 0
+        self._queue_depth = queue_depth
         self.system_monitor = SystemMonitor(
-            cpu_threshold=80.0,
-            memory_threshold=85.0,
-            disk_threshold=90.0
+            cpu_threshold=SYSTEM_MONITOR["cpu_threshold"],
+            memory_threshold=SYSTEM_MONITOR["memory_threshold"],
+            disk_threshold=SYSTEM_MONITOR["disk_threshold"],
+            loop_lag_threshold=SYSTEM_MONITOR["loop_lag_threshold"],
+            queue_depth_threshold=SYSTEM_MONITOR["queue_depth_threshold"],
+            stale_after=SYSTEM_MONITOR["stale_after"],
+            log_interval=SYSTEM_MONITOR["log_interval"],
+            queue_depth=self.get_queue_depth
         )
-        asyncio.create_task(self.system_monitor.start_monitoring(interval=5.0))
+        self._monitor_task = asyncio.create_task(
+            self.system_monitor.start_monitoring(interval=SYSTEM_MONITOR["sample_interval"])
+        )
+
+    def get_queue_depth(self) -> int:
+        """排队数：等待信号量的请求数加外部任务队列长度"""
+        return self._waiting + (self._queue_depth() if self._queue_depth else 0)
 
     async def acquire(self) -> bool:
         """获取资源"""
-        # 检查系统负载
+        # 检查系统负载（读取后台采样结果）
         if self.system_monitor.is_system_overloaded():
             sys_monitor_logger.warning("系统负载过高，拒绝新任务")
             return False
 
-        await self.semaphore.acquire()
+        self._waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self._waiting -= 1
         async with self._lock:
             current_task = asyncio.current_task()
             if current_task:
@@ -389,17 +463,22 @@ class MasterAgent:
         Args:
             tool_executor:工具执行器
         """
-        self.status = AgentStatus.IDLE
         self._execution_lock = asyncio.Lock()
         self._file_lock = asyncio.Lock()
-        self.message_id = None
         self.verbose = verbose
 
         self.executor = tool_executor
-        self.resource_manager = ResourceManager(max_concurrent=MAX_CONCURRENT)
         self.task_queue = asyncio.Queue()
+        self.resource_manager = ResourceManager(max_concurrent=MAX_CONCURRENT, queue_depth=self.task_queue.qsize)
 
         asyncio.create_task(self._process_task_queue())
+        # 后台初始化工具实例池（加载模型、建立连接等）
+        asyncio.create_task(self.executor.startup())
+
+    @property
+    def status(self) -> AgentStatus:
+        """代理状态，由活动任务数得出；单个请求的状态随各自的事件流返回，不保存在共享实例上"""
+        return AgentStatus.RUNNING if self.resource_manager.get_active_tasks() else AgentStatus.IDLE
 
     async def _process_task_queue(self):
         """处理任务队列的后台任务"""
@@ -458,7 +537,7 @@ class MasterAgent:
         """处理用户消息"""
         try:
             # 检查系统负载
-            if self.resource_manager.get_active_tasks() >= 3:  # 可配置的阈值
+            if self.resource_manager.get_active_tasks() >= MAX_CONCURRENT:
                 return "系统负载较高，请稍后重试"
 
             # 获取资源锁
@@ -466,8 +545,6 @@ class MasterAgent:
                 return "资源暂时不可用，请稍后重试"
 
             try:
-                self.status = AgentStatus.RUNNING
-
                 # 创建和等待任务结果
                 result_future = asyncio.Future()
                 await self.task_queue.put({
@@ -487,17 +564,14 @@ class MasterAgent:
                             last_task = list(result_data.values())[-1]
                             final_result = last_task.get('result', '') + "\n" + link
                             logger.info("最终结果: {}".format(final_result))
-                            self.status = AgentStatus.SUCCESS
                             return final_result
 
-                self.status = AgentStatus.FAILED
                 return "处理失败: 无法获取结果"
 
             finally:
                 await self.resource_manager.release()
 
         except Exception as e:
-            self.status = AgentStatus.FAILED
             error_msg = f"处理失败: {str(e)}"
             logger.error(error_msg)
             return error_msg
@@ -572,7 +646,10 @@ class MasterAgent:
 
         config = uvicorn.Config(app, host=host, port=port)
         server = uvicorn.Server(config)
-        await server.serve()
+        try:
+            await server.serve()
+        finally:
+            await self.executor.shutdown()
 
     async def chat_ui_process(self,
                               url: str,
@@ -582,7 +659,8 @@ class MasterAgent:
                               data_dir: Path,
                               context_length: int,
                               history_mode: str,
-                              chat_ui) -> AsyncGenerator[Dict[str, Any], None]:
+                              chat_ui,
+                              ctx: Optional[RequestContext] = None) -> AsyncGenerator[Dict[str, Any], None]:
         global image_url, audio_url, file_url, file_name, output_file_path
         try:
             # 检查系统负载
@@ -604,8 +682,15 @@ class MasterAgent:
                 return
 
             try:
-                self.status = AgentStatus.RUNNING
-                self.message_id = message_id
+                # 请求上下文随调用链传递，执行器可被多个请求同时使用；chat_ui支持增量输出
+                # 调用方需要取消请求（如客户端断开）时由调用方创建并传入
+                ctx = ctx or RequestContext.create(
+                    message_id=message_id,
+                    conversation_id=conversation_id,
+                    timeout=REQUEST_TIMEOUT,
+                    stream=bool(chat_ui)
+                )
+                root_span = tracer.start_trace(ctx, name="chat_ui_process", conversation_id=conversation_id)
 
                 # 开始处理
                 yield {
@@ -690,7 +775,8 @@ class MasterAgent:
                 async for result in self.executor.execute_tools(
                         query=processed_query.process_input(),
                         history=context_data,
-                        chat_ui=chat_ui
+                        chat_ui=chat_ui,
+                        ctx=ctx
                 ):
                     if isinstance(result, dict):
                         if "error" in result:
@@ -755,18 +841,19 @@ class MasterAgent:
                             final_result, files, images, tool_response, link_text = await process_result()
                             if final_result is not None:
                                 if history_mode == "json":
-                                    await asyncio.create_task(self._save_history(
-                                        data_dir=data_dir,
-                                        conversation_id=conversation_id,
-                                        message_id=message_id,
-                                        final_result=final_result,
-                                        files=files,
-                                        images=images,
-                                        tool_response=tool_response,
-                                        link_text=link_text,
-                                        processed_query=processed_query,
-                                        attachments_info_history=attachments_info_history
-                                    ))
+                                    with tracer.span("save_history", ctx):
+                                        await asyncio.create_task(self._save_history(
+                                            data_dir=data_dir,
+                                            conversation_id=conversation_id,
+                                            message_id=message_id,
+                                            final_result=final_result,
+                                            files=files,
+                                            images=images,
+                                            tool_response=tool_response,
+                                            link_text=link_text,
+                                            processed_query=processed_query,
+                                            attachments_info_history=attachments_info_history
+                                        ))
 
                                 processed_result = {
                                     'type': 'mixed',
@@ -797,7 +884,6 @@ class MasterAgent:
                                     "message_id": message_id
                                 }
 
-                self.status = AgentStatus.SUCCESS
                 yield {
                     "type": "thinking_process",
                     "message_id": message_id,
@@ -806,9 +892,9 @@ class MasterAgent:
 
             finally:
                 await self.resource_manager.release()
+                root_span.end()
 
         except Exception as e:
-            self.status = AgentStatus.FAILED
             error_msg = f"处理失败: {str(e)}"
             logger.error(f"{error_msg}")
             import traceback
@@ -883,18 +969,41 @@ class MasterAgent:
         """
         启动FastAPI服务器，提供HTTP接口和静态文件服务
         """
+        app = self.create_chat_ui_app(url=url, history_mode=history_mode)
+        config = uvicorn.Config(app, host=UI_HOST, port=UI_PORT)
+        server = uvicorn.Server(config)
+        try:
+            await server.serve()
+        finally:
+            await self.executor.shutdown()
+
+    def create_chat_ui_app(self, url=LOCAL_PORT_ADDRESS, history_mode: str = "json",
+                           history_dir: Optional[Path] = None, load_speech_model: bool = True) -> FastAPI:
+        """
+        创建chat_ui使用的FastAPI应用（HTTP接口和静态文件服务）
+
+        Args:
+            url: 返回给前端的文件地址前缀
+            history_mode: 对话历史的保存方式，"json"保存到history_dir下的chat_history.json
+            history_dir: 对话历史目录，默认为项目的data目录（压测时可指向临时目录）
+            load_speech_model: 是否加载语音识别模型
+        """
         app = FastAPI()
+        history_dir = Path(history_dir) if history_dir else history_data_dir
 
-        try:
-            model = WhisperModel(
-                model_size_or_path="large-v3",
-                device="cuda",
-                compute_type="float16"
-            )
-            logger.info("Whisper模型加载成功")
-        except Exception as e:
-            logger.error(f"加载Whisper模型失败: {str(e)}")
-            model = None
+        model = None
+        if load_speech_model:
+            try:
+                model = WhisperModel(
+                    model_size_or_path="large-v3",
+                    device="cuda",
+                    compute_type="float16"
+                )
+                logger.info("Whisper模型加载成功")
+                # 常驻显存，不可驱逐
+                gpu_scheduler.register_resident("faster-whisper-large-v3")
+            except Exception as e:
+                logger.error(f"加载Whisper模型失败: {str(e)}")
 
         def check_ffmpeg():
             try:
@@ -944,7 +1053,7 @@ class MasterAgent:
 
         # 确保输出目录存在
         output_dir.mkdir(exist_ok=True)
-        history_data_dir.mkdir(exist_ok=True)
+        history_dir.mkdir(exist_ok=True, parents=True)
         upload_images_dir.mkdir(exist_ok=True)
         upload_files_dir.mkdir(exist_ok=True)
         upload_dir.mkdir(exist_ok=True)
@@ -975,15 +1084,21 @@ class MasterAgent:
 
                 temp_converted_path = convert_audio(temp_input_path)
 
-                segments, info = model.transcribe(
-                    temp_converted_path,
-                    beam_size=5,
-                    language="zh",
-                    vad_filter=True,
-                    vad_parameters=dict(
-                        min_silence_duration_ms=500
+                def transcribe(path: str):
+                    segments, info = model.transcribe(
+                        path,
+                        beam_size=5,
+                        language="zh",
+                        vad_filter=True,
+                        vad_parameters=dict(
+                            min_silence_duration_ms=500
+                        )
                     )
-                )
+                    # segments是惰性生成器，识别在遍历时进行
+                    return list(segments), info
+
+                async with gpu_scheduler.job("faster-whisper-large-v3"):
+                    segments, info = await run_in_executor(ExecutionClass.GPU, transcribe, temp_converted_path)
 
                 segments_list = []
                 full_text = []
@@ -1203,6 +1318,41 @@ class MasterAgent:
                 print(f"[Error] Delete failed: {str(e)}")
                 raise HTTPException(status_code=500, detail=f"Failed to delete files: {str(e)}")
 
+        @app.get("/api/metrics")
+        async def get_metrics():
+            """导出进程内指标（缓存命中、快速路由命中、各阶段耗时、GPU队列、系统负载等）"""
+            return {
+                "success": True,
+                "metrics": metrics.snapshot(),
+                "gpu": gpu_scheduler.stats(),
+                "backends": self.executor.health.stats() if self.executor.health is not None else {},
+                "system": self.resource_manager.get_system_status()
+            }
+
+        @app.get("/api/debug/trace/{message_id}")
+        async def get_trace(message_id: str):
+            """返回消息对应请求的链路追踪区间树（各阶段耗时、LLM调用的token数量）"""
+            trace = tracer.get_trace(message_id)
+            if trace is None:
+                raise HTTPException(status_code=404, detail=f"Trace not found: {message_id}")
+            return {
+                "success": True,
+                "trace": trace
+            }
+
+        @app.post("/api/tools/refresh")
+        async def refresh_tool_catalogs():
+            """按需刷新工具描述中的动态目录（如新增了模型或LoRA）"""
+            try:
+                results = await self.executor.refresh_tool_catalogs()
+                return {
+                    "success": all(results.values()),
+                    "tools": results
+                }
+            except Exception as e:
+                logger.error(f"刷新工具目录失败: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to refresh tool catalogs: {str(e)}")
+
         @app.get("/api/rag/list")
         async def list_rags():
             try:
@@ -1432,6 +1582,7 @@ class MasterAgent:
         # 聊天消息
         @app.post("/api/chat")
         async def process_message(
+                request: Request,
                 message_id: str = Form(...),
                 query: str = Form(default=""),
                 context_length: int = Form(default=10),
@@ -1493,7 +1644,27 @@ class MasterAgent:
                     rags=processed_rags if processed_rags else None
                 )
 
+                ctx = RequestContext.create(
+                    message_id=message_id,
+                    conversation_id=conversation_id,
+                    timeout=REQUEST_TIMEOUT,
+                    stream=True
+                )
+
+                async def watch_disconnect():
+                    """客户端断开后取消令牌，正在执行的任务树随之收到CancelledError"""
+                    while not ctx.cancelled:
+                        if await request.is_disconnected():
+                            logger.info(f"客户端已断开连接，取消请求: {message_id}")
+                            metrics.incr("request.client_disconnected")
+                            ctx.cancel_token.cancel("客户端已断开连接")
+                            return
+                        await asyncio.sleep(CANCELLATION.get("disconnect_poll_interval", 0.5))
+
                 async def generate():
+                    # 工具执行期间生成器不会产出数据，无法依赖发送失败发现断开，需单独检测
+                    ctx.cancel_token.bind(asyncio.current_task())
+                    watcher = asyncio.create_task(watch_disconnect())
                     try:
                         async for update in self.chat_ui_process(
                                 url=url,
@@ -1501,10 +1672,16 @@ class MasterAgent:
                                 message_id=message_id,
                                 conversation_id=conversation_id,
                                 context_length=context_length,
-                                data_dir=history_data_dir,
+                                data_dir=history_dir,
                                 history_mode=history_mode,
-                                chat_ui=True
+                                chat_ui=True,
+                                ctx=ctx
                         ):
+                            # 增量文本（及重试时的清空通知）直接转发，完整结果仍在result事件中处理
+                            if update.get('type') in ('delta', 'delta_reset'):
+                                yield json.dumps(update) + '\n'
+                                continue
+
                             if isinstance(update.get('content'), str):
                                 content = update['content']
 
@@ -1568,6 +1745,12 @@ class MasterAgent:
 
                             yield json.dumps(update) + '\n'
 
+                    except asyncio.CancelledError:
+                        if not ctx.cancelled:
+                            raise
+                        # 由断开检测发起的取消：资源已在chat_ui_process中释放，客户端不再接收输出，
+                        # 吞掉取消让生成器正常结束（不使用Python 3.11才有的Task.uncancel）
+                        logger.info(f"请求已取消: {message_id}")
                     except Exception as e:
                         error_msg = f"处理消息时出错: {str(e)}"
                         print(f"[Error] {error_msg}")
@@ -1578,6 +1761,8 @@ class MasterAgent:
                             "message_id": message_id,
                             "content": error_msg
                         }) + '\n'
+                    finally:
+                        watcher.cancel()
 
                 return StreamingResponse(
                     generate(),
@@ -1599,7 +1784,7 @@ class MasterAgent:
         async def get_all_conversations():
             if history_mode == "json":
                 try:
-                    history_file = (history_data_dir / 'chat_history.json').resolve()
+                    history_file = (history_dir / 'chat_history.json').resolve()
 
                     if not history_file.exists():
                         return []
@@ -1624,7 +1809,7 @@ class MasterAgent:
             """获取指定会话的历史记录"""
             if history_mode == "json":
                 try:
-                    history_file = (history_data_dir / 'chat_history.json').resolve()
+                    history_file = (history_dir / 'chat_history.json').resolve()
 
                     if not history_file.exists():
                         return {"messages": [], "title": "新对话"}
@@ -1665,7 +1850,7 @@ class MasterAgent:
             """删除指定会话"""
             if history_mode == "json":
                 try:
-                    history_file = (history_data_dir / 'chat_history.json').resolve()
+                    history_file = (history_dir / 'chat_history.json').resolve()
 
                     if not history_file.exists():
                         return {"success": True, "message": "无历史记录"}
@@ -1696,6 +1881,4 @@ class MasterAgent:
             else:
                 pass
 
-        config = uvicorn.Config(app, host=UI_HOST, port=UI_PORT)
-        server = uvicorn.Server(config)
-        await server.serve()
+        return app
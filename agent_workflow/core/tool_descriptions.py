@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import importlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Type
+
+from agent_workflow.core.tool_manifest import LazyTool
+from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.utils import loadingInfo
+
+logger = loadingInfo("tool_descriptions")
+
+
+def load_catalog_provider(path: str) -> type:
+    """按"模块路径:类名"导入目录提供者类"""
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def describe_tool(tool_class: Type[BaseTool]) -> str:
+    """获取工具描述JSON，LazyTool直接使用清单中的描述，不导入模块"""
+    if isinstance(tool_class, LazyTool):
+        return tool_class.description
+    description = tool_class().get_description()
+    if not isinstance(description, str):
+        description = json.dumps(description, ensure_ascii=False)
+    return description
+
+
+class ToolDescriptionCache:
+    """
+    工具描述缓存
+
+    功能：
+    1. 静态描述只在初始化时计算一次
+    2. 声明了catalog_refresh_interval的工具（描述中含模型、LoRA等动态目录），
+       由后台任务按间隔调用refresh_catalog后重新生成描述；
+       未导入的延迟加载工具通过catalog_provider刷新，不导入工具模块
+    3. 支持按需刷新
+
+    规划和参数优化只读取缓存，不会因为请求模型服务而阻塞
+    """
+
+    def __init__(self, tools: Dict[str, Type[BaseTool]]):
+        self.tools = tools
+        self._descriptions: Dict[str, Dict[str, Any]] = {}
+        self._next_refresh: Dict[str, float] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        for name, tool_class in tools.items():
+            try:
+                self._descriptions[name] = json.loads(describe_tool(tool_class))
+            except Exception as e:
+                logger.error(f"加载工具描述失败 {name}: {e}")
+
+    def get(self, tool_name: str) -> Optional[Dict[str, Any]]:
+        """获取单个工具的描述"""
+        return self._descriptions.get(tool_name)
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        """获取全部工具描述"""
+        return self._descriptions
+
+    @staticmethod
+    def _refresh_interval(tool_class: Type[BaseTool]) -> Optional[float]:
+        return getattr(tool_class, "catalog_refresh_interval", None)
+
+    def dynamic_tools(self) -> List[str]:
+        """描述中包含动态目录的工具"""
+        return [name for name, tool_class in self.tools.items() if self._refresh_interval(tool_class)]
+
+    async def refresh(self, names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """
+        按需刷新动态目录并重新生成描述
+
+        Args:
+            names: 需要刷新的工具，为None时刷新全部动态工具
+
+        Returns:
+            Dict[str, bool]: 每个工具是否刷新成功
+        """
+        names = [name for name in (names or self.dynamic_tools()) if name in self.tools]
+        results = await asyncio.gather(*(self._refresh_tool(name) for name in names))
+        return dict(zip(names, results))
+
+    def _refreshable(self, name: str) -> bool:
+        """已导入的工具，或声明了目录提供者的延迟加载工具"""
+        tool_class = self.tools[name]
+        return (not isinstance(tool_class, LazyTool) or tool_class.is_loaded
+                or bool(tool_class.catalog_provider))
+
+    async def _catalog_source(self, name: str) -> Any:
+        """刷新目录使用的对象：未导入的延迟加载工具使用目录提供者，否则使用工具实例"""
+        tool_class = self.tools[name]
+        if isinstance(tool_class, LazyTool) and not tool_class.is_loaded and tool_class.catalog_provider:
+            # 提供者模块也可能较慢（如导入pandas），在线程中导入
+            provider = await asyncio.to_thread(load_catalog_provider, tool_class.catalog_provider)
+            return provider()
+        return tool_class()
+
+    async def _refresh_tool(self, name: str) -> bool:
+        """刷新失败时保留旧描述"""
+        try:
+            tool = await self._catalog_source(name)
+            await tool.refresh_catalog()
+            description = tool.get_description()
+            if isinstance(description, str):
+                description = json.loads(description)
+            self._descriptions[name] = description
+            return True
+        except Exception as e:
+            logger.warning(f"刷新工具描述失败 {name}: {str(e)}")
+            return False
+        finally:
+            interval = self._refresh_interval(self.tools[name])
+            if interval:
+                self._next_refresh[name] = time.monotonic() + interval
+
+    async def _refresh_loop(self, tick: float) -> None:
+        """后台刷新循环，未被使用过的延迟加载工具只通过目录提供者刷新，不会因刷新而导入"""
+        while True:
+            now = time.monotonic()
+            due = [name for name in self.dynamic_tools()
+                   if self._next_refresh.get(name, 0) <= now and self._refreshable(name)]
+            if due:
+                await self.refresh(due)
+            await asyncio.sleep(tick)
+
+    def start(self, tick: float = 1.0) -> None:
+        """启动后台刷新任务"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop(tick))
+
+    async def stop(self) -> None:
+        """停止后台刷新任务"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
@@ -9,10 +9,11 @@ Copyright (c) 2024 [PanXingFeng]
 All rights reserved.
 """
 import asyncio
+import dataclasses
 import time
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, AsyncGenerator, Dict, Type, Optional
+from typing import Any, AsyncGenerator, Dict, List, Type, Optional
 import json
 import logging
 from langchain.prompts import ChatPromptTemplate
@@ -21,13 +22,34 @@ import os
 import importlib
 import inspect
 
-from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.tools.tool.base import BaseTool, StreamingResult
 from agent_workflow.tools.result_formatter import ResultFormatter
 from agent_workflow.tools.base import UserQuery
 from agent_workflow.tools.base import FeishuUserQuery
+from agent_workflow.core.context import RequestCancelledError, RequestContext, current_context, use_context
+from agent_workflow.core.health import BackendUnavailableError, HealthMonitor
+from agent_workflow.core.plan_cache import PlanCache
+from agent_workflow.core.result_cache import ToolResultCache
+from agent_workflow.core.router import IntentRouter
+from agent_workflow.core.schema import ainvoke_structured, optimizer_schema, plan_schema
+from agent_workflow.core.speculation import ParameterSpeculator
+from agent_workflow.core.tool_descriptions import ToolDescriptionCache, describe_tool
+from agent_workflow.core.tool_manifest import LazyTool, ToolManifest
+from agent_workflow.core.tool_pool import ToolPool
+from agent_workflow.core.tool_retriever import ToolRetriever
+from agent_workflow.llm import close_async_llm_instances
 from agent_workflow.utils import loadingInfo
-from config.bot import TOOL_INTENT_PARSER, PARAMETER_OPTIMIZER, TOOL_RULES
-from config.config import OLLAMA_DATA
+from agent_workflow.utils.executors import executors
+from agent_workflow.utils.gpu_scheduler import gpu_scheduler
+from agent_workflow.utils.metrics import metrics
+from agent_workflow.utils.retry import RetryPolicy, plan_retry
+from agent_workflow.utils.token_budget import fit_history, fit_tool_results
+from agent_workflow.utils.tracing import tracer, JsonlExporter, OtlpHttpExporter
+from config.bot import TOOL_INTENT_PARSER, FUSED_TOOL_PLANNER, PARAMETER_OPTIMIZER, TOOL_RULES
+from config.config import OLLAMA_DATA, TOOL_PARALLEL_LIMIT, PLAN_CACHE, TOOL_WARMUP_ON_STARTUP, TOOL_MANIFEST, \
+    TOOL_PRELOAD, FUSED_PLANNING, ROUTER, TOOL_RETRIEVAL, SPECULATIVE_PARAMETERS, STRUCTURED_OUTPUT, TRACING, \
+    CANCELLATION, TOKEN_BUDGETS, TOOL_RESULT_CACHE, EXECUTORS, GPU_SCHEDULER
+from config.tool_config import HEALTH_CHECKS
 
 ollama_model = OLLAMA_DATA['inference_model']
 
@@ -58,15 +80,20 @@ class ToolRegistry:
         return os.getcwd()
 
     @staticmethod
-    def scan_tools(relative_tool_dir: str = "agent_workflow/tools/tool") -> Dict[str, Type[BaseTool]]:
+    def scan_tools(relative_tool_dir: str = "agent_workflow/tools/tool",
+                   use_manifest: bool = TOOL_MANIFEST["enabled"]) -> Dict[str, Type[BaseTool]]:
         """
         扫描指定目录下的所有工具类
 
+        启用工具清单时，未修改的工具文件直接从清单注册为LazyTool，不导入模块，
+        工具模块在任务真正选中该工具时才导入
+
         Args:
             relative_tool_dir: 相对于项目根目录的工具目录路径
+            use_manifest: 是否使用工具清单
 
         Returns:
-            Dict[str, Type[BaseTool]]: 工具名称到工具类的映射
+            Dict[str, Type[BaseTool]]: 工具名称到工具类（或LazyTool）的映射
         """
         tools = {}
 
@@ -83,6 +110,13 @@ class ToolRegistry:
             logger.warning(f"⚠️ 工具目录不存在: {tool_dir}")
             return tools
 
+        manifest = None
+        if use_manifest:
+            manifest = ToolManifest(os.path.join(project_root, TOOL_MANIFEST["path"]), relative_tool_dir)
+        manifest_files = dict(manifest.files) if manifest else {}
+        config_fingerprint = ToolManifest.config_fingerprint(project_root) if manifest else ""
+        scanned_files = []
+
         # 遍历目录下的所有 .py 文件
         for root, _, files in os.walk(tool_dir):
             for file in files:
@@ -91,9 +125,23 @@ class ToolRegistry:
                     rel_path = os.path.relpath(root, project_root)
                     module_path = os.path.join(rel_path, file[:-3]).replace(os.path.sep, '.')
 
+                    file_path = os.path.join(root, file)
+                    rel_file = os.path.relpath(file_path, project_root).replace(os.path.sep, '/')
+                    fingerprint = ToolManifest.file_fingerprint(file_path, config_fingerprint)
+                    scanned_files.append(rel_file)
+
+                    # 文件未修改，直接使用清单
+                    entries = manifest.get_entries(rel_file, fingerprint) if manifest else None
+                    if entries is not None:
+                        for entry in entries:
+                            tools[entry["name"]] = LazyTool(**entry)
+                            logger.info(f"✅ 已注册工具: {entry['name']} from {module_path} (清单)")
+                        continue
+
                     try:
                         # 导入模块
                         module = importlib.import_module(module_path)
+                        entries, complete = [], True
 
                         # 查找模块中的工具类
                         for name, obj in inspect.getmembers(module):
@@ -106,11 +154,32 @@ class ToolRegistry:
                                 # 使用 SUCCESS 级别记录成功注册的工具
                                 logger.info(f"✅ 已注册工具: {tool_name} from {module_path}")
 
+                                if manifest:
+                                    try:
+                                        entries.append(ToolManifest.build_entry(tool_name, obj))
+                                    except Exception as e:
+                                        # 描述获取失败的文件不写入清单，下次启动重新扫描
+                                        complete = False
+                                        logger.warning(f"⚠️ 工具 {tool_name} 未写入清单: {str(e)}")
+
+                        if manifest and complete:
+                            manifest.set_entries(rel_file, fingerprint, entries)
+
                     except Exception as e:
                         logger.error(f"❌ 加载模块 {module_path} 失败: {str(e)}")
 
+        if manifest:
+            manifest.retain(scanned_files)
+            if manifest.files != manifest_files:
+                manifest.save()
+
         return tools
 
+    @staticmethod
+    def get_tool_description(tool_class: Type[BaseTool]) -> str:
+        """获取工具描述，LazyTool直接使用清单中的描述，不导入模块"""
+        return describe_tool(tool_class)
+
     @staticmethod
     def register_tool(tools: Dict[str, Type[BaseTool]],
                       tool_class: Type[BaseTool],
@@ -131,56 +200,110 @@ class ToolRegistry:
 class ToolIntentParser:
     """根据用户输入识别工具意图和执行顺序"""
 
-    def __init__(self, tools: Dict[str, Type['BaseTool']]):
+    def __init__(self, tools: Dict[str, Type['BaseTool']], description_cache: Optional[ToolDescriptionCache] = None,
+                 health_monitor: Optional[HealthMonitor] = None):
         self.tools = tools
         self.llm = ChatOllama(model=ollama_model)
         self.logger = logging.getLogger(__name__)
-        self.message_id = None
 
-        # 创建工具描述列表
-        self.tool_descriptions = {}
-        for tool_name, tool_class in tools.items():
-            tool_instance = tool_class()
-            tool_info = json.loads(tool_instance.get_description())
-            self.tool_descriptions[tool_info["name"]] = tool_info["description"]
+        # 后端服务健康状态，依赖的服务熔断的工具不放入规划
+        self.health_monitor = health_monitor
+
+        # 工具描述缓存（与执行器共享，动态目录由后台刷新）
+        self.description_cache = description_cache or ToolDescriptionCache(tools)
 
         # 简化后的意图识别模板，专注于执行顺序
         self.intent_template = ChatPromptTemplate.from_messages([
             ("system", TOOL_INTENT_PARSER)
         ])
+        # 融合规划模板，同时生成每个任务的参数
+        self.fused_template = ChatPromptTemplate.from_messages([
+            ("system", FUSED_TOOL_PLANNER)
+        ])
 
-    def format_tool_list(self) -> str:
-        """格式化工具列表信息，只包含名称和描述"""
+    @property
+    def tool_descriptions(self) -> Dict[str, str]:
+        """工具名称到功能描述的映射"""
+        return {info["name"]: info["description"] for info in self.description_cache.all().values()}
+
+    def format_tool_list(self, tool_names: Optional[list] = None) -> str:
+        """格式化工具列表信息，只包含名称和描述，tool_names为None时包含全部工具"""
         tool_list = []
         for tool_name, description in self.tool_descriptions.items():
+            if tool_names is not None and tool_name not in tool_names:
+                continue
             tool_list.append(f"工具名称: {tool_name}")
             tool_list.append(f"描述: {description}")
             tool_list.append("")
         return "\n".join(tool_list)
 
-    def parse_intent(self, query: UserQuery | FeishuUserQuery, history, verbose: bool) -> Dict[str, Any]:
-        """解析用户意图，返回工具执行顺序"""
-        max_retries = 3
+    def format_detailed_tool_list(self, tool_names: Optional[list] = None) -> str:
+        """格式化工具列表信息，包含参数要求和参数规则，供融合规划使用"""
+        tool_list = []
+        for description in self.description_cache.all().values():
+            tool_name = description["name"]
+            if tool_names is not None and tool_name not in tool_names:
+                continue
+            tool_list.append(f"工具名称: {tool_name}")
+            tool_list.append(ParameterOptimizer._format_tool_description(description))
+            if tool_name in TOOL_RULES:
+                tool_list.append(f"【参数规则】{TOOL_RULES[tool_name]}")
+            tool_list.append("")
+        return "\n".join(tool_list)
+
+    async def parse_intent(self, query: UserQuery | FeishuUserQuery, history, verbose: bool,
+                           fused: bool = False, tool_names: Optional[list] = None,
+                           ctx: Optional[RequestContext] = None) -> Dict[str, Any]:
+        """
+        解析用户意图，返回工具执行顺序（异步调用LLM，不阻塞事件循环）
+
+        Args:
+            fused: 融合规划模式，同一次调用中为每个任务生成parameters
+            tool_names: 放入提示词的工具（工具检索结果），为None时使用全部工具
+            ctx: 请求上下文，重试占用其重试预算
+        """
+        ctx = ctx or current_context()
+        policy = RetryPolicy.named("intent")
+        max_retries = policy.max_attempts
         current_retry = 0
 
+        # 排除依赖的服务处于熔断状态的工具
+        unavailable = set(self.health_monitor.unavailable_tools()) if self.health_monitor is not None else set()
+        if unavailable:
+            tool_names = [name for name in (tool_names if tool_names is not None else self.description_cache.all())
+                          if name not in unavailable]
+            if verbose:
+                logger.info(f"以下工具依赖的服务不可用，不参与规划: {sorted(unavailable)}")
+
         while current_retry < max_retries:
             try:
+                metrics.incr("planner.intent_attempts")
                 start_time = time.time()
-                messages = self.intent_template.format_messages(
-                    tool_list=self.format_tool_list(),
+                template = self.fused_template if fused else self.intent_template
+                messages = template.format_messages(
+                    tool_list=(self.format_detailed_tool_list(tool_names) if fused
+                               else self.format_tool_list(tool_names)),
                     history=history,
                     query=query
                 )
 
-                response = self.llm.invoke(messages)
+                schema = None
+                if STRUCTURED_OUTPUT.get("enabled"):
+                    schema = plan_schema(
+                        [name for name in self.description_cache.all() if tool_names is None or name in tool_names],
+                        fused=fused
+                    )
+                response = await ainvoke_structured(self.llm, messages, schema)
                 content = response.content.strip()
 
                 if verbose:
                     result_logger.info(f"意图推理用时: {time.time() - start_time:.3f} 秒")
 
-                # 清理响应内容
-                content = self._clean_response(content)
-                result = json.loads(content)
+                # 清理响应内容（先按原文解析，避免误删参数值中的"#"、"//"）
+                try:
+                    result = json.loads(self._strip_code_block(content))
+                except json.JSONDecodeError:
+                    result = json.loads(self._clean_response(content))
 
                 # 验证和规范化任务
                 valid_tasks = []
@@ -189,16 +312,29 @@ class ToolIntentParser:
                         continue
 
                     tool_name = task.get("tool_name")
-                    if tool_name not in self.tools:
+                    if tool_name not in self.tools or tool_name in unavailable:
                         continue
 
-                    valid_tasks.append({
+                    depends_on = task.get("depends_on") or []
+                    if isinstance(depends_on, str):
+                        depends_on = [depends_on]
+
+                    valid_task = {
                         "id": task.get("id", f"task_{len(valid_tasks) + 1}"),
                         "tool_name": tool_name,
                         "reason": task.get("reason", ""),
                         "order": task.get("order", len(valid_tasks) + 1),
-                        "depends_on": task.get("depends_on", [])
-                    })
+                        "depends_on": [str(dep) for dep in depends_on]
+                    }
+                    if fused and isinstance(task.get("parameters"), dict):
+                        valid_task["parameters"] = task["parameters"]
+                    valid_tasks.append(valid_task)
+
+                # 移除指向不存在任务或自身的依赖
+                task_ids = {task["id"] for task in valid_tasks}
+                for task in valid_tasks:
+                    task["depends_on"] = [dep for dep in task["depends_on"]
+                                          if dep in task_ids and dep != task["id"]]
 
                 execution_info = {
                     "tasks": valid_tasks,
@@ -219,22 +355,31 @@ class ToolIntentParser:
                 current_retry += 1
                 self.logger.error(f"意图解析失败 (尝试 {current_retry}/{max_retries}): {str(e)}")
 
-                # 如果达到最大重试次数，返回空任务列表
-                if current_retry >= max_retries:
-                    self.logger.warning(f"达到最大重试次数 ({max_retries})，返回空任务列表")
+                # 达到最大重试次数、错误不可重试或重试预算用完时，返回空任务列表
+                delay = plan_retry(policy, current_retry, e, ctx.retry_budget, ctx.remaining, "planner.intent")
+                if delay is None:
+                    metrics.incr("planner.intent_failed")
+                    self.logger.warning(f"意图解析放弃重试 (已尝试 {current_retry} 次)，返回空任务列表")
                     return {"tasks": []}
 
-                # 重试前等待一段时间，时间随重试次数增加
-                time.sleep(1 * current_retry)
+                # 重试前按指数退避（带抖动）等待
+                metrics.incr("planner.intent_retries")
+                await asyncio.sleep(delay)
 
         return {"tasks": []}
 
-    def _clean_response(self, content: str) -> str:
-        """清理LLM响应内容"""
+    @staticmethod
+    def _strip_code_block(content: str) -> str:
+        """移除代码块标记"""
         if content.startswith('```json'):
             content = content[7:]
         if content.endswith('```'):
             content = content[:-3]
+        return content.strip()
+
+    def _clean_response(self, content: str) -> str:
+        """清理LLM响应内容"""
+        content = self._strip_code_block(content)
 
         # 移除注释
         lines = []
@@ -262,19 +407,25 @@ class ParameterOptimizer:
     def __init__(self, llm: Optional[ChatOllama] = None):
         self.llm = llm or ChatOllama(model=ollama_model)
         self.logger = logger
-        self.message_id = None
 
         self.parameter_template = ChatPromptTemplate.from_messages([
             ("system", PARAMETER_OPTIMIZER)
         ])
 
     async def optimize_parameters(self, tool_name: str, tool_description: Dict, context: Dict,
-                                  query: UserQuery | FeishuUserQuery, intent_result, verbose: bool = False):
-        max_retries = 3
+                                  query: UserQuery | FeishuUserQuery, intent_result, verbose: bool = False,
+                                  ctx: Optional[RequestContext] = None):
+        ctx = ctx or current_context()
+        policy = RetryPolicy.named("optimizer")
+        max_retries = policy.max_attempts
         current_retry = 0
+        gave_up = False
 
         while current_retry < max_retries:
+            # 每次尝试一个区间，跨yield只能显式结束
+            attempt_span = tracer.start_span("optimize_parameters", ctx, tool=tool_name, attempt=current_retry + 1)
             try:
+                metrics.incr("optimizer.attempts")
                 start_time = time.time()
 
                 await asyncio.sleep(0.1)
@@ -331,7 +482,9 @@ class ParameterOptimizer:
                     self.logger.error(f"尝试 {current_retry + 1}/{max_retries} - JSON序列化失败: {json_error}")
                     raise
 
-                response = self.llm.invoke(messages)
+                schema = optimizer_schema(tool_name, tool_description) if STRUCTURED_OUTPUT.get("enabled") else None
+                with tracer.activate(attempt_span):
+                    response = await ainvoke_structured(self.llm, messages, schema)
 
                 try:
                     result = json.loads(response.content)
@@ -345,7 +498,7 @@ class ParameterOptimizer:
                         self.logger.info(f"参数优化说明: {result['explanation']}")
                         yield {
                             "type": "thinking_process",
-                            "message_id": self.message_id,
+                            "message_id": ctx.message_id,
                             "content": f"[Debug] 参数优化说明: {result['explanation']}"
                         }
                         await asyncio.sleep(0.1)
@@ -354,6 +507,7 @@ class ParameterOptimizer:
                 if tool_name in result:
                     parameters = result[tool_name]
                     if self._validate_parameters(parameters, tool_description):
+                        attempt_span.end()
                         yield {
                             "type": "result",
                             "content": result
@@ -363,20 +517,24 @@ class ParameterOptimizer:
                 raise ValueError("参数验证失败")
 
             except Exception as e:
+                attempt_span.end(error=e)
                 current_retry += 1
                 self.logger.error(f"参数优化失败 (尝试 {current_retry}/{max_retries}): {str(e)}")
                 yield {
                     "type": "thinking_process",
-                    "message_id": self.message_id,
+                    "message_id": ctx.message_id,
                     "content": f"参数优化失败，正在重试... ({current_retry}/{max_retries})"
                 }
                 await asyncio.sleep(0.1)
 
-                if current_retry >= max_retries:
+                delay = plan_retry(policy, current_retry, e, ctx.retry_budget, ctx.remaining, "optimizer")
+                if delay is None:
+                    gave_up = True
+                    metrics.incr("optimizer.failed")
                     yield {
                         "type": "thinking_process",
-                        "message_id": self.message_id,
-                        "content": "达到最大重试次数，返回空参数..."
+                        "message_id": ctx.message_id,
+                        "content": "不再重试，返回空参数..."
                     }
                     await asyncio.sleep(0.1)
                     yield {
@@ -384,18 +542,21 @@ class ParameterOptimizer:
                         "content": {tool_name: {}}
                     }
                     return
-                await asyncio.sleep(1)
+                metrics.incr("optimizer.retries")
+                await asyncio.sleep(delay)
 
             finally:
-                if current_retry >= max_retries:
-                    self.logger.warning(f"达到最大重试次数 ({max_retries})，放弃重试")
+                attempt_span.end()
+                if gave_up:
+                    self.logger.warning(f"参数优化放弃重试 (已尝试 {current_retry} 次)")
 
         yield {
             "type": "result",
             "content": {tool_name: {}}
         }
 
-    def _format_tool_description(self, description: Dict) -> str:
+    @staticmethod
+    def _format_tool_description(description: Dict) -> str:
         """格式化工具描述，提供清晰的参数约束信息"""
         sections = []
 
@@ -504,78 +665,241 @@ class ToolExecutor:
     tools: Dict[str, Type['BaseTool']]
     llm: Optional[ChatOllama] = None
     verbose: bool = False
-    message_id: str = None
+    # 融合规划模式：一次LLM调用同时完成任务规划和参数配置
+    fused_planning: bool = FUSED_PLANNING
 
     def __post_init__(self):
         """初始化组件"""
         self.llm = self.llm or ChatOllama(model=ollama_model)
-        self.intent_parser = ToolIntentParser(self.tools)
+        self.description_cache = ToolDescriptionCache(self.tools)
+
+        # 后端服务健康监测与熔断
+        self.health = None
+        if HEALTH_CHECKS.get("enabled"):
+            self.health = HealthMonitor(
+                tools=self.tools,
+                backends=HEALTH_CHECKS.get("backends", {}),
+                interval=HEALTH_CHECKS.get("interval", 30),
+                open_interval=HEALTH_CHECKS.get("open_interval", 10),
+                probe_timeout=HEALTH_CHECKS.get("probe_timeout", 3),
+                failure_threshold=HEALTH_CHECKS.get("failure_threshold", 3),
+                recovery_timeout=HEALTH_CHECKS.get("recovery_timeout", 30)
+            )
+
+        self.intent_parser = ToolIntentParser(self.tools, self.description_cache, self.health)
         self.parameter_optimizer = ParameterOptimizer(self.llm)
         self.result_formatter = ResultFormatter()
         self.logger = logging.getLogger(__name__)
 
-        # 获取工具描述
-        self.tool_descriptions = {}
-        for name, tool_class in self.tools.items():
-            try:
-                tool_instance = tool_class()
-                description = tool_instance.get_description()
-                if isinstance(description, str):
-                    description = json.loads(description)
-                self.tool_descriptions[name] = description
-            except Exception as e:
-                logger.error(f"加载工具描述失败 {name}: {e}")
+        # 工具实例池
+        self.tool_pool = ToolPool(self.tools)
+        executors.configure(
+            io_workers=EXECUTORS.get("io_workers"),
+            cpu_workers=EXECUTORS.get("cpu_workers"),
+            gpu_workers=EXECUTORS.get("gpu_workers", 1)
+        )
+        if GPU_SCHEDULER.get("enabled") and not gpu_scheduler.enabled:
+            gpu_scheduler.configure(**GPU_SCHEDULER)
+
+        # 工具检索，只把相关工具放入规划提示词
+        self.tool_retriever = None
+        if TOOL_RETRIEVAL.get("enabled"):
+            self.tool_retriever = ToolRetriever(
+                description_cache=self.description_cache,
+                top_k=TOOL_RETRIEVAL.get("top_k", 5),
+                always_include=TOOL_RETRIEVAL.get("always_include", ["ChatTool"]),
+                min_tools=TOOL_RETRIEVAL.get("min_tools", 0)
+            )
+
+        # 意图快速路由
+        self.router = None
+        if ROUTER.get("enabled"):
+            self.router = IntentRouter(
+                tools=self.tools,
+                description_cache=self.description_cache,
+                embedding_threshold=ROUTER.get("embedding_threshold"),
+                embedding_margin=ROUTER.get("embedding_margin", 0.05)
+            )
+
+        # 链路追踪
+        if TRACING.get("enabled") and not tracer.enabled:
+            exporters = []
+            if TRACING.get("jsonl_path"):
+                exporters.append(JsonlExporter(os.path.join(ToolRegistry.get_project_root(), TRACING["jsonl_path"]),
+                                               max_bytes=TRACING.get("jsonl_max_bytes", 50 * 1024 * 1024),
+                                               backup_count=TRACING.get("jsonl_backup_count", 3)))
+            if TRACING.get("otlp_endpoint"):
+                exporters.append(OtlpHttpExporter(TRACING["otlp_endpoint"], TRACING.get("service_name", "agent_workflow")))
+            tracer.configure(exporters=exporters, max_traces=TRACING.get("max_traces", 200))
+
+        # 任务规划缓存
+        self.plan_cache = None
+        if PLAN_CACHE.get("enabled"):
+            self.plan_cache = PlanCache(
+                path=os.path.join(ToolRegistry.get_project_root(), PLAN_CACHE["path"]),
+                max_entries=PLAN_CACHE.get("max_entries", 1000),
+                ttl=PLAN_CACHE.get("ttl", 7 * 24 * 3600),
+                similarity_threshold=PLAN_CACHE.get("similarity_threshold"),
+                history_turns=PLAN_CACHE.get("history_turns", 2)
+            )
+
+        # 工具结果缓存
+        self.result_cache = None
+        if TOOL_RESULT_CACHE.get("enabled"):
+            self.result_cache = ToolResultCache(
+                cache_dir=os.path.join(ToolRegistry.get_project_root(), TOOL_RESULT_CACHE["dir"])
+            )
+
+    @property
+    def tool_descriptions(self) -> Dict[str, Dict]:
+        """工具名称到完整描述的映射"""
+        return self.description_cache.all()
+
+    async def startup(self) -> None:
+        """服务启动时初始化单例/池化工具的重量级资源，延迟加载的工具只预加载TOOL_PRELOAD中配置的"""
+        names = [name for name, tool_class in self.tools.items()
+                 if not isinstance(tool_class, LazyTool) or name in TOOL_PRELOAD]
+        await self.tool_pool.startup(names=names, warmup=TOOL_WARMUP_ON_STARTUP)
+        self.description_cache.start()
+        if self.health is not None:
+            self.health.start()
+
+    async def shutdown(self) -> None:
+        """服务关闭时释放工具资源"""
+        await self.description_cache.stop()
+        if self.health is not None:
+            await self.health.stop()
+        await self.tool_pool.close()
+        await close_async_llm_instances()
+        executors.shutdown()
+
+    async def refresh_tool_catalogs(self, names: Optional[list] = None) -> Dict[str, bool]:
+        """按需刷新工具描述中的动态目录（如新增了模型或LoRA）"""
+        return await self.description_cache.refresh(names)
 
     def _build_tool_context(self, current_task: Dict, context: Dict) -> Dict:
-        """构建工具执行上下文"""
+        """构建工具执行上下文，上游任务结果按参数优化阶段的token预算压缩"""
+        history = [
+            {
+                "task_id": task_id,
+                "tool_name": result["tool_name"],
+                "result": result["formatted_result"]
+            }
+            for task_id, result in context.items()
+        ]
+        if TOKEN_BUDGETS.get("enabled"):
+            history = fit_tool_results(history, TOKEN_BUDGETS["optimizer_context"], TOKEN_BUDGETS["per_result"])
         return {
             "current_task": {
                 "id": current_task["id"],
                 "tool_name": current_task["tool_name"],
                 "reason": current_task.get("reason", "")
             },
-            "history": [
-                {
-                    "task_id": task_id,
-                    "tool_name": result["tool_name"],
-                    "result": result["formatted_result"]
-                }
-                for task_id, result in context.items()
-            ]
+            "history": history
         }
 
+    def _plannable_tools(self) -> List[str]:
+        """可参与任务规划的工具（排除依赖的服务处于熔断状态的工具，与意图解析的过滤一致）"""
+        unavailable = set(self.health.unavailable_tools()) if self.health is not None else set()
+        return [name for name in self.tools if name not in unavailable]
+
+    def _get_planned_parameters(self, task_info: Dict, context: Dict) -> Optional[Dict]:
+        """
+        获取融合规划阶段（或快速路由）生成的参数
+
+        任务依赖上游结果（存在上下文或声明了依赖）或参数未通过校验时返回None，改由参数优化器生成
+        """
+        parameters = task_info.get("parameters")
+        if parameters is None:
+            return None
+
+        # 快速路由生成的参数与融合规划分开统计
+        prefix = "router.parameters" if task_info.get("routed") else "planner.fused_parameters"
+        tool_name = task_info["tool_name"]
+        if (not context and not task_info.get("depends_on") and isinstance(parameters, dict)
+                and self.parameter_optimizer._validate_parameters(parameters, self.tool_descriptions[tool_name])):
+            metrics.incr(f"{prefix}_used")
+            return dict(parameters)
+
+        metrics.incr(f"{prefix}_fallback")
+        return None
+
+    @staticmethod
+    async def _cancel_tool(tool: BaseTool, tool_name: str) -> None:
+        """调用工具的cancel钩子，超时或出错只记录日志"""
+        metrics.incr("executor.tool_cancelled")
+        try:
+            await asyncio.wait_for(tool.cancel(), timeout=CANCELLATION.get("tool_cancel_timeout", 5))
+            logger.info(f"工具 {tool_name} 已取消")
+        except Exception as e:
+            logger.warning(f"取消工具 {tool_name} 失败: {str(e)}")
+
     async def _execute_single_tool(self, task_info: Dict, context: Dict, verbose: bool,
-                                   query: UserQuery | FeishuUserQuery, history, intent_result, chat_ui) -> \
-            AsyncGenerator[
-                Dict[str, Any], None]:
+                                   query: UserQuery | FeishuUserQuery, history, intent_result, chat_ui,
+                                   ctx: RequestContext,
+                                   speculator: Optional[ParameterSpeculator] = None
+                                   ) -> AsyncGenerator[Dict[str, Any], None]:
         """执行单个工具"""
         global relative_path, image_name
         tool_name = task_info["tool_name"]
         task_id = task_info["id"]
-        max_retries = 3  # 最大重试次数
+        policy = RetryPolicy.named("tool")
+        max_retries = policy.max_attempts  # 最大尝试次数
         current_retry = 0
+        streamed = False  # 之前的尝试是否已向前端输出过增量文本
+
+        # 融合规划生成的参数，只在不依赖上游结果时使用，且只用于首次尝试
+        planned_parameters = self._get_planned_parameters(task_info, context)
+
+        # 只有给出最终回复的任务流式输出，中间任务的结果作为上下文整体使用
+        if ctx.stream and task_id != self._final_task_id(intent_result):
+            ctx = dataclasses.replace(ctx, stream=False)
 
         while current_retry < max_retries:
             try:
+                ctx.check()
+                # 依赖的服务熔断时直接失败，不再进行参数优化和重试
+                if self.health is not None:
+                    self.health.check(tool_name)
+
                 # 构建上下文
                 tool_context = self._build_tool_context(task_info, context)
 
+                # 预执行的参数优化结果，只用于首次尝试
+                speculation = None
+                if planned_parameters is None and current_retry == 0 and speculator is not None:
+                    speculation = await speculator.take(task_info, context)
+
                 # 获取参数优化结果
                 optimized_result = None
-                async for msg in self.parameter_optimizer.optimize_parameters(
-                        tool_name=tool_name,
-                        tool_description=self.tool_descriptions[tool_name],
-                        context=tool_context,
-                        query=query,
-                        intent_result=intent_result,
-                        verbose=verbose,
-                ):
-                    if msg["type"] == "thinking_process":
-                        yield msg
-                    elif msg["type"] == "result":
-                        optimized_result = msg["content"]
-                    else:
+                if planned_parameters is not None:
+                    optimized_result = {tool_name: planned_parameters}
+                    planned_parameters = None
+                    yield {
+                        "type": "thinking_process",
+                        "message_id": ctx.message_id,
+                        "content": f"使用任务规划生成的 {tool_name} 参数"
+                    }
+                elif speculation is not None:
+                    messages, optimized_result = speculation
+                    for msg in messages:
                         yield msg
+                else:
+                    async for msg in self.parameter_optimizer.optimize_parameters(
+                            tool_name=tool_name,
+                            tool_description=self.tool_descriptions[tool_name],
+                            context=tool_context,
+                            query=query,
+                            intent_result=intent_result,
+                            verbose=verbose,
+                            ctx=ctx
+                    ):
+                        if msg["type"] == "thinking_process":
+                            yield msg
+                        elif msg["type"] == "result":
+                            optimized_result = msg["content"]
+                        else:
+                            yield msg
 
                 # 添加历史记录
                 optimized_result[tool_name]["history"] = history
@@ -583,81 +907,164 @@ class ToolExecutor:
                 if verbose:
                     logger.info(f"执行工具 {tool_name} 的优化参数:\n{json.dumps(optimized_result, ensure_ascii=False)}")
 
-                    # 执行工具
-                    result = await self.tools[tool_name]().run(**optimized_result[tool_name])
+                # 工具声明了缓存策略时先按参数查询结果缓存
+                ctx.check()
+                tool_class = self.tools[tool_name]
+                cache_policy = getattr(tool_class, "cache_policy", None) if self.result_cache is not None else None
+                if cache_policy is not None and any(optimized_result[tool_name].get(param)
+                                                    for param in cache_policy.bypass_params):
+                    cache_policy = None
+                cache_key, cache_hit = None, False
+                if cache_policy is not None:
+                    cache_key = await self.result_cache.make_key(tool_name, cache_policy, optimized_result[tool_name])
+                    cache_hit, result = await self.result_cache.get(tool_name, cache_policy, cache_key,
+                                                                    tool_class.is_result_reusable)
+                    if cache_hit:
+                        yield {
+                            "type": "thinking_process",
+                            "message_id": ctx.message_id,
+                            "content": f"命中工具 {tool_name} 的结果缓存"
+                        }
 
-                    # 检查结果是否为空
-                    if result is None:
-                        if current_retry < max_retries - 1:
-                            yield {
-                                "type": "thinking_process",
-                                "message_id": self.message_id,
-                                "content": f"工具执行返回空结果，准备重试... ({current_retry + 1}/{max_retries})"
-                            }
-                            await asyncio.sleep(1)
-                            current_retry += 1
-                            continue
+                # 执行工具，工具内部可通过current_context()获取请求上下文
+                if not cache_hit:
+                    with use_context(ctx), tracer.span("tool.run", ctx, tool=tool_name, task_id=task_id,
+                                                       attempt=current_retry + 1):
+                        async with self.tool_pool.acquire(tool_name) as tool:
+                            try:
+                                result = await tool.run(**optimized_result[tool_name])
+                            except asyncio.CancelledError:
+                                # 请求被取消（如客户端断开），通知工具中止外部任务后再归还实例
+                                await self._cancel_tool(tool, tool_name)
+                                raise
+                            except Exception as e:
+                                if self.health is not None:
+                                    self.health.record_failure(tool_name, e)
+                                raise
+                    # 按返回值记录服务状态（流式结果转发前无法判断，按成功处理）
+                    if self.health is not None:
+                        if isinstance(result, StreamingResult):
+                            self.health.record_success(tool_name)
                         else:
-                            raise ValueError("工具执行多次返回空结果")
-
+                            self.health.record_result(tool_name, result)
+                    if cache_key is not None and tool_class.is_result_reusable(result):
+                        await self.result_cache.put(tool_name, cache_policy, cache_key, result)
+
+                # 流式结果：逐段转发增量文本，结束后使用完整文本
+                if isinstance(result, StreamingResult):
+                    stream_span = tracer.start_span("tool.stream", ctx, tool=tool_name, task_id=task_id)
+                    first_chunk = True
+                    # 取消或出错时显式关闭流，不等垃圾回收才释放模型服务的连接
                     try:
-                        formatted_result = await self.format_result(tool_name, result, chat_ui)
-                    except Exception:
-                        if current_retry < max_retries - 1:
+                        async for chunk in result:
+                            ctx.check()
+                            if not ctx.stream:
+                                continue
+                            if first_chunk:
+                                metrics.observe("executor.first_token_latency", time.monotonic() - ctx.started_at)
+                                first_chunk = False
+                                # 重试时重新流式输出，先通知前端清空上一次尝试已输出的内容
+                                if streamed:
+                                    yield {
+                                        "type": "delta_reset",
+                                        "message_id": ctx.message_id,
+                                        "task_id": task_id,
+                                        "tool_name": tool_name
+                                    }
+                                streamed = True
                             yield {
-                                "type": "thinking_process",
-                                "message_id": self.message_id,
-                                "content": f"结果格式化失败，准备重试... ({current_retry + 1}/{max_retries})"
+                                "type": "delta",
+                                "message_id": ctx.message_id,
+                                "task_id": task_id,
+                                "tool_name": tool_name,
+                                "content": chunk
                             }
-                            await asyncio.sleep(1)
-                            current_retry += 1
-                            continue
-                        raise
-
-                    # 返回完整结果
-                    final_result = {
-                        "type": "tool_complete",
+                    finally:
+                        await result.aclose()
+                    stream_span.set(chars=len(result.text))
+                    stream_span.end()
+                    result = result.text or None
+
+                # 空结果和格式化失败同样按下面的重试策略处理
+                if result is None:
+                    raise ValueError("工具执行返回空结果")
+
+                with tracer.span("format_result", ctx, tool=tool_name):
+                    formatted_result = await self.format_result(tool_name, result, chat_ui)
+
+                # 返回完整结果
+                final_result = {
+                    "type": "tool_complete",
+                    "tool_name": tool_name,
+                    "task_id": task_id,
+                    "result": {
+                        "parameters": optimized_result,
+                        "result": result,
                         "tool_name": tool_name,
-                        "task_id": task_id,
-                        "result": {
-                            "parameters": optimized_result,
-                            "result": result,
-                            "tool_name": tool_name,
-                            "formatted_result": formatted_result["result"],
-                            "context": tool_context,
-                            "links": formatted_result["links"]
-                        }
+                        "formatted_result": formatted_result["result"],
+                        "context": tool_context,
+                        "links": formatted_result["links"]
                     }
-                    yield final_result
-                    break
+                }
+                yield final_result
+                break
 
+            except (RequestCancelledError, asyncio.TimeoutError):
+                raise
+            except BackendUnavailableError as e:
+                yield {
+                    "type": "thinking_process",
+                    "message_id": ctx.message_id,
+                    "error": str(e)
+                }
+                raise
             except Exception as e:
                 current_retry += 1
                 error_msg = f"工具 {tool_name} 执行失败: {str(e)}"
                 logger.error(error_msg)
 
-                if current_retry >= max_retries:
+                # 达到最大尝试次数、错误不可重试、重试预算用完或退避会超过截止时间时放弃
+                delay = plan_retry(policy, current_retry, e, ctx.retry_budget, ctx.remaining, "tool")
+                if delay is None:
                     error_result = {
                         "type": "thinking_process",
-                        "message_id": self.message_id,
+                        "message_id": ctx.message_id,
                         "error": error_msg
                     }
                     yield error_result
-                    raise Exception(f"达到最大重试次数 ({max_retries})，工具执行失败: {error_msg}")
+                    raise Exception(f"工具执行失败 (已尝试 {current_retry} 次): {error_msg}")
                 else:
+                    metrics.incr("tool.retries")
                     yield {
                         "type": "thinking_process",
-                        "message_id": self.message_id,
+                        "message_id": ctx.message_id,
                         "content": f"执行失败，准备重试... ({current_retry}/{max_retries})"
                     }
-                    await asyncio.sleep(1)
+                    await asyncio.sleep(delay)
 
 
-    async def execute_tools(self, query: UserQuery | FeishuUserQuery, history,chat_ui) -> AsyncGenerator[
-        Dict[str, Any], None]:
-        """执行工具链"""
+    async def execute_tools(self, query: UserQuery | FeishuUserQuery, history, chat_ui,
+                            ctx: Optional[RequestContext] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        执行工具链
+
+        Args:
+            ctx: 请求上下文，执行器本身不保存任何请求状态，多个请求可同时调用
+        """
         global execution_mode
+        # 未传入上下文时（如飞书、微信入口）在这里创建请求上下文和追踪
+        root_span = None
+        if ctx is None:
+            ctx = RequestContext.create()
+            root_span = tracer.start_trace(ctx, name="execute_tools")
+        speculator = None
         try:
+            # 对话历史按阶段的token预算压缩，较长的历史回答不会在每次LLM调用中重复预填充
+            planner_history = tool_history = history
+            if TOKEN_BUDGETS.get("enabled"):
+                planner_history = fit_history(history, TOKEN_BUDGETS["planner_history"])
+                tool_history = fit_history(history, TOKEN_BUDGETS["tool_history"])
+
             # 处理查询
             processed_query = self._process_query(query)
             if self.verbose:
@@ -665,17 +1072,63 @@ class ToolExecutor:
 
             yield {
                 "type": "thinking_process",
-                "message_id": self.message_id,
+                "message_id": ctx.message_id,
                 "content": "分析问题并选择合适的处理方式..."
             }
             await asyncio.sleep(0.1)
 
-            # 获取执行计划
-            intent_result = self.intent_parser.parse_intent(processed_query, history, self.verbose)
+            # 获取执行计划：快速路由 -> 规划缓存 -> 意图解析
+            intent_result = None
+            route = None
+            if self.router is not None:
+                with tracer.span("router", ctx) as span:
+                    route = await self.router.route(query)
+                    span.set(hit=route is not None)
+            if route is not None:
+                intent_result = route.to_plan()
+                yield {
+                    "type": "thinking_process",
+                    "message_id": ctx.message_id,
+                    "content": f"快速路由命中 {route.tool_name}，跳过意图分析"
+                }
+
+            # 规划缓存按当前可参与规划的工具签名：服务熔断期间生成的降级规划（不含不可用工具）
+            # 与正常规划互不命中，服务恢复后不会继续使用降级规划
+            plannable_tools = self._plannable_tools()
+            if intent_result is None and self.plan_cache is not None:
+                with tracer.span("plan_cache", ctx) as span:
+                    intent_result = await self.plan_cache.get(processed_query, plannable_tools, history)
+                    span.set(hit=intent_result is not None)
+                if intent_result is not None:
+                    yield {
+                        "type": "thinking_process",
+                        "message_id": ctx.message_id,
+                        "content": "命中任务规划缓存，跳过意图分析"
+                    }
+
+            if intent_result is None:
+                start_time = time.perf_counter()
+                tool_names = None
+                if self.tool_retriever is not None:
+                    with tracer.span("tool_retrieval", ctx):
+                        tool_names = await self.tool_retriever.select(processed_query)
+                    if tool_names and self.verbose:
+                        logger.info(f"检索到的相关工具: {tool_names}")
+                with tracer.span("parse_intent", ctx, fused=self.fused_planning) as span:
+                    intent_result = await self.intent_parser.parse_intent(processed_query, planner_history,
+                                                                          self.verbose,
+                                                                          fused=self.fused_planning,
+                                                                          tool_names=tool_names, ctx=ctx)
+                    span.set(tasks=len(intent_result.get("tasks", [])))
+                metrics.observe("planner.intent_latency", time.perf_counter() - start_time)
+                if self.plan_cache is not None:
+                    # 参数与具体输入（如附件路径、地点）相关，只缓存任务规划
+                    await self.plan_cache.put(processed_query, plannable_tools, self._strip_parameters(intent_result),
+                                              history)
 
             yield {
                 "type": "thinking_process",
-                "message_id": self.message_id,
+                "message_id": ctx.message_id,
                 "content": "[Debug] 意图分析结果: {}".format(intent_result)
             }
             await asyncio.sleep(0.2)
@@ -683,21 +1136,77 @@ class ToolExecutor:
             if not intent_result.get("tasks"):
                 yield {
                     "type": "error",
-                    "message_id": self.message_id,
+                    "message_id": ctx.message_id,
                     "content": "未找到合适的工具"
                 }
                 return
 
-            async for step_result in self.serial_execute_tools(intent_result, processed_query, history,chat_ui):
+            # 快速路由、规划缓存得到的计划可能包含依赖的服务已熔断的工具，直接失败
+            if self.health is not None:
+                for task in intent_result["tasks"]:
+                    try:
+                        self.health.check(task["tool_name"])
+                    except BackendUnavailableError as e:
+                        yield {
+                            "type": "error",
+                            "message_id": ctx.message_id,
+                            "content": str(e)
+                        }
+                        return
+
+            if self._is_parallel_plan(intent_result):
+                execute_plan = self.parallel_execute_tools
+            else:
+                execute_plan = self.serial_execute_tools
+
+            # 执行计划已确定，依赖已满足的任务提前开始参数优化
+            if SPECULATIVE_PARAMETERS.get("enabled") and len(intent_result["tasks"]) > 1:
+                speculator = ParameterSpeculator(
+                    optimizer=self.parameter_optimizer,
+                    tool_descriptions=self.tool_descriptions,
+                    build_context=self._build_tool_context,
+                    query=processed_query,
+                    intent_result=intent_result,
+                    ctx=ctx,
+                    verbose=self.verbose,
+                    max_concurrent=SPECULATIVE_PARAMETERS.get("max_concurrent", 2),
+                    serial=execute_plan == self.serial_execute_tools
+                )
+                speculator.schedule({})
+
+            async for step_result in execute_plan(intent_result, processed_query, tool_history, chat_ui, ctx,
+                                                  speculator=speculator):
                 yield step_result
 
         except Exception as e:
             logger.error(f"工具执行失败: {str(e)}")
             yield {
                 "type": "error",
-                "message_id": self.message_id,
+                "message_id": ctx.message_id,
                 "content": f"执行失败: {str(e)}"
             }
+        finally:
+            if speculator is not None:
+                speculator.cancel_all()
+            if root_span is not None:
+                root_span.end()
+
+    @staticmethod
+    def _final_task_id(intent_result: Dict[str, Any]) -> Optional[str]:
+        """给出最终回复的任务：规划顺序的最后一个"""
+        tasks = intent_result.get("tasks") or []
+        if not tasks:
+            return None
+        return sorted(tasks, key=lambda x: x.get("order", 1))[-1]["id"]
+
+    @staticmethod
+    def _strip_parameters(intent_result: Dict[str, Any]) -> Dict[str, Any]:
+        """移除任务中融合规划生成的参数"""
+        return {
+            **intent_result,
+            "tasks": [{key: value for key, value in task.items() if key != "parameters"}
+                      for task in intent_result.get("tasks", [])]
+        }
 
     def _process_query(self, query: UserQuery | FeishuUserQuery) -> UserQuery | FeishuUserQuery:
         """处理查询，添加附件信息"""
@@ -731,7 +1240,9 @@ class ToolExecutor:
             intent_result: Dict[str, Any],
             query: UserQuery | FeishuUserQuery,
             history,
-            chat_ui
+            chat_ui,
+            ctx: RequestContext,
+            speculator: Optional[ParameterSpeculator] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """串行执行工具"""
         global task_id, link_text
@@ -740,7 +1251,7 @@ class ToolExecutor:
 
             yield {
                 "type": "thinking_process",
-                "message_id": self.message_id,
+                "message_id": ctx.message_id,
                 "content": "开始串行模式执行任务"
             }
             await asyncio.sleep(0.1)
@@ -757,6 +1268,7 @@ class ToolExecutor:
             all_links = []
             # 按顺序执行任务
             for i, task in enumerate(tasks):
+                ctx.check()
                 try:
                     if self.verbose:
                         current_task = i + 1
@@ -765,7 +1277,7 @@ class ToolExecutor:
 
                         yield {
                             "type": "thinking_process",
-                            "message_id": self.message_id,
+                            "message_id": ctx.message_id,
                             "content": f"\n执行任务 {current_task}/{total_tasks}: {tool_name}"
                         }
                         await asyncio.sleep(0.1)
@@ -782,7 +1294,9 @@ class ToolExecutor:
                             query=query,
                             history=history,
                             intent_result=intent_result,
-                            chat_ui=chat_ui
+                            chat_ui=chat_ui,
+                            ctx=ctx,
+                            speculator=speculator
                     ):
                         if step_result["type"] == "tool_complete":
                             final_result = step_result
@@ -795,6 +1309,8 @@ class ToolExecutor:
                         # 使用最终结果更新上下文
                         task_id = task["id"]
                         context[task_id] = final_result["result"]
+                        if speculator is not None:
+                            speculator.schedule(context)
 
                         formatted_result = final_result["result"]["formatted_result"]
                         links = final_result["result"]["links"]
@@ -816,6 +1332,8 @@ class ToolExecutor:
                     if self.verbose:
                         logger.info(f"任务 {task_id} 执行完成")
 
+                except (RequestCancelledError, asyncio.TimeoutError):
+                    raise
                 except Exception as e:
                     logger.error(f"任务 {task.get('id', '')} 执行失败: {str(e)}")
                     continue
@@ -833,6 +1351,193 @@ class ToolExecutor:
             logger.error(f"串行执行失败: {str(e)}")
             yield {"error": f"执行失败: {str(e)}"}
 
+    @staticmethod
+    def _is_parallel_plan(intent_result: Dict[str, Any]) -> bool:
+        """判断执行计划是否需要按依赖关系并行执行"""
+        execution_mode = str(intent_result.get("execution_mode", "串行")).strip().lower()
+        strategy = intent_result.get("execution_strategy") or {}
+        parallel_groups = strategy.get("parallel_groups") if isinstance(strategy, dict) else None
+        return execution_mode in ("并行", "parallel") or bool(parallel_groups)
+
+    @staticmethod
+    def _topological_order(tasks: list) -> Optional[list]:
+        """
+        按依赖关系对任务进行拓扑排序
+
+        Returns:
+            Optional[list]: 排序后的任务id列表，存在循环依赖时返回None
+        """
+        ordered_tasks = sorted(tasks, key=lambda x: x.get("order", 1))
+        pending = {task["id"]: set(task.get("depends_on", [])) for task in ordered_tasks}
+        order = []
+
+        while pending:
+            ready = [task_id for task_id, deps in pending.items() if not deps]
+            if not ready:
+                return None
+            for task_id in ready:
+                order.append(task_id)
+                del pending[task_id]
+            for deps in pending.values():
+                deps.difference_update(ready)
+
+        return order
+
+    async def parallel_execute_tools(
+            self,
+            intent_result: Dict[str, Any],
+            query: UserQuery | FeishuUserQuery,
+            history,
+            chat_ui,
+            ctx: RequestContext,
+            speculator: Optional[ParameterSpeculator] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """按依赖关系并行执行工具（DAG调度），互不依赖的任务同时执行"""
+        tasks = intent_result.get("tasks", [])
+        task_map = {task["id"]: task for task in tasks}
+
+        order = self._topological_order(tasks)
+        if order is None:
+            logger.warning("任务存在循环依赖，回退为串行执行")
+            async for step_result in self.serial_execute_tools(intent_result, query, history, chat_ui, ctx,
+                                                               speculator=speculator):
+                yield step_result
+            return
+
+        yield {
+            "type": "thinking_process",
+            "message_id": ctx.message_id,
+            "content": "开始并行模式执行任务"
+        }
+        await asyncio.sleep(0.1)
+
+        context = {}  # 存储所有已执行工具的结果
+        events: asyncio.Queue = asyncio.Queue()  # 汇总各任务的进度信息
+        semaphore = asyncio.Semaphore(max(1, TOOL_PARALLEL_LIMIT))
+        finished = {task_id: asyncio.Event() for task_id in order}
+        failed: Dict[str, str] = {}  # 执行失败或因依赖失败而跳过的任务
+        total_tasks = len(order)
+
+        async def run_task(index: int, task: Dict) -> None:
+            task_id = task["id"]
+            try:
+                # 等待所有依赖任务完成
+                for dep in task.get("depends_on", []):
+                    await finished[dep].wait()
+
+                # 依赖的任务失败时跳过，不使用不完整的上游结果执行
+                failed_deps = [dep for dep in task.get("depends_on", []) if dep in failed]
+                if failed_deps:
+                    failed[task_id] = f"依赖的任务 {', '.join(failed_deps)} 执行失败，已跳过"
+                    await events.put({
+                        "type": "thinking_process",
+                        "message_id": ctx.message_id,
+                        "error": f"任务 {task_id} {failed[task_id]}"
+                    })
+                    return
+
+                async with semaphore:
+                    if self.verbose:
+                        await events.put({
+                            "type": "thinking_process",
+                            "message_id": ctx.message_id,
+                            "content": f"\n执行任务 {index}/{total_tasks}: {task['tool_name']}"
+                        })
+                        logger.info(f"\n执行任务 {index}/{total_tasks}: {task['tool_name']}")
+                        logger.info(f"任务原因: {task.get('reason', '无')}")
+
+                    # 只向任务提供其声明依赖的执行结果
+                    dependency_context = {
+                        dep: context[dep] for dep in task.get("depends_on", []) if dep in context
+                    }
+                    async for step_result in self._execute_single_tool(
+                            task_info=task,
+                            context=dependency_context,
+                            verbose=self.verbose,
+                            query=query,
+                            history=history,
+                            intent_result=intent_result,
+                            chat_ui=chat_ui,
+                            ctx=ctx,
+                            speculator=speculator
+                    ):
+                        if step_result.get("type") == "tool_complete":
+                            context[task_id] = step_result["result"]
+                            if speculator is not None:
+                                speculator.schedule(context)
+                        await events.put(step_result)
+
+                if task_id not in context:
+                    failed[task_id] = "工具未返回结果"
+                elif self.verbose:
+                    logger.info(f"任务 {task_id} 执行完成")
+
+            except (RequestCancelledError, asyncio.TimeoutError):
+                raise
+            except Exception as e:
+                failed[task_id] = str(e)
+                logger.error(f"任务 {task_id} 执行失败: {str(e)}")
+            finally:
+                finished[task_id].set()
+
+        async def run_all() -> None:
+            runners = [asyncio.create_task(run_task(index, task_map[task_id]))
+                       for index, task_id in enumerate(order, start=1)]
+            try:
+                await asyncio.gather(*runners)
+            finally:
+                # 请求取消或超时时停止其余任务
+                for item in runners:
+                    if not item.done():
+                        item.cancel()
+                await events.put(None)
+
+        runner = asyncio.create_task(run_all())
+        try:
+            while True:
+                step_result = await events.get()
+                if step_result is None:
+                    break
+                yield step_result
+        finally:
+            if not runner.done():
+                runner.cancel()
+        # 请求取消、超时向上传递
+        await runner
+
+        # 按规划顺序汇总结果，保证最后一个任务的结果作为最终回复
+        tools_result = {}
+        all_links = []
+        for task in sorted(tasks, key=lambda x: x.get("order", 1)):
+            task_result = context.get(task["id"])
+            if not task_result:
+                continue
+            if task_result["links"]:
+                all_links.extend(task_result["links"])
+            tools_result[task["id"]] = {
+                "tool_name": task["tool_name"],
+                "reason": task.get("reason", ""),
+                "result": task_result["formatted_result"]
+            }
+
+        if self.verbose:
+            result_logger.info(f"\n所有任务执行完成:\n{tools_result}")
+
+        # 给出最终回复的任务失败时整体失败，其余任务失败时随结果返回
+        final_task_id = self._final_task_id(intent_result)
+        if final_task_id in failed:
+            yield {"error": f"执行失败: 任务 {final_task_id} {failed[final_task_id]}"}
+            return
+
+        final_event = {
+            "status": "success",
+            "result": tools_result,
+            "link": "\n".join(all_links) if all_links else ""
+        }
+        if failed:
+            final_event["failed"] = failed
+        yield final_event
+
     async def format_result(self, tool_name: str, result: Any, chat_ui: bool = False) -> Dict:
         """格式化工具执行结果"""
         try:
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import hashlib
+import importlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Type
+
+from agent_workflow.tools.tool.base import BaseTool, ToolInstancePolicy
+from agent_workflow.utils import loadingInfo
+
+logger = loadingInfo("tool_manifest")
+
+MANIFEST_VERSION = 3
+
+# 工具描述、实例策略、依赖服务等会读取的配置文件（相对项目根目录），内容变化后清单整体失效
+CONFIG_FILES = ("config/config.py", "config/tool_config.py", "config/bot.py")
+
+
+class LazyTool:
+    """
+    工具类的延迟加载代理
+
+    与工具类用法一致（调用即创建实例），名称、描述和实例策略直接取自清单，
+    只有真正需要创建实例时才导入工具模块
+    """
+
+    def __init__(self, name: str, module: str, class_name: str, description: str,
+                 instance_policy: str = ToolInstancePolicy.PER_REQUEST.value, pool_size: int = 1,
+                 catalog_refresh_interval: Optional[float] = None, backends: Optional[List[str]] = None,
+                 catalog_provider: Optional[str] = None):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.description = description
+        self.instance_policy = ToolInstancePolicy(instance_policy)
+        self.pool_size = pool_size
+        self.catalog_refresh_interval = catalog_refresh_interval
+        self.catalog_provider = catalog_provider
+        self.backends = tuple(backends or ())
+        self.__name__ = class_name
+        self._tool_class: Optional[Type[BaseTool]] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._tool_class is not None
+
+    @property
+    def tool_class(self) -> Type[BaseTool]:
+        """导入并返回真实的工具类"""
+        if self._tool_class is None:
+            module = importlib.import_module(self.module)
+            self._tool_class = getattr(module, self.class_name)
+            logger.info(f"✅ 已加载工具模块: {self.name} from {self.module}")
+        return self._tool_class
+
+    def __call__(self, *args, **kwargs) -> BaseTool:
+        return self.tool_class(*args, **kwargs)
+
+    def __getattr__(self, item: str) -> Any:
+        # 只有清单中没有的属性才需要导入真实的工具类
+        if item.startswith('__') or item == '_tool_class':
+            raise AttributeError(item)
+        return getattr(self.tool_class, item)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "lazy"
+        return f"<LazyTool {self.name} ({self.module}, {state})>"
+
+
+class ToolManifest:
+    """
+    工具清单
+
+    记录每个工具模块文件的指纹（修改时间+大小，加上配置文件的内容摘要）以及其中工具的名称、描述和实例策略。
+    文件和配置未变化时直接使用清单，不导入模块；新增或修改的文件、修改配置后才重新导入扫描。
+    """
+
+    def __init__(self, path: str, tool_dir: str):
+        """
+        Args:
+            path: 清单文件路径
+            tool_dir: 清单对应的工具目录（相对项目根目录）
+        """
+        self.path = path
+        self.tool_dir = tool_dir
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    @staticmethod
+    def config_fingerprint(project_root: str, config_files=CONFIG_FILES) -> str:
+        """配置文件内容的摘要，不存在的文件跳过"""
+        digest = hashlib.sha1()
+        for rel_path in config_files:
+            file_path = os.path.join(project_root, rel_path)
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, 'rb') as f:
+                digest.update(rel_path.encode('utf-8'))
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def file_fingerprint(file_path: str, config_fingerprint: str = "") -> str:
+        """文件指纹：修改时间和大小，加上配置文件摘要"""
+        stat = os.stat(file_path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}:{config_fingerprint}"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION and data.get("tool_dir") == self.tool_dir:
+                self.files = data.get("files", {})
+        except Exception as e:
+            logger.warning(f"读取工具清单失败，将重新扫描: {str(e)}")
+            self.files = {}
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": MANIFEST_VERSION,
+                    "tool_dir": self.tool_dir,
+                    "files": self.files
+                }, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"保存工具清单失败: {str(e)}")
+
+    def get_entries(self, file_path: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+        """文件指纹一致时返回清单中的工具条目，否则返回None"""
+        record = self.files.get(file_path)
+        if record and record.get("fingerprint") == fingerprint:
+            return record.get("tools", [])
+        return None
+
+    def set_entries(self, file_path: str, fingerprint: str, entries: List[Dict[str, Any]]) -> None:
+        self.files[file_path] = {"fingerprint": fingerprint, "tools": entries}
+
+    def retain(self, file_paths: List[str]) -> None:
+        """移除已删除文件的记录"""
+        self.files = {path: record for path, record in self.files.items() if path in file_paths}
+
+    @staticmethod
+    def build_entry(name: str, tool_class: Type[BaseTool]) -> Dict[str, Any]:
+        """根据已导入的工具类生成清单条目"""
+        description = tool_class().get_description()
+        if not isinstance(description, str):
+            description = json.dumps(description, ensure_ascii=False)
+        return {
+            "name": name,
+            "module": tool_class.__module__,
+            "class_name": tool_class.__name__,
+            "description": description,
+            "instance_policy": ToolInstancePolicy(tool_class.instance_policy).value,
+            "pool_size": tool_class.pool_size,
+            "catalog_refresh_interval": tool_class.catalog_refresh_interval,
+            "catalog_provider": tool_class.catalog_provider,
+            "backends": list(tool_class.backends)
+        }
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Type
+
+from agent_workflow.tools.tool.base import BaseTool, ToolInstancePolicy
+from agent_workflow.utils import loadingInfo
+from config.config import TOOL_INSTANCE_POLICIES
+
+logger = loadingInfo("tool_pool")
+
+
+@dataclass
+class _ToolSlot:
+    """单个工具的实例槽位"""
+    tool_class: Type[BaseTool]
+    policy: ToolInstancePolicy
+    size: int
+    instances: List[BaseTool] = field(default_factory=list)
+    idle: Optional[asyncio.Queue] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class ToolPool:
+    """
+    工具实例池
+
+    功能：
+    1. 按工具的实例策略（单例/池化/每次新建）管理实例
+    2. 启动时统一执行setup和warmup，重量级资源只构建一次
+    3. 关闭时统一执行close释放资源
+
+    策略优先取config中的TOOL_INSTANCE_POLICIES，其次取工具类上声明的instance_policy
+    """
+
+    def __init__(self, tools: Dict[str, Type[BaseTool]]):
+        self._slots: Dict[str, _ToolSlot] = {}
+        for name, tool_class in tools.items():
+            override = TOOL_INSTANCE_POLICIES.get(name, {})
+            policy = ToolInstancePolicy(override.get("policy", getattr(tool_class, "instance_policy",
+                                                                         ToolInstancePolicy.PER_REQUEST)))
+            size = max(1, int(override.get("pool_size", getattr(tool_class, "pool_size", 1))))
+            if policy == ToolInstancePolicy.SINGLETON:
+                size = 1
+            self._slots[name] = _ToolSlot(tool_class=tool_class, policy=policy, size=size)
+
+    def get_policy(self, tool_name: str) -> ToolInstancePolicy:
+        """获取工具的实例策略"""
+        return self._slots[tool_name].policy
+
+    @staticmethod
+    async def _create_instance(tool_class: Type[BaseTool], warmup: bool = False) -> BaseTool:
+        """创建实例并执行setup/warmup"""
+        instance = tool_class()
+        await instance.setup()
+        if warmup:
+            await instance.warmup()
+        return instance
+
+    async def _fill_slot(self, name: str, slot: _ToolSlot, warmup: bool) -> None:
+        """为单例/池化工具创建全部实例"""
+        async with slot.lock:
+            if slot.idle is not None:
+                return
+            instances = []
+            try:
+                for _ in range(slot.size):
+                    instances.append(await self._create_instance(slot.tool_class, warmup))
+            except Exception:
+                for instance in instances:
+                    await self._close_instance(name, instance)
+                raise
+
+            idle = asyncio.Queue()
+            for instance in instances:
+                idle.put_nowait(instance)
+            slot.instances, slot.idle = instances, idle
+            logger.info(f"工具 {name} 初始化完成 (策略: {slot.policy.value}, 实例数: {slot.size})")
+
+    async def startup(self, names: Optional[List[str]] = None, warmup: bool = True) -> None:
+        """
+        启动时初始化单例/池化工具
+
+        单个工具初始化失败不影响其它工具，失败的工具会在首次使用时再次尝试初始化
+
+        Args:
+            names: 需要初始化的工具，为None时初始化全部
+            warmup: 是否执行warmup
+        """
+        names = [name for name, slot in self._slots.items()
+                 if slot.policy != ToolInstancePolicy.PER_REQUEST and (names is None or name in names)]
+        results = await asyncio.gather(
+            *(self._fill_slot(name, self._slots[name], warmup) for name in names),
+            return_exceptions=True
+        )
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"工具 {name} 初始化失败: {str(result)}")
+
+    @asynccontextmanager
+    async def acquire(self, tool_name: str) -> AsyncIterator[BaseTool]:
+        """
+        获取工具实例
+
+        用法：
+            async with pool.acquire("WeatherTool") as tool:
+                result = await tool.run(**params)
+        """
+        slot = self._slots[tool_name]
+
+        if slot.policy == ToolInstancePolicy.PER_REQUEST:
+            instance = await self._create_instance(slot.tool_class)
+            try:
+                yield instance
+            finally:
+                await self._close_instance(tool_name, instance)
+            return
+
+        if slot.idle is None:
+            await self._fill_slot(tool_name, slot, warmup=False)
+
+        if slot.policy == ToolInstancePolicy.SINGLETON:
+            yield slot.instances[0]
+            return
+
+        # 池化：等待空闲实例，用完归还
+        instance = await slot.idle.get()
+        try:
+            yield instance
+        finally:
+            slot.idle.put_nowait(instance)
+
+    @staticmethod
+    async def _close_instance(tool_name: str, instance: BaseTool) -> None:
+        try:
+            await instance.close()
+        except Exception as e:
+            logger.error(f"关闭工具 {tool_name} 失败: {str(e)}")
+
+    async def _reset_slot(self, slot: _ToolSlot) -> None:
+        """关闭槽位内的实例并清空"""
+        instances, slot.instances, slot.idle = slot.instances, [], None
+        for instance in instances:
+            await self._close_instance(slot.tool_class.__name__, instance)
+
+    async def close(self) -> None:
+        """关闭所有已创建的实例"""
+        for slot in self._slots.values():
+            async with slot.lock:
+                await self._reset_slot(slot)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent_workflow.core.tool_descriptions import ToolDescriptionCache
+from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.embedding import EmbeddingClient, cosine_similarity
+from agent_workflow.utils.metrics import metrics
+
+logger = loadingInfo("tool_retriever")
+
+
+class ToolRetriever:
+    """
+    工具检索器
+
+    为工具描述（名称、功能描述、参数说明、可选的examples示例）建立向量索引，
+    任务规划时只把与查询最相关的top_k个工具（以及常驻工具）放入提示词，
+    工具数量增加时规划提示词的长度保持稳定
+    """
+
+    def __init__(self,
+                 description_cache: ToolDescriptionCache,
+                 top_k: int = 5,
+                 always_include: Optional[List[str]] = None,
+                 min_tools: int = 0,
+                 embedding_client: Optional[EmbeddingClient] = None):
+        """
+        Args:
+            description_cache: 工具描述缓存
+            top_k: 检索的工具数量
+            always_include: 始终放入提示词的工具（如ChatTool）
+            min_tools: 注册工具数不超过该值时不做检索，直接使用全部工具
+            embedding_client: 向量化客户端
+        """
+        self.description_cache = description_cache
+        self.top_k = top_k
+        self.always_include = always_include or []
+        self.min_tools = min_tools
+        self.embedding_client = embedding_client or EmbeddingClient()
+        # 工具名称 -> (索引文本, 向量)，描述变化后重新向量化
+        self._index: Dict[str, Tuple[str, List[float]]] = {}
+        self._index_lock = asyncio.Lock()
+
+    @staticmethod
+    def build_index_text(description: Dict[str, Any]) -> str:
+        """拼接工具的索引文本"""
+        parts = [f"{description.get('name', '')}: {description.get('description', '')}"]
+        for name, info in (description.get("parameters") or {}).items():
+            if isinstance(info, dict) and info.get("description"):
+                parts.append(f"{name}: {info['description']}")
+        examples = description.get("examples") or []
+        if examples:
+            parts.append("示例: " + "；".join(str(example) for example in examples))
+        return "\n".join(parts)
+
+    async def _refresh_index(self) -> None:
+        """为新增或描述变化的工具建立向量"""
+        async with self._index_lock:
+            descriptions = self.description_cache.all()
+            stale = {}
+            for name, description in descriptions.items():
+                text = self.build_index_text(description)
+                if name not in self._index or self._index[name][0] != text:
+                    stale[name] = text
+
+            for name in list(self._index):
+                if name not in descriptions:
+                    del self._index[name]
+
+            if stale:
+                vectors = await self.embedding_client.embed_documents(list(stale.values()))
+                for (name, text), vector in zip(stale.items(), vectors):
+                    self._index[name] = (text, vector)
+
+    async def select(self, query: Any) -> Optional[List[str]]:
+        """
+        检索与查询相关的工具
+
+        Returns:
+            Optional[List[str]]: 选中的工具名称，无需检索或检索失败时返回None（使用全部工具）
+        """
+        names = list(self.description_cache.all())
+        if len(names) <= max(self.min_tools, self.top_k + len(self.always_include)):
+            return None
+
+        start_time = time.perf_counter()
+        text = query.text if hasattr(query, 'text') else str(query)
+        try:
+            await self._refresh_index()
+            query_vector = await self.embedding_client.embed_query(text)
+        except Exception as e:
+            logger.warning(f"工具检索失败，使用全部工具: {str(e)}")
+            return None
+
+        ranked = sorted(
+            ((cosine_similarity(query_vector, vector), name) for name, (_, vector) in self._index.items()),
+            reverse=True
+        )
+        selected = [name for name in self.always_include if name in names]
+        for _, name in ranked:
+            if len(selected) >= self.top_k + len(self.always_include):
+                break
+            if name not in selected:
+                selected.append(name)
+
+        metrics.observe("retriever.latency", time.perf_counter() - start_time)
+        metrics.observe("retriever.selected_tools", len(selected))
+        return selected
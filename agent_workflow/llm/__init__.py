@@ -1,7 +1,9 @@
 from .llm import LLM
-from .base import get_llm_instance
+from .base import get_llm_instance, get_async_llm_instance, close_async_llm_instances
 
 __all__ = [
    'LLM',
-   'get_llm_instance'
+   'get_llm_instance',
+   'get_async_llm_instance',
+   'close_async_llm_instances'
 ]
\ No newline at end of file
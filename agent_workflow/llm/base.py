@@ -1,4 +1,8 @@
-from openai import OpenAI
+import asyncio
+import weakref
+from typing import Dict, Tuple
+
+from openai import AsyncOpenAI, OpenAI
 
 from config.config import OLLAMA_DATA, CHATGPT_DATA
 
@@ -15,3 +19,30 @@ def get_llm_instance(model_name: str, api_key: str) -> tuple[OpenAI, str, str]:
             api_key="Empty",
         )
     return llm, model_name, api_key
+
+
+# 异步客户端按事件循环复用（连接池绑定创建它的事件循环），事件循环销毁后随之释放
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncOpenAI]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def get_async_llm_instance(model_name: str, api_key: str) -> tuple[AsyncOpenAI, str, str]:
+    """异步客户端，用于流式输出，不阻塞事件循环；同一事件循环内复用同一个客户端及其连接池"""
+    if model_name.lower().startswith("gpt"):
+        base_url, client_key = CHATGPT_DATA["api_url"], api_key
+    else:
+        base_url, client_key = OLLAMA_DATA["api_url"], "Empty"
+
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    llm = clients.get((base_url, client_key))
+    if llm is None:
+        llm = AsyncOpenAI(base_url=base_url, api_key=client_key)
+        clients[(base_url, client_key)] = llm
+    return llm, model_name, api_key
+
+
+async def close_async_llm_instances() -> None:
+    """关闭当前事件循环中复用的异步客户端（服务关闭时调用）"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for llm in clients.values():
+        await llm.close()
@@ -8,10 +8,10 @@
 Copyright (c) 2024 [PanXingFeng]
 All rights reserved.
 """
-from typing import Generator, Optional
+from typing import AsyncGenerator, Generator, Optional
 
 from config.config import OLLAMA_DATA, CHATGPT_DATA
-from ..llm.base import get_llm_instance
+from ..llm.base import get_llm_instance, get_async_llm_instance
 
 
 class LLM:
@@ -76,6 +76,57 @@ class LLM:
         ]
         return self.chat_completion(messages, is_gpt)
 
+    async def astream_chat_completion(
+            self,
+            messages: list[dict],
+            is_gpt: bool = False,
+            temperature: float = 0.7,
+            max_tokens: Optional[int] = 1024,
+    ) -> AsyncGenerator[str, None]:
+        """
+        异步流式聊天补全，逐段返回增量文本，不阻塞事件循环
+
+        Args:
+            messages: 消息列表，包含角色和内容
+            temperature: 温度参数，控制输出随机性
+            max_tokens: 最大标记数限制
+        """
+        if is_gpt:
+            client, model_name, _ = get_async_llm_instance(CHATGPT_DATA['model'], CHATGPT_DATA['key'])
+        else:
+            client, model_name, _ = get_async_llm_instance(OLLAMA_DATA['model'], "none")
+
+        response = await client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            stream=True,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        # 正常结束、出错或请求被取消（如客户端断开）时都关闭响应，归还连接
+        async with response:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def astream_chat(
+            self,
+            prompt: str,
+            message: str,
+            is_gpt: bool = False
+    ) -> AsyncGenerator[str, None]:
+        """
+        简化的异步流式聊天接口
+        Args:
+            prompt: 系统提示词
+            message: 用户消息
+        """
+        messages = [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": message}
+        ]
+        return self.astream_chat_completion(messages, is_gpt)
+
     def _handle_stream_response(self, response) -> Generator[str, None, None]:
         """处理流式响应"""
         for chunk in response:
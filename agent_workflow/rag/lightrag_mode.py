@@ -31,6 +31,7 @@ import chardet
 
 from agent_workflow.rag.base import BaseRAG
 from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.gpu_scheduler import gpu_scheduler
 from agent_workflow.utils.read_files import get_project_root
 from config.config import OLLAMA_DATA
 
@@ -123,6 +124,14 @@ class DocumentProcessor(BaseRAG):
         if self.whisper_model is None:
             self.whisper_model = whisper.load_model("turbo")
 
+    def _unload_whisper_model(self):
+        """释放Whisper模型占用的显存（GPU调度器驱逐时调用）"""
+        if self.whisper_model is not None:
+            self.whisper_model = None
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
     def _get_file_type(self, file_path: str) -> Optional[FileType]:
         """获取文件类型"""
         ext = os.path.splitext(file_path)[1].lower().lstrip('.')
@@ -287,7 +296,8 @@ class DocumentProcessor(BaseRAG):
             elif file_type in [FileType.HTML, FileType.HTM]:
                 content = await asyncio.to_thread(self._process_html, file_path)
             elif file_type in [FileType.MP3, FileType.WAV]:
-                content = await asyncio.to_thread(self._process_audio, file_path)
+                async with gpu_scheduler.job("whisper-turbo", unload=self._unload_whisper_model):
+                    content = await asyncio.to_thread(self._process_audio, file_path)
             elif file_type == FileType.JSON:
                 content = await asyncio.to_thread(self._process_json, file_path)
             else:
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+工具描述中的动态目录（可用模型、LoRA列表）
+
+目录提供者只依赖服务客户端和配置，不导入工具模块（如图像工具依赖的torch、diffusers），
+工具通过catalog_provider声明后，描述缓存可以在工具延迟加载、尚未导入时刷新目录和描述
+"""
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+from agent_workflow.utils.comfyui_api import ComfyuiAPI
+from agent_workflow.utils.forge_api import ForgeAPI
+from config.tool_config import COMFYUI_MODEL, FORGE_MODEL, IMAGE_GEN_TOOL_DATA
+
+
+class ImageGeneratorCatalog:
+    """ImageGeneratorTool的模型/LoRA目录和描述，所有实例共享同一份目录"""
+
+    _catalog: Dict[str, List[str]] = {}
+
+    def __init__(self, model_type: Optional[str] = None):
+        self.model_type = model_type or IMAGE_GEN_TOOL_DATA['model_type'] or "comfyui"
+
+    async def refresh_catalog(self) -> None:
+        """刷新可用的基础模型和LoRA列表（在线程中请求，不阻塞事件循环）"""
+        if self.model_type == "sdwebui_forge":
+            models, loras = await asyncio.gather(
+                asyncio.to_thread(ForgeAPI().get_models),
+                asyncio.to_thread(ForgeAPI().get_loras)
+            )
+            ImageGeneratorCatalog._catalog = {"models": models, "loras": loras}
+        elif self.model_type == "comfyui":
+            models = await asyncio.to_thread(ComfyuiAPI.get_models)
+            ImageGeneratorCatalog._catalog = {"models": models}
+
+    def get_description(self) -> Optional[str]:
+        """获取工具描述信息，包括支持的模型和功能说明（模型目录取自缓存，未刷新前只包含默认模型）"""
+        if self.model_type == "sdwebui_forge":
+            supported_models = self._catalog.get("models") or [FORGE_MODEL]
+            supported_loras = self._catalog.get("loras") or []
+            return json.dumps({
+                "name": "ImageGeneratorTool",
+                "description": f"""AI图像生成工具，
+                                           model_name可只支持模型<{supported_models}>,
+                                           根据用户描述的内容进行选择更合适的基础模型，如果无法选择到适应的基础模型就返回默认值:<{FORGE_MODEL}>,
+                                           lora_name可支持模型<{supported_loras}>,
+                                           根据用户的描述选择更合适的lora风格模型,支持两个lora配置(基础风格lora和场景lora),无lora可选时使用默认值:<aidmaImageUpraderv0.3>,
+                                           如果用户的内容,在支持的模型中只有lora_name的模型符合，就使用基础模型<F.1基础算法模型>和对应的lora_name,
+                                           model_name和lora_name必须是可支持模型中的名称,禁止修改成英文,""",
+                "parameters": {
+                    "prompt": {"type": "string", "description": "必须是英文内容的提示词", "required": True},
+                    "lora_name": {
+                        "type": "array",
+                        "items": {
+                            "type": "string"
+                        },
+                        "description": "风格模型列表"
+                    },
+                    "model_name": {"type": "string", "description": "生图的基础模型"}
+                }
+            }, ensure_ascii=False, indent=2)
+        elif self.model_type == "comfyui":
+            supported_models = self._catalog.get("models") or [COMFYUI_MODEL]
+            return json.dumps({
+                "name": "ImageGeneratorTool",
+                "description": f"""AI图像生成工具，
+                                           model_name可只支持模型<{supported_models}>,
+                                           根据用户描述的内容进行选择更合适的基础模型，如果无法选择到适应的基础模型就返回默认值:<{COMFYUI_MODEL}>,
+                                           model_name必须是可支持模型中的名称,禁止修改成英文,""",
+                "parameters": {
+                    "prompt": {"type": "string", "description": "必须是英文内容的提示词", "required": True},
+                    "model_name": {"type": "string", "description": "生图的基础模型"}
+                }
+            }, ensure_ascii=False, indent=2)
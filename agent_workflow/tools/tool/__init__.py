@@ -1,12 +1,31 @@
-from .base import BaseTool
-from .image_tool import DescriptionImageTool, ImageGeneratorTool
-from .pdf_tool import FileConverterTool
-from .search_tool import SearchTool
-from .weather_tool import WeatherTool
-from .audio_tool import AudioTool
+import importlib
+
+from .base import BaseTool, StreamingResult, ToolCacheBackend, ToolCachePolicy, ToolInstancePolicy
+
+# 工具类按需导入，避免导入base时连带加载torch、diffusers等重量级依赖
+_LAZY_TOOLS = {
+    'DescriptionImageTool': '.image_tool',
+    'ImageGeneratorTool': '.image_tool',
+    'FileConverterTool': '.pdf_tool',
+    'SearchTool': '.search_tool',
+    'WeatherTool': '.weather_tool',
+    'AudioTool': '.audio_tool',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_TOOLS:
+        module = importlib.import_module(_LAZY_TOOLS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'BaseTool',
+    'StreamingResult',
+    'ToolCacheBackend',
+    'ToolCachePolicy',
+    'ToolInstancePolicy',
     'DescriptionImageTool',
     'FileConverterTool',
     'SearchTool',
@@ -9,7 +9,7 @@ Copyright (c) 2024 [PanXingFeng]
 All rights reserved.
 """
 from enum import Enum
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from pydantic import BaseModel, Field
 from dataclasses import dataclass
 from datetime import datetime
@@ -20,9 +20,12 @@ import json
 import asyncio
 from pydub import AudioSegment
 from gradio_client import Client, handle_file
+from gradio_client.client import Job
 
-from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.core.context import current_context
+from agent_workflow.tools.tool.base import BaseTool, ToolInstancePolicy
 from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.retry import RetryPolicy, plan_retry
 from config.tool_config import F5_TTS_PORT, GPT_SoVITS_PORT
 
 
@@ -82,6 +85,13 @@ class AudioTool(BaseTool):
     3. 音频参数调整
     4. 静音移除
     """
+
+    # GPT-SoVITS的角色切换是服务端状态，同一时间只允许一个任务使用
+    instance_policy = ToolInstancePolicy.POOLED
+    pool_size = 1
+    # 默认使用GPT-SoVITS；上传参考音频时使用F5-TTS
+    backends = ("gpt_sovits",)
+
     def __init__(self,
                  f5_host: str = f"http://127.0.0.1:{F5_TTS_PORT}",
                  sovits_host: str = f"http://127.0.0.1:{GPT_SoVITS_PORT}",
@@ -108,6 +118,8 @@ class AudioTool(BaseTool):
         # 延迟初始化的客户端
         self._client = None
         self._sovits_client = None
+        # 正在等待结果的gradio任务，请求取消时一并取消
+        self._jobs: Set[Job] = set()
 
         # 确保必要的目录存在
         self.upload_dir = os.path.join(self.project_root, "upload")
@@ -163,6 +175,33 @@ class AudioTool(BaseTool):
                 self.logger.warning(f"Failed to initialize GPT-SoVITS client: {e}")
         return self._sovits_client
 
+    async def setup(self) -> None:
+        """提前建立gradio客户端连接，避免首个请求等待"""
+        await asyncio.to_thread(lambda: (self.client, self.sovits_client))
+
+    async def _predict(self, client: Client, *args, **kwargs) -> Any:
+        """提交gradio任务并在线程中等待结果，等待期间请求被取消时放弃该任务"""
+        job = client.submit(*args, **kwargs)
+        self._jobs.add(job)
+        try:
+            return await asyncio.to_thread(job.result)
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+        finally:
+            self._jobs.discard(job)
+
+    async def cancel(self) -> None:
+        """放弃尚未完成的gradio任务（排队中的任务会从服务端队列移除）"""
+        for job in list(self._jobs):
+            job.cancel()
+        self._jobs.clear()
+
+    async def close(self) -> None:
+        """释放gradio客户端"""
+        self._client = None
+        self._sovits_client = None
+
     def get_description(self) -> str:
         """
         获取工具描述信息，用于任务规划
@@ -336,30 +375,30 @@ class AudioTool(BaseTool):
 
             try:
                 # 切换角色
-                await asyncio.to_thread(
-                    self.sovits_client.predict,
+                await self._predict(
+                    self.sovits_client,
                     str(sovits_config.character),
                     api_name="/load_character_emotions"
                 )
 
                 # 设置情感
-                await asyncio.to_thread(
-                    self.sovits_client.predict,
+                await self._predict(
+                    self.sovits_client,
                     str(sovits_config.character),  # 转换为字符串
                     str(sovits_config.emotion),  # 转换为字符串
                     api_name="/change_character_list"
                 )
 
                 # 生成语音文本
-                await asyncio.to_thread(
-                    self.sovits_client.predict,
+                await self._predict(
+                    self.sovits_client,
                     str(config.gen_text),  # 转换为字符串
                     api_name="/lambda"
                 )
 
                 # 生成音频文件，所有参数转换为字符串或基本类型
-                result = await asyncio.to_thread(
-                    self.sovits_client.predict,
+                result = await self._predict(
+                    self.sovits_client,
                     str(config.gen_text),  # 文本
                     str(sovits_config.character),  # 角色
                     str(sovits_config.emotion),  # 情感
@@ -426,8 +465,8 @@ class AudioTool(BaseTool):
     async def change_character(self, character_name: str):
         """更改当前角色"""
         try:
-            await asyncio.to_thread(
-                self.sovits_client.predict,
+            await self._predict(
+                self.sovits_client,
                 character_name,  # 角色名称
                 "default",  # emotion参数
                 api_name="/change_character_list"
@@ -440,8 +479,8 @@ class AudioTool(BaseTool):
     async def load_character_emotions(self):
         """加载角色的情感列表"""
         try:
-            result = await asyncio.to_thread(
-                self.sovits_client.predict,
+            result = await self._predict(
+                self.sovits_client,
                 api_name="/load_character_emotions"
             )
             return result
@@ -455,8 +494,9 @@ class AudioTool(BaseTool):
         if config.model == TTSModel.SOVITS:
             return await self.sovits_tts(config)
         else:
-            max_retries = 3
-            retry_delay = 2  # 秒
+            policy = RetryPolicy.named("tts")
+            max_retries = policy.max_attempts
+            ctx = current_context()
 
             try:
                 input_path = os.path.join(self.upload_dir, input_file)
@@ -509,8 +549,8 @@ class AudioTool(BaseTool):
                 # 重试机制
                 for attempt in range(max_retries):
                     try:
-                        result = await asyncio.to_thread(
-                            self.client.predict,
+                        result = await self._predict(
+                            self.client,
                             **predict_kwargs
                         )
 
@@ -546,10 +586,11 @@ class AudioTool(BaseTool):
 
                     except Exception as e:
                         self.logger.warning(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(retry_delay)
-                        else:
-                            raise  # 最后一次尝试失败时抛出异常
+                        # 重试共享请求的重试预算，按指数退避（带抖动）等待
+                        delay = plan_retry(policy, attempt + 1, e, ctx.retry_budget, ctx.remaining, "tts")
+                        if delay is None:
+                            raise  # 不再重试时抛出异常
+                        await asyncio.sleep(delay)
 
             except Exception as e:
                 self.logger.error("TTS processing error", exc_info=True)
@@ -592,6 +633,12 @@ class AudioTool(BaseTool):
         await asyncio.to_thread(audio.export, output_path, format=format)
         return output_path
 
+    @classmethod
+    def is_backend_failure(cls, result) -> bool:
+        """调用TTS服务失败（sovits_tts/basic_tts捕获的接口异常），缺少文本、文件格式等参数问题不计入"""
+        return (isinstance(result, dict)
+                and str(result.get("error", "")).startswith(("API call failed", "TTS processing failed")))
+
     async def run(self, **kwargs) -> str | dict[str, Any]:
         """执行TTS任务并返回输出文件路径"""
         try:
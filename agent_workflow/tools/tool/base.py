@@ -2,18 +2,164 @@ import asyncio
 import json
 from abc import ABC, abstractmethod
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Union, AsyncGenerator
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Optional, Union, AsyncGenerator, AsyncIterator, List, Tuple
 from functools import wraps
 from threading import Lock
 
 
+
+class ToolInstancePolicy(str, Enum):
+    """
+    工具实例策略
+
+    - SINGLETON: 全局共享一个实例，工具需保证并发安全（run不修改实例状态）
+    - POOLED: 维护pool_size个实例，每个实例同一时间只服务一个任务
+    - PER_REQUEST: 每次执行创建新实例，用完即关闭
+    """
+    SINGLETON = "singleton"
+    POOLED = "pooled"
+    PER_REQUEST = "per_request"
+
+
+class ToolCacheBackend(str, Enum):
+    """工具结果缓存的存储方式"""
+    MEMORY = "memory"  # 进程内
+    DISK = "disk"  # 持久化到磁盘，重启后依然有效（结果需可JSON序列化）
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """
+    工具结果缓存策略
+
+    工具类声明cache_policy后，执行器在调用run前按参数查询缓存，命中时直接使用缓存结果。
+    结果带随机性或依赖外部状态的工具（如图像生成、聊天、语音合成）不要声明。
+
+    Attributes:
+        ttl: 有效期（秒）
+        max_entries: 该工具最多缓存的条目数（LRU淘汰）
+        backend: 存储方式
+        key_params: 参与缓存键的参数，为None时使用全部参数（history始终不参与）
+        file_params: 值为本地文件路径的参数，缓存键使用文件内容哈希，文件内容变化后不会命中旧结果
+        file_dirs: 文件参数为相对路径时依次查找的目录（与工具自身解析路径的顺序一致）
+        bypass_params: 值非空时不查询也不写入缓存的参数（如远程URL，内容随时可能变化）
+    """
+    ttl: float = 600
+    max_entries: int = 256
+    backend: ToolCacheBackend = ToolCacheBackend.MEMORY
+    key_params: Optional[Tuple[str, ...]] = None
+    file_params: Tuple[str, ...] = ()
+    file_dirs: Tuple[str, ...] = ()
+    bypass_params: Tuple[str, ...] = ()
+
+
+class StreamingResult:
+    """
+    工具的流式输出
+
+    run返回该对象时，执行器逐段转发增量文本（delta事件），迭代结束后text为完整结果；
+    流式输出在run返回后才被消费，不能再依赖工具实例的状态
+    """
+
+    def __init__(self, chunks: AsyncIterator[str]):
+        self._chunks = chunks
+        self._parts: List[str] = []
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for chunk in self._chunks:
+            if chunk:
+                self._parts.append(chunk)
+                yield chunk
+        self.done = True
+
+    async def aclose(self) -> None:
+        """提前结束消费时关闭底层的增量输出（如模型服务的流式响应）"""
+        aclose = getattr(self._chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def __str__(self) -> str:
+        return self.text
+
+
 class BaseTool(ABC):
-    """原始工具基类保持不变"""
+    """
+    工具基类
+
+    生命周期：
+    1. __init__: 只做轻量的参数设置，获取描述时也会创建实例
+    2. setup: 加载模型、读取数据文件、建立客户端等重量级初始化，每个实例只执行一次
+    3. warmup: 可选的预热（如空跑一次推理），在服务启动时执行
+    4. run: 执行任务，文本类结果可返回StreamingResult进行流式输出
+       请求取消（如客户端断开）时run会收到CancelledError，随后调用cancel通知外部服务停止
+    5. close: 释放资源（显存、连接等）
+    """
+
+    # 实例策略，默认每次执行创建新实例
+    instance_policy: ToolInstancePolicy = ToolInstancePolicy.PER_REQUEST
+    # POOLED策略下的实例数量
+    pool_size: int = 1
+    # 描述中动态目录（如可用模型列表）的刷新间隔（秒），None表示描述是静态的
+    catalog_refresh_interval: Optional[float] = None
+    # 动态目录的提供者（"模块路径:类名"，需实现refresh_catalog和get_description），
+    # 工具模块导入较重时声明，延迟加载的工具未导入前也能刷新描述
+    catalog_provider: Optional[str] = None
+    # 结果缓存策略，None表示不缓存
+    cache_policy: Optional[ToolCachePolicy] = None
+    # 依赖的后端服务（对应config中HEALTH_CHECKS的backends），服务熔断时工具不参与规划，执行时直接失败
+    backends: Tuple[str, ...] = ()
 
     @abstractmethod
     def get_description(self) -> str:
         pass
 
+    async def setup(self) -> None:
+        """重量级资源初始化，默认无操作"""
+        pass
+
+    async def warmup(self) -> None:
+        """预热，默认无操作"""
+        pass
+
+    async def close(self) -> None:
+        """释放资源，默认无操作"""
+        pass
+
+    async def cancel(self) -> None:
+        """请求被取消时调用，中止本实例正在进行的外部任务（如ComfyUI生成、gradio任务），默认无操作"""
+        pass
+
+    async def refresh_catalog(self) -> None:
+        """刷新描述中的动态目录，由描述缓存在后台调用，get_description只读取刷新结果"""
+        pass
+
+    @classmethod
+    def is_result_reusable(cls, result: Any) -> bool:
+        """
+        结果是否为成功结果：能否写入缓存、命中后能否直接复用，执行器也据此记录依赖服务的成败
+
+        默认非空且不是{"error": ...}的结果均可，其它失败信息由工具覆盖排除
+        """
+        if isinstance(result, dict) and "error" in result:
+            return False
+        return result is not None and result != "" and not isinstance(result, StreamingResult)
+
+    @classmethod
+    def is_backend_failure(cls, result: Any) -> bool:
+        """
+        返回的失败结果是否说明依赖的后端服务出错（连接失败、超时、5xx等），执行器据此计入熔断
+
+        默认False；参数错误、本地查找失败等与服务无关的失败不应计入，由声明了backends的工具按需覆盖
+        """
+        return False
+
     @abstractmethod
     async def run(self, **kwargs) -> Any:
         """执行工具的异步方法"""
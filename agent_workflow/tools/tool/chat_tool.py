@@ -13,9 +13,9 @@ import json
 import os
 from typing import Optional, List
 
+from agent_workflow.core.context import current_context
 from agent_workflow.llm import LLM
-from agent_workflow.rag import LightsRAG
-from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.tools.tool.base import BaseTool, StreamingResult, ToolInstancePolicy
 from agent_workflow.utils import loadingInfo
 from config.bot import CHATBOT_PROMPT_DATA, BOT_DATA
 
@@ -24,6 +24,9 @@ logger = loadingInfo("chat_tool")
 class ChatTool(BaseTool):
     """聊天工具"""
 
+    # 无状态，全局共享一个实例
+    instance_policy = ToolInstancePolicy.SINGLETON
+
     def __init__(self, stream: bool = False, is_gpt: bool = False):
         self.stream = stream
         self.is_gpt = is_gpt
@@ -78,7 +81,7 @@ class ChatTool(BaseTool):
         }
         return json.dumps(tool_info, ensure_ascii=False)
 
-    async def run(self, **kwargs) -> str:
+    async def run(self, **kwargs) -> str | StreamingResult:
         try:
             message = kwargs.get("message", "")
             context = kwargs.get("context", [])
@@ -101,28 +104,46 @@ class ChatTool(BaseTool):
                 query=message,
             )
 
-            # 调用 LLM 生成回复
-            response = llm.chat(
+            # 调用方支持增量输出时流式返回，由执行器逐段转发
+            if self.stream or current_context().stream:
+                return StreamingResult(self._stream_chat(llm, system_prompt, message))
+
+            # 同步客户端放到线程中执行，避免阻塞其他请求
+            return await asyncio.to_thread(
+                llm.chat,
                 prompt=system_prompt,
                 message=message,
                 is_gpt=self.is_gpt
             )
 
-            if self.stream:
-                response_text = ""
-                for chunk in response:
-                    response_text += chunk
-                return response_text
-            return response
-
         except Exception as e:
             import traceback
             return f"对话失败: {str(e)}\n{traceback.format_exc()}"
 
+    async def _stream_chat(self, llm: LLM, system_prompt: str, message: str):
+        """流式对话，出错时与非流式一样以"对话失败"文本结束，不把异常抛给执行器"""
+        streamed = False
+        try:
+            async for chunk in llm.astream_chat(
+                    prompt=system_prompt,
+                    message=message,
+                    is_gpt=self.is_gpt
+            ):
+                streamed = True
+                yield chunk
+        except Exception as e:
+            logger.error(f"流式对话失败: {str(e)}")
+            # 已输出部分内容时另起一行，避免错误信息接在半句话后面
+            prefix = "\n" if streamed else ""
+            yield f"{prefix}对话失败: {str(e)}"
+
 
 class RagQATool(BaseTool):
     """RAG知识库问答工具"""
 
+    # run会修改query/rag_names，每次执行使用新实例
+    instance_policy = ToolInstancePolicy.PER_REQUEST
+
     def __init__(self, query: str = None, rag_names: List[str] = None):
         """
         初始化RAG问答工具
@@ -164,6 +185,9 @@ class RagQATool(BaseTool):
             self.rag_names = kwargs.get('rag_names', self.rag_names)
             results = []
 
+            # 延迟导入，纯聊天场景不加载lightrag
+            from agent_workflow.rag import LightsRAG
+
             for rag_name in self.rag_names:
                 path = os.path.join('data', 'rag_data', rag_name)
                 rag = LightsRAG(path_name=str(path))
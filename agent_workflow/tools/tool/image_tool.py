@@ -8,6 +8,7 @@
 Copyright (c) 2024 [PanXingFeng]
 All rights reserved.
 """
+import asyncio
 import base64
 import json
 import os
@@ -22,12 +23,15 @@ from pydantic import BaseModel, Field
 
 from agent_workflow.llm.llm import LLM
 from agent_workflow.rag.lightrag_mode import LightsRAG
-from agent_workflow.tools.tool.base import BaseTool, images_tool_prompts, get_prompts
+from agent_workflow.tools.catalogs import ImageGeneratorCatalog
+from agent_workflow.tools.tool.base import BaseTool, ToolInstancePolicy, images_tool_prompts, get_prompts
 from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.executors import ExecutionClass, run_in_executor
+from agent_workflow.utils.gpu_scheduler import gpu_scheduler
 from agent_workflow.utils.forge_webui_generator import ForgeImageGenerator
 from agent_workflow.utils.forge_api import  ForgeAPI
 from agent_workflow.utils.comfyui_api import ComfyuiAPI
-from config.tool_config import QUALITY_PROMPTS, NEGATIVE_PROMPTS, COMFYUI_MODEL, FORGE_MODEL, IMAGE_GEN_TOOL_DATA, \
+from config.tool_config import QUALITY_PROMPTS, NEGATIVE_PROMPTS, IMAGE_GEN_TOOL_DATA, \
     DESCRIPTION_IMAGE_TOOL_DATA
 
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
@@ -366,6 +370,10 @@ class DescriptionImageTool(BaseTool):
         "analyze_scene": "请分析这个场景的环境特征。"
     }
 
+    # 本地模型占用显存，同一时间只允许一个任务使用
+    instance_policy = ToolInstancePolicy.POOLED
+    pool_size = 1
+
     def __init__(self, model: str = DescriptionModelType.LLAMA):
         """初始化图像识别工具
         Args:
@@ -377,6 +385,19 @@ class DescriptionImageTool(BaseTool):
         self.model = DESCRIPTION_IMAGE_TOOL_DATA['model'] if DESCRIPTION_IMAGE_TOOL_DATA['model'] else model
         self.model_components = None
 
+    async def close(self) -> None:
+        """释放仍驻留的本地模型"""
+        if self.model_components:
+            await run_in_executor(ExecutionClass.IO, self._release_model)
+        gpu_scheduler.forget(DescriptionModelType(self.model).value)
+
+    def _release_model(self):
+        """将本地模型移出显存并清理CUDA缓存"""
+        if self.model_components:
+            self.model_components['model'].cpu()
+            self.model_components = None
+            torch.cuda.empty_cache()
+
     def get_description(self) -> str:
         """
         返回工具的描述信息，包括名称、功能和所需参数。
@@ -684,25 +705,14 @@ class DescriptionImageTool(BaseTool):
                 output[0][len(inputs["input_ids"][0]):], skip_special_tokens=True
             )
 
-            # 清理显存
-            if self.model_components:
-                self.model_components['model'].cpu()
-                del self.model_components['model']
-                del self.model_components['tokenizer']
-                del self.model_components['processor']
-                self.model_components = None
-                torch.cuda.empty_cache()
+            # 启用GPU调度时模型保持驻留，由调度器在空闲或显存不足时释放；否则用完即释放
+            if not gpu_scheduler.enabled:
+                self._release_model()
 
             return {"message": {"content": content}}
         except Exception as e:
             # 确保即使发生错误也清理显存
-            if self.model_components:
-                self.model_components['model'].cpu()
-                del self.model_components['model']
-                del self.model_components['tokenizer']
-                del self.model_components['processor']
-                self.model_components = None
-                torch.cuda.empty_cache()
+            self._release_model()
             raise e
 
     def _analyze_with_minicpm(self, image_path: str, task_type: ImageTaskType, user_question: Optional[str]) -> Dict[
@@ -759,18 +769,17 @@ class DescriptionImageTool(BaseTool):
             return {"message": {"content": output}}
 
         except Exception as e:
+            try:
+                self._release_model()
+            except Exception as cleanup_error:
+                print(f"清理资源时发生错误: {cleanup_error}")
             return {"error": str(e)}
 
         finally:
-            # 无论是否发生异常，都确保清理资源
-            if self.model_components:
+            # 启用GPU调度时模型保持驻留，由调度器在空闲或显存不足时释放；否则用完即释放
+            if not gpu_scheduler.enabled:
                 try:
-                    self.model_components['model'].cpu()  # 先将模型移到 CPU
-                    del self.model_components['model']  # 删除模型
-                    del self.model_components['tokenizer']  # 删除分词器
-                    self.model_components = None
-                    import torch
-                    torch.cuda.empty_cache()  # 清空 CUDA 缓存
+                    self._release_model()
                 except Exception as cleanup_error:
                     print(f"清理资源时发生错误: {cleanup_error}")
 
@@ -846,8 +855,14 @@ class DescriptionImageTool(BaseTool):
             if not task_type or task_type not in ImageTaskType.list_tasks():
                 return f"错误: 无效或未提供任务类型。支持的任务类型: {ImageTaskType.list_tasks()}"
 
-            # 执行分析
-            response = self.analyze_image(image_path, task_type=task_type, user_question=user_question)
+            # 执行分析：Ollama为阻塞HTTP请求；本地模型（GLM/MiniCPM）经GPU调度器准入后在GPU执行器中推理
+            if self.model == DescriptionModelType.LLAMA:
+                response = await run_in_executor(ExecutionClass.IO, self.analyze_image, image_path,
+                                                 task_type=task_type, user_question=user_question)
+            else:
+                async with gpu_scheduler.job(DescriptionModelType(self.model).value, unload=self.close):
+                    response = await run_in_executor(ExecutionClass.GPU, self.analyze_image, image_path,
+                                                     task_type=task_type, user_question=user_question)
             if "error" in response:
                 return f"分析失败: {response['error']}"
 
@@ -906,6 +921,20 @@ class ImageGeneratorTool(BaseTool):
         }
     }
 
+    # 本地管道占用显存，加载一次后复用，同一时间只允许一个任务使用
+    instance_policy = ToolInstancePolicy.POOLED
+    pool_size = 1
+
+    # 可用模型/LoRA目录，由后台任务通过refresh_catalog定时刷新，所有实例共享；
+    # 目录和描述由不依赖torch的ImageGeneratorCatalog提供，工具未加载时也能刷新
+    catalog_refresh_interval = IMAGE_GEN_TOOL_DATA.get('catalog_refresh_interval', 300)
+    catalog_provider = "agent_workflow.tools.catalogs:ImageGeneratorCatalog"
+    # 使用ComfyUI/Forge生图时依赖对应服务，本地模型不依赖外部服务
+    backends = {
+        GenerationModelType.COMFYUI.value: ("comfyui",),
+        GenerationModelType.SDWEBUI_FORGE.value: ("forge",)
+    }.get(IMAGE_GEN_TOOL_DATA['model_type'] or GenerationModelType.COMFYUI.value, ())
+
     def __init__(self, model_type: str = GenerationModelType.COMFYUI,
                  prompt_gen_mode: str = PromptGenMode.NONE,
                  use_local: bool = True):
@@ -919,49 +948,43 @@ class ImageGeneratorTool(BaseTool):
         self.model_type = IMAGE_GEN_TOOL_DATA['model_type'] if IMAGE_GEN_TOOL_DATA['model_type'] else model_type
         self.use_local = use_local
         self.prompt_mode = IMAGE_GEN_TOOL_DATA['prompt_mode'] if IMAGE_GEN_TOOL_DATA['prompt_mode'] else prompt_gen_mode
-        if model_type not in [GenerationModelType.SDWEBUI_FORGE,GenerationModelType.COMFYUI]:
-            self._setup_model()
+        self.pipe = None
+
+    @property
+    def gpu_model_name(self) -> str:
+        """GPU调度器中的模型名（对应GPU_SCHEDULER中的models）"""
+        return GenerationModelType(self.model_type).value
+
+    async def setup(self) -> None:
+        """本地模型（flux/sd3）加载管道，经GPU调度器准入，加载后保持驻留直到被调度器释放"""
+        if self.pipe is None and self.model_type in [GenerationModelType.FLUX_1_DEV, GenerationModelType.SD3_5_LARGE]:
+            async with gpu_scheduler.job(self.gpu_model_name, unload=self.close, workspace_mb=0):
+                if self.pipe is None:
+                    await run_in_executor(ExecutionClass.GPU, self._setup_model)
+
+    async def close(self) -> None:
+        """释放本地管道占用的显存"""
+        if self.pipe is not None:
+            self.pipe = None
+            torch.cuda.empty_cache()
+        gpu_scheduler.forget(self.gpu_model_name)
+
+    async def cancel(self) -> None:
+        """中止正在进行的生成：ComfyUI/Forge通知服务端中断，本地管道在下一个采样步退出"""
+        if self.model_type == GenerationModelType.COMFYUI:
+            await asyncio.to_thread(ComfyuiAPI().interrupt)
+        elif self.model_type == GenerationModelType.SDWEBUI_FORGE:
+            await asyncio.to_thread(ForgeAPI().interrupt)
+        elif self.pipe is not None:
+            self.pipe._interrupt = True
+
+    async def refresh_catalog(self) -> None:
+        """刷新可用的基础模型和LoRA列表（在线程中请求，不阻塞事件循环）"""
+        await ImageGeneratorCatalog(self.model_type).refresh_catalog()
 
     def get_description(self) -> str:
-        """获取工具描述信息，包括支持的模型和功能说明"""
-        global supported_models, supported_loras
-        if self.model_type == GenerationModelType.SDWEBUI_FORGE:
-            supported_models = ForgeAPI().get_models()
-            supported_loras = ForgeAPI().get_loras()
-            return json.dumps({
-                "name": "ImageGeneratorTool",
-                "description": f"""AI图像生成工具，
-                                           model_name可只支持模型<{supported_models}>,
-                                           根据用户描述的内容进行选择更合适的基础模型，如果无法选择到适应的基础模型就返回默认值:<{FORGE_MODEL}>,
-                                           lora_name可支持模型<{supported_loras}>,
-                                           根据用户的描述选择更合适的lora风格模型,支持两个lora配置(基础风格lora和场景lora),无lora可选时使用默认值:<aidmaImageUpraderv0.3>,
-                                           如果用户的内容,在支持的模型中只有lora_name的模型符合，就使用基础模型<F.1基础算法模型>和对应的lora_name,
-                                           model_name和lora_name必须是可支持模型中的名称,禁止修改成英文,""",
-                "parameters": {
-                    "prompt": {"type": "string", "description": "必须是英文内容的提示词", "required": True},
-                    "lora_name": {
-                        "type": "array",
-                        "items": {
-                            "type": "string"
-                        },
-                        "description": "风格模型列表"
-                    },
-                    "model_name": {"type": "string", "description": "生图的基础模型"}
-                }
-            }, ensure_ascii=False, indent=2)
-        elif self.model_type == GenerationModelType.COMFYUI:
-            supported_models = ComfyuiAPI().get_models()
-            return json.dumps({
-                "name": "ImageGeneratorTool",
-                "description": f"""AI图像生成工具，
-                                           model_name可只支持模型<{supported_models}>,
-                                           根据用户描述的内容进行选择更合适的基础模型，如果无法选择到适应的基础模型就返回默认值:<{COMFYUI_MODEL}>,
-                                           model_name必须是可支持模型中的名称,禁止修改成英文,""",
-                "parameters": {
-                    "prompt": {"type": "string", "description": "必须是英文内容的提示词", "required": True},
-                    "model_name": {"type": "string", "description": "生图的基础模型"}
-                }
-            }, ensure_ascii=False, indent=2)
+        """获取工具描述信息，包括支持的模型和功能说明（模型目录取自缓存，未刷新前只包含默认模型）"""
+        return ImageGeneratorCatalog(self.model_type).get_description()
 
     def _setup_model(self):
         """设置模型配置，包括加载模型和设置优化参数"""
@@ -999,6 +1022,11 @@ class ImageGeneratorTool(BaseTool):
                 self.pipe.enable_vae_tiling()
             torch.backends.cuda.matmul.allow_tf32 = True
 
+    @classmethod
+    def is_backend_failure(cls, result) -> bool:
+        """生成过程中的异常被捕获后返回None（ComfyUI/Forge请求失败等），"不支持这个模型"不计入"""
+        return result is None
+
     async def run(self, **kwargs) -> list[str] | str | list[Any] | Any:
         """运行图像生成
 
@@ -1034,8 +1062,10 @@ class ImageGeneratorTool(BaseTool):
                 lora_prompt = ForgeAPI().add_loras_to_prompt(prompt, kwargs.get("lora_name"))
                 final_prompt = f"{base_trigger_word}, {lora_prompt}" if base_trigger_word else lora_prompt
 
-                # 生成图像
-                img_path, info_text = generator.run(
+                # 生成图像（在I/O执行器中等待，请求取消时可及时响应）
+                img_path, info_text = await run_in_executor(
+                    ExecutionClass.IO,
+                    generator.run,
                     prompt=final_prompt,
                     model_name=kwargs.get("model_name"),
                     sampling_method=base_model_config['sampling_method'] if base_model_config.get(
@@ -1056,7 +1086,9 @@ class ImageGeneratorTool(BaseTool):
                 config = ComfyuiGenerationConfig(**kwargs)
                 generator = ComfyuiAPI()
 
-                img_path = generator.run(
+                img_path = await run_in_executor(
+                    ExecutionClass.IO,
+                    generator.run,
                     task_mode=kwargs.get("task_mode") if kwargs.get("task_mode") else config.task_mode,
                     model_name=kwargs.get("model_name"),
                     prompt_text=kwargs.get("prompt") if kwargs.get("prompt") else config.prompt + QUALITY_PROMPTS,
@@ -1096,8 +1128,11 @@ class ImageGeneratorTool(BaseTool):
                 if model_info.get("use_negative_prompt"):
                     generation_args["negative_prompt"] = config.negative_prompt
 
-                # 生成并保存图像
-                images = self.pipe(**generation_args).images
+                # 生成并保存图像（管道被调度器释放后在任务中重新加载）
+                async with gpu_scheduler.job(self.gpu_model_name, unload=self.close):
+                    if self.pipe is None:
+                        await run_in_executor(ExecutionClass.GPU, self._setup_model)
+                    images = (await run_in_executor(ExecutionClass.GPU, self.pipe, **generation_args)).images
                 img_path = [self._save_image(img, idx, output_dir) for idx, img in enumerate(images)]
                 return img_path
 
@@ -9,6 +9,7 @@ Copyright (c) 2024 [PanXingFeng]
 All rights reserved.
 """
 import asyncio
+import inspect
 import json
 import os
 import platform
@@ -26,8 +27,9 @@ from pptx.util import Inches
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
-from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.tools.tool.base import BaseTool, ToolCacheBackend, ToolCachePolicy, ToolInstancePolicy
 from agent_workflow.utils import loadingInfo
+from agent_workflow.utils.executors import ExecutionClass, offload
 
 # 设置Ghostscript环境变量
 os.environ["PATH"] += r";C:\Program Files\gs\gs10.04.0\bin"
@@ -97,6 +99,20 @@ class FileConverterTool(BaseTool):
         poppler_path: Poppler工具路径
     """
 
+    # 转换方法不修改实例状态，全局共享一个实例
+    instance_policy = ToolInstancePolicy.SINGLETON
+    # 同一文件（按内容哈希）同一转换类型直接复用已生成的输出文件，重启后依然有效；
+    # 网页转PDF的内容随时可能变化，不缓存
+    cache_policy = ToolCachePolicy(
+        ttl=7 * 24 * 3600,
+        max_entries=500,
+        backend=ToolCacheBackend.DISK,
+        key_params=("conversion_type", "input_path"),
+        file_params=("input_path",),
+        file_dirs=("upload", os.path.join("upload", "files")),
+        bypass_params=("url",)
+    )
+
     def __init__(self, output_directory: str = "output", printInfo: bool = False):
         """
         初始化文件转换工具
@@ -112,7 +128,16 @@ class FileConverterTool(BaseTool):
         self.printInfo = printInfo
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.poppler_path = os.path.join(self.base_dir, "poppler", "bin")
+        self._ready = False
+
+    async def setup(self) -> None:
+        """初始化目录、检查Poppler并注册字体（只执行一次）"""
+        if not self._ready:
+            await asyncio.to_thread(self._prepare_environment)
+            self._ready = True
 
+    def _prepare_environment(self):
+        """准备转换所需的运行环境"""
         # 初始化目录
         self._ensure_directories()
 
@@ -696,6 +721,7 @@ class FileConverterTool(BaseTool):
             return None
 
 
+    @offload(ExecutionClass.CPU)
     def pdf_to_presentation(self, pdf_path: str, output_format: str = 'pptx') -> Optional[str]:
         """
         将PDF文档转换为演示文稿（PPT）
@@ -790,6 +816,7 @@ class FileConverterTool(BaseTool):
             return None
 
 
+    @offload(ExecutionClass.CPU)
     def pdf_to_image(self, pdf_path: str, image_format: str = 'png',
                      single_or_multiple: str = 'multiple',
                      color_type: str = 'color', dpi: str = '300') -> Optional[str]:
@@ -875,6 +902,7 @@ class FileConverterTool(BaseTool):
             return None
 
 
+    @offload(ExecutionClass.CPU)
     def pdf_to_markdown(self, pdf_path: str, output_dir: str = "output"):
         """
         将PDF转换为Markdown格式
@@ -918,6 +946,7 @@ class FileConverterTool(BaseTool):
             return None
 
 
+    @offload(ExecutionClass.IO)
     def markdown_to_pdf(self, markdown_path: str) -> Optional[str]:
         """
         将Markdown转换为PDF
@@ -1007,6 +1036,7 @@ class FileConverterTool(BaseTool):
             return None
 
 
+    @offload(ExecutionClass.IO)
     def file_to_pdf(self, file_path: str) -> Optional[str]:
         """
         通用文件转PDF方法
@@ -1063,6 +1093,11 @@ class FileConverterTool(BaseTool):
             return None
 
 
+    @classmethod
+    def is_result_reusable(cls, result) -> bool:
+        """转换结果为输出文件路径，文件仍存在时才能复用"""
+        return isinstance(result, str) and os.path.isfile(result)
+
     async def run(self, **kwargs) -> str:
         """
         执行文件转换的统一入口
@@ -1086,6 +1121,8 @@ class FileConverterTool(BaseTool):
             if not input_path:
                 return "转换失败: 缺少输入路径参数"
 
+            await self.setup()
+
             # 根据类型调用相应方法
             conversion_methods = {
                 "url_to_pdf": self.url_to_pdf,
@@ -1102,11 +1139,10 @@ class FileConverterTool(BaseTool):
             if not converter:
                 return f"不支持的转换类型: {conversion_type}"
 
-            # 根据方法是否是协程决定调用方式
-            if asyncio.iscoroutinefunction(converter):
-                result = await converter(input_path)
-            else:
-                result = converter(input_path)
+            # 渲染、转换等阻塞方法由offload分发到执行器，调用返回协程
+            result = converter(input_path)
+            if inspect.isawaitable(result):
+                result = await result
 
             # 处理转换结果
             if result:
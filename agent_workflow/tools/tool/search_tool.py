@@ -15,7 +15,7 @@ import json
 
 from pydantic import BaseModel, Field
 
-from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.tools.tool.base import BaseTool, ToolCachePolicy, ToolInstancePolicy
 from agent_workflow.utils.loading import LoadingIndicator
 from config.config import SEARCH_TOOL_OLLAMA_CONFIG, SEARCH_TOOL_EMBEDDING_CONFIG
 
@@ -118,6 +118,12 @@ class SearchTool(BaseTool):
         embedding_model: 嵌入模型配置
     """
 
+    # run不修改实例状态，全局共享一个实例
+    instance_policy = ToolInstancePolicy.SINGLETON
+    # 相同查询1小时内直接使用缓存
+    cache_policy = ToolCachePolicy(ttl=3600, max_entries=512, key_params=("query", "focus_mode", "optimization_mode"))
+    backends = ("perplexica",)
+
     def __init__(self,
                  query: str = None,
                  base_url: str = "http://localhost:3001",
@@ -291,6 +297,17 @@ class SearchTool(BaseTool):
             return {"error": f"发生错误: {str(e)}"}
 
 
+    @classmethod
+    def is_result_reusable(cls, result) -> bool:
+        """只缓存格式化成功的搜索结果"""
+        return isinstance(result, dict) and "answer" in result
+
+    @classmethod
+    def is_backend_failure(cls, result) -> bool:
+        """Perplexica请求失败（超时、连接错误、HTTP错误），其错误信息保留在raw_data中"""
+        return (isinstance(result, dict) and isinstance(result.get("raw_data"), dict)
+                and "error" in result["raw_data"])
+
     async def run(self, **kwargs) -> str | dict[str, Any]:
         try:
             query = kwargs.get("query", self.query)
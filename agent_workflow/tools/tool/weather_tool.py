@@ -8,6 +8,7 @@
 Copyright (c) 2024 [PanXingFeng]
 All rights reserved.
 """
+import asyncio
 import json
 import os
 from enum import Enum
@@ -17,7 +18,7 @@ import httpx
 from pydantic import BaseModel, Field
 
 from config.tool_config import GAODE_WEATHER_API_KEY
-from agent_workflow.tools.tool.base import BaseTool
+from agent_workflow.tools.tool.base import BaseTool, ToolCachePolicy, ToolInstancePolicy
 
 
 class WeatherResponse(BaseModel):
@@ -88,6 +89,12 @@ class WeatherTool(BaseTool):
         df: 区域编码数据表
     """
 
+    # 区域编码表只读，run不修改实例状态，全局共享一个实例
+    instance_policy = ToolInstancePolicy.SINGLETON
+    # 实况天气约每半小时更新，同一地点10分钟内直接使用缓存
+    cache_policy = ToolCachePolicy(ttl=600, max_entries=256, key_params=("location",))
+    backends = ("gaode",)
+
     def __init__(self, location: str = None,
                  api_key: str = GAODE_WEATHER_API_KEY,
                  base_url: str = "https://restapi.amap.com/v3/weather/weatherInfo",
@@ -107,7 +114,13 @@ class WeatherTool(BaseTool):
         self.location = location
         self.base_url = base_url
         self.timeout = timeout
-        self._init_region_lookup(region_data_path)
+        self.region_data_path = region_data_path
+        self.region_lookup = None
+
+    async def setup(self) -> None:
+        """加载区域编码表（读取xlsx较慢，放到线程中执行）"""
+        if self.region_lookup is None:
+            await asyncio.to_thread(self._init_region_lookup, self.region_data_path)
 
 
     def get_description(self):
@@ -266,10 +279,13 @@ class WeatherTool(BaseTool):
 {format_line("🕒", "发布时间", weather_data.reporttime)}
 {border}"""
 
-    async def query_weather(self) -> str:
+    async def query_weather(self, location: str) -> str:
         """
         查询指定地点的天气信息
 
+        Args:
+            location: 查询位置
+
         功能流程：
         1. 获取地区编码
         2. 调用天气API
@@ -280,9 +296,9 @@ class WeatherTool(BaseTool):
             str: 格式化的天气信息
         """
         try:
-            adcode, matched_name, level = self._get_adcode(self.location)
+            adcode, matched_name, level = self._get_adcode(location)
             if not adcode:
-                return f"未找到{self.location}的区域编码"
+                return f"未找到{location}的区域编码"
 
             params = {
                 "city": adcode,
@@ -316,6 +332,16 @@ class WeatherTool(BaseTool):
         except Exception as e:
             return f"天气查询失败：{str(e)}"
 
+    @classmethod
+    def is_result_reusable(cls, result) -> bool:
+        """只缓存查询成功的天气信息"""
+        return isinstance(result, str) and "天气信息" in result and not cls.is_backend_failure(result)
+
+    @classmethod
+    def is_backend_failure(cls, result) -> bool:
+        """请求高德接口失败（异常或接口返回错误）；区域编码未找到、缺少位置等输入问题不计入"""
+        return isinstance(result, str) and result.startswith(("天气查询失败", "获取天气信息失败"))
+
     async def run(self, **kwargs) -> str:
         """
         工具执行入口
@@ -326,7 +352,8 @@ class WeatherTool(BaseTool):
         Returns:
             str: 查询结果或错误信息
         """
-        self.location = kwargs.get('location', self.location)
-        if not self.location:
+        location = kwargs.get('location', self.location)
+        if not location:
             return "错误：未提供位置参数"
-        return await self.query_weather()
+        await self.setup()
+        return await self.query_weather(location)
@@ -352,8 +352,9 @@ class ComfyuiAPI:
 
         return True
 
-    def get_models(self, models_dir: str = os.path.join(COMFYUI_PATH, COMFYUI_MODEL_PATH)) -> list:
-        """遍历指定目录下的模型文件"""
+    @staticmethod
+    def get_models(models_dir: str = os.path.join(COMFYUI_PATH, COMFYUI_MODEL_PATH)) -> list:
+        """遍历指定目录下的模型文件（静态方法，无需建立WebSocket连接）"""
         model_files = []
         if os.path.exists(models_dir):
             for file in os.listdir(models_dir):
@@ -374,6 +375,28 @@ class ComfyuiAPI:
         except Exception as e:
             logger.error(f"关闭连接时出错: {e}")
 
+    def interrupt(self) -> bool:
+        """
+        中止当前生成任务：从队列中删除尚未执行的任务，中断正在执行的任务，并结束run中的等待
+
+        Returns:
+            bool: 是否成功通知ComfyUI
+        """
+        prompt_id = getattr(self, '_prompt_id', None)
+        try:
+            if prompt_id:
+                requests.post(f"http://{self.server_url}/queue", json={"delete": [prompt_id]}, timeout=5)
+            response = requests.post(f"http://{self.server_url}/interrupt", timeout=5)
+            logger.info(f"已中断生成任务: {prompt_id}")
+            return response.ok
+        except Exception as e:
+            logger.error(f"中断生成任务失败: {e}")
+            return False
+        finally:
+            event = getattr(self, '_generation_event', None)
+            if event is not None:
+                event.set()
+
     def run(self,
             task_mode: str = "基础文生图",
             model_name: str = None,
@@ -451,9 +474,11 @@ class ComfyuiAPI:
                 )
                 if not response.ok:
                     return None
+                self._prompt_id = response.json().get("prompt_id")
 
                 # 等待生成完成
                 generation_successful = threading.Event()
+                self._generation_event = generation_successful
 
                 def save_callback(success: bool):
                     if success:
@@ -461,7 +486,7 @@ class ComfyuiAPI:
 
                 self._save_callback = save_callback
 
-                # 等待生成完成或超时
+                # 等待生成完成或超时（interrupt也会结束等待）
                 if generation_successful.wait(timeout):
                     if Path(expected_image_path).exists():
                         return expected_image_path
@@ -476,6 +501,10 @@ class ComfyuiAPI:
                     delattr(self, '_save_path')
                 if hasattr(self, '_image_filename'):
                     delattr(self, '_image_filename')
+                if hasattr(self, '_generation_event'):
+                    delattr(self, '_generation_event')
+                if hasattr(self, '_prompt_id'):
+                    delattr(self, '_prompt_id')
 
         except Exception:
             return None
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+from typing import List, Optional
+
+import numpy as np
+from langchain_ollama import OllamaEmbeddings
+
+from config.config import OLLAMA_DATA
+
+
+class EmbeddingClient:
+    """
+    异步向量化客户端
+
+    基于ollama部署的embedding模型（默认bge-m3），
+    供规划缓存、工具检索等模块做语义相似度匹配
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or OLLAMA_DATA['embedding_model']
+        self.embeddings = OllamaEmbeddings(model=self.model)
+
+    async def embed_query(self, text: str) -> List[float]:
+        """将单条文本转换为向量"""
+        return await self.embeddings.aembed_query(text)
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """批量将文本转换为向量"""
+        return await self.embeddings.aembed_documents(texts)
+
+
+def cosine_similarity(vector1: List[float], vector2: List[float]) -> float:
+    """
+    计算两个向量的余弦相似度
+
+    Returns:
+        float: 相似度，范围从 -1 到 1
+    """
+    magnitude = np.linalg.norm(vector1) * np.linalg.norm(vector2)
+    if not magnitude:
+        return 0.0
+    return float(np.dot(vector1, vector2) / magnitude)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import contextvars
+import functools
+import importlib
+import inspect
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .loading import loadingInfo
+
+logger = loadingInfo("executors")
+
+
+class ExecutionClass(str, Enum):
+    """
+    执行类别，决定同步工作在哪个执行器中运行
+
+    - ASYNC: 原生异步，直接在事件循环中执行（默认）
+    - IO: 阻塞I/O（同步HTTP请求、等待外部服务、子进程），线程池
+    - CPU: CPU密集计算（PDF渲染、图像编码），进程池；函数和参数需可pickle，否则退回线程池
+    - GPU: 显卡推理，单线程执行器，同一时间只有一个GPU任务，避免显存争用
+    """
+    ASYNC = "async"
+    IO = "io"
+    CPU = "cpu"
+    GPU = "gpu"
+
+
+class ExecutorRegistry:
+    """
+    按执行类别管理执行器（首次使用时创建）
+
+    io_workers/cpu_workers为None时使用concurrent.futures的默认数量
+    """
+
+    def __init__(self, io_workers: Optional[int] = None, cpu_workers: Optional[int] = None, gpu_workers: int = 1):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.gpu_workers = max(1, gpu_workers)
+        self._executors: Dict[ExecutionClass, Executor] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, io_workers: Optional[int] = None, cpu_workers: Optional[int] = None,
+                  gpu_workers: int = 1) -> None:
+        """修改执行器数量，只对尚未创建的执行器生效"""
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.gpu_workers = max(1, gpu_workers)
+
+    def get(self, execution_class: ExecutionClass) -> Executor:
+        """获取执行类别对应的执行器"""
+        with self._lock:
+            executor = self._executors.get(execution_class)
+            if executor is None:
+                executor = self._create(execution_class)
+                self._executors[execution_class] = executor
+            return executor
+
+    def _create(self, execution_class: ExecutionClass) -> Executor:
+        if execution_class == ExecutionClass.CPU:
+            # spawn：子进程不继承父进程的线程和事件循环状态（Windows下也是默认方式）
+            return ProcessPoolExecutor(max_workers=self.cpu_workers, mp_context=multiprocessing.get_context("spawn"))
+        if execution_class == ExecutionClass.GPU:
+            return ThreadPoolExecutor(max_workers=self.gpu_workers, thread_name_prefix="gpu")
+        return ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="io")
+
+    def reset(self, execution_class: ExecutionClass) -> None:
+        """丢弃执行器（如进程池崩溃），下次使用时重新创建"""
+        with self._lock:
+            executor = self._executors.pop(execution_class, None)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """关闭全部执行器"""
+        with self._lock:
+            executors, self._executors = list(self._executors.values()), {}
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# 全局执行器
+executors = ExecutorRegistry()
+
+
+def _function_ref(func: Callable) -> Optional[Tuple[str, str]]:
+    """模块级函数或类方法的引用（模块名, 限定名），用于在子进程中重新定位函数"""
+    func = inspect.unwrap(getattr(func, "__func__", func))
+    module, qualname = getattr(func, "__module__", None), getattr(func, "__qualname__", "")
+    if not module or "<locals>" in qualname or "<lambda>" in qualname:
+        return None
+    return module, qualname
+
+
+def _invoke(ref: Tuple[str, str], args: tuple, kwargs: dict) -> Any:
+    """子进程入口：定位函数，去掉offload包装后调用"""
+    target: Any = importlib.import_module(ref[0])
+    for name in ref[1].split("."):
+        target = getattr(target, name)
+    return inspect.unwrap(target)(*args, **kwargs)
+
+
+async def run_in_executor(execution_class: ExecutionClass, func: Callable, *args, **kwargs) -> Any:
+    """
+    在执行类别对应的执行器中运行同步函数
+
+    线程执行器会携带当前contextvar（如请求上下文）；CPU类别的函数或参数无法pickle时退回I/O线程池
+    """
+    execution_class = ExecutionClass(execution_class)
+    if execution_class == ExecutionClass.ASYNC:
+        return func(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    if execution_class == ExecutionClass.CPU:
+        bound_self = getattr(func, "__self__", None)
+        call_args = (bound_self, *args) if bound_self is not None else args
+        ref = _function_ref(func)
+        try:
+            if ref is None:
+                raise pickle.PicklingError("函数不是模块级定义")
+            pickle.dumps((call_args, kwargs))
+        except Exception as e:
+            logger.warning(f"{getattr(func, '__qualname__', func)} 无法在进程池中执行，改用线程池: {str(e)}")
+            execution_class = ExecutionClass.IO
+        else:
+            try:
+                return await loop.run_in_executor(executors.get(ExecutionClass.CPU), _invoke, ref, call_args, kwargs)
+            except BrokenProcessPool:
+                executors.reset(ExecutionClass.CPU)
+                raise
+
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executors.get(execution_class),
+                                      functools.partial(context.run, func, *args, **kwargs))
+
+
+def offload(execution_class: ExecutionClass) -> Callable:
+    """
+    声明同步方法的执行类别，调用后返回协程，在对应执行器中运行
+
+    用法：
+        @offload(ExecutionClass.CPU)
+        def pdf_to_image(self, pdf_path): ...
+
+        result = await tool.pdf_to_image(path)
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_in_executor(execution_class, func, *args, **kwargs)
+
+        wrapper.execution_class = ExecutionClass(execution_class)
+        return wrapper
+
+    return decorator
+
@@ -55,6 +55,20 @@ class ForgeAPI:
         response.raise_for_status()
         return response.json()
 
+    def interrupt(self) -> bool:
+        """
+        中断正在进行的生成任务
+
+        Returns:
+            是否成功
+        """
+        try:
+            self._post("/sdapi/v1/interrupt", {})
+            return True
+        except Exception as e:
+            print(f"中断生成任务失败: {e}")
+            return False
+
     def get_models(self) -> List[str]:
         """
         获取所有可用的SD模型名称
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import inspect
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from .loading import loadingInfo
+from .metrics import metrics
+
+logger = loadingInfo("gpu_scheduler")
+
+
+class GPUMemoryError(RuntimeError):
+    """GPU任务无法获得显存（排队超时）"""
+
+
+@dataclass
+class ResidentModel:
+    """驻留在显存中的模型"""
+    name: str
+    footprint_mb: int
+    unload: Optional[Callable[[], Any]] = None  # 释放显存的回调，None表示不可驱逐
+    active_jobs: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    idle_timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def evictable(self) -> bool:
+        return self.active_jobs == 0 and self.unload is not None
+
+
+@dataclass
+class _Waiter:
+    model: str
+    footprint_mb: int
+    workspace_mb: int
+    unload: Optional[Callable[[], Any]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class GPUScheduler:
+    """
+    显存感知的GPU任务调度器
+
+    功能：
+    1. 按模型显存占用（权重常驻 + 单次任务的工作显存）做准入，放得下的模型可同时驻留、同时执行
+    2. 显存不足时按LRU驱逐空闲模型（调用其unload回调），仍不足则排队（先进先出，避免大任务饿死）
+    3. 模型空闲超过idle_ttl后自动驱逐
+    4. 导出队列深度、驻留模型和显存占用（stats / metrics）
+
+    total_memory_mb为None时从CUDA读取显存大小；无GPU的机器可配置模拟显存预算进行测试，
+    两者都没有时不做限制（只统计）
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.total_memory_mb: Optional[int] = None
+        self.reserve_mb = 0
+        self.idle_ttl: Optional[float] = None
+        self.queue_timeout: Optional[float] = None
+        self.default_footprint_mb = 0
+        self.footprints: Dict[str, Dict[str, int]] = {}
+        self._resident: Dict[str, ResidentModel] = {}
+        self._workspace_mb = 0  # 运行中任务的工作显存
+        self._waiters: Deque[_Waiter] = deque()
+        self._running = 0
+
+    def configure(self, enabled: bool = True, total_memory_mb: Optional[int] = None, reserve_mb: int = 0,
+                  idle_ttl: Optional[float] = None, queue_timeout: Optional[float] = None,
+                  default_footprint_mb: int = 0, models: Optional[Dict[str, Dict[str, int]]] = None) -> None:
+        """
+        配置调度器
+
+        Args:
+            total_memory_mb: 显存预算（MB），None表示从CUDA读取
+            reserve_mb: 预留给CUDA上下文、碎片等的显存
+            idle_ttl: 模型空闲多久后驱逐（秒），None表示只在显存不足时驱逐
+            queue_timeout: 排队的最长时间（秒），None表示一直等待
+            default_footprint_mb: 未登记模型的默认显存占用
+            models: {模型名: {"footprint_mb": 权重常驻显存, "workspace_mb": 单次任务的工作显存}}
+        """
+        self.enabled = enabled
+        self.total_memory_mb = total_memory_mb if total_memory_mb is not None else self._detect_memory()
+        self.reserve_mb = reserve_mb
+        self.idle_ttl = idle_ttl
+        self.queue_timeout = queue_timeout
+        self.default_footprint_mb = default_footprint_mb
+        self.footprints = dict(models or {})
+        if self.enabled:
+            logger.info(f"GPU调度器已启用，显存预算: {self.capacity_mb if self.capacity_mb is not None else '不限'} MB")
+
+    @staticmethod
+    def _detect_memory() -> Optional[int]:
+        """读取第一块GPU的显存大小（MB），没有torch或CUDA时返回None"""
+        try:
+            import torch
+            if torch.cuda.is_available():
+                return torch.cuda.get_device_properties(0).total_memory // (1024 * 1024)
+        except Exception as e:
+            logger.warning(f"读取GPU显存失败: {str(e)}")
+        return None
+
+    @property
+    def capacity_mb(self) -> Optional[int]:
+        """可分配的显存，None表示不限"""
+        if self.total_memory_mb is None:
+            return None
+        return max(0, self.total_memory_mb - self.reserve_mb)
+
+    @property
+    def used_mb(self) -> int:
+        return sum(model.footprint_mb for model in self._resident.values()) + self._workspace_mb
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _requirement(self, model: str, footprint_mb: Optional[int], workspace_mb: Optional[int]) -> tuple:
+        spec = self.footprints.get(model, {})
+        footprint = footprint_mb if footprint_mb is not None else spec.get("footprint_mb", self.default_footprint_mb)
+        workspace = workspace_mb if workspace_mb is not None else spec.get("workspace_mb", 0)
+        return footprint, workspace
+
+    @asynccontextmanager
+    async def job(self, model: str, unload: Optional[Callable[[], Any]] = None,
+                  footprint_mb: Optional[int] = None, workspace_mb: Optional[int] = None) -> AsyncIterator[None]:
+        """
+        申请使用模型执行一次GPU任务，显存不足时排队
+
+        模型在任务中按需加载，任务结束后保持驻留，直到空闲超时或被其它任务驱逐（调用unload）。
+        unload为None的模型不会被驱逐（如启动时加载的常驻模型）
+
+        用法：
+            async with gpu_scheduler.job("glm-edge-v-5b", unload=self._unload_model):
+                result = await run_in_executor(ExecutionClass.GPU, self._analyze, ...)
+        """
+        if not self.enabled:
+            yield
+            return
+
+        footprint, workspace = self._requirement(model, footprint_mb, workspace_mb)
+        await self._acquire(model, footprint, workspace, unload)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            metrics.observe("gpu.job_seconds", time.monotonic() - started)
+            self._release(model, workspace)
+
+    async def _acquire(self, model: str, footprint: int, workspace: int,
+                       unload: Optional[Callable[[], Any]]) -> None:
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(model, footprint, workspace, unload, loop.create_future())
+        self._waiters.append(waiter)
+        self._dispatch()
+        if not waiter.future.done():
+            logger.info(f"GPU任务排队: {model}，队列深度 {self.queue_depth}，已用显存 {self.used_mb} MB")
+            metrics.incr("gpu.queued")
+            metrics.observe("gpu.queue_depth", self.queue_depth)
+
+        try:
+            victims = await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 取消与授予同时发生：任务不再执行，归还已分配的显存
+                await self._unload_all(waiter.future.result())
+                self._release(model, workspace)
+            else:
+                waiter.future.cancel()
+                self._remove_waiter(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.incr("gpu.queue_timeout")
+                raise GPUMemoryError(f"等待显存超时: {model}（需要 {footprint + workspace} MB）") from e
+            raise
+
+        metrics.observe("gpu.queue_wait_seconds", time.monotonic() - waiter.enqueued_at)
+        # 被驱逐的模型在本任务开始前释放显存
+        try:
+            await self._unload_all(victims)
+        except BaseException:
+            self._release(model, workspace)
+            raise
+
+    def _remove_waiter(self, waiter: _Waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """按先进先出授予排队的任务，队首放不下时后面的任务继续等待"""
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.future.cancelled():
+                self._waiters.popleft()
+                continue
+            victims = self._plan(waiter)
+            if victims is None:
+                break
+            self._waiters.popleft()
+            self._grant(waiter, victims)
+
+    def _plan(self, waiter: _Waiter) -> Optional[List[ResidentModel]]:
+        """返回为放下该任务需要驱逐的模型列表，放不下时返回None"""
+        capacity = self.capacity_mb
+        if capacity is None:
+            return []
+
+        resident = self._resident.get(waiter.model)
+        needed = waiter.workspace_mb + (0 if resident else waiter.footprint_mb)
+        free = capacity - self.used_mb
+        if needed <= free:
+            return []
+
+        victims = []
+        candidates = sorted((model for model in self._resident.values()
+                             if model.evictable and model.name != waiter.model), key=lambda x: x.last_used)
+        for candidate in candidates:
+            victims.append(candidate)
+            free += candidate.footprint_mb
+            if needed <= free:
+                return victims
+
+        # 驱逐全部空闲模型仍放不下（如开启CPU offload的大模型、常驻模型占用过多），
+        # 没有其它任务运行时直接执行，否则会一直等待
+        if self._running == 0:
+            logger.warning(f"GPU任务 {waiter.model} 需要 {needed} MB，可用显存 {free} MB，独占执行")
+            return victims
+        return None
+
+    def _grant(self, waiter: _Waiter, victims: List[ResidentModel]) -> None:
+        for victim in victims:
+            self._evict(victim)
+        resident = self._resident.get(waiter.model)
+        if resident is None:
+            resident = ResidentModel(name=waiter.model, footprint_mb=waiter.footprint_mb, unload=waiter.unload)
+            self._resident[waiter.model] = resident
+        elif waiter.unload is not None:
+            resident.unload = waiter.unload
+        if resident.idle_timer is not None:
+            resident.idle_timer.cancel()
+            resident.idle_timer = None
+        resident.active_jobs += 1
+        self._workspace_mb += waiter.workspace_mb
+        self._running += 1
+        waiter.future.set_result(victims)
+
+    def _release(self, model: str, workspace: int) -> None:
+        self._workspace_mb -= workspace
+        self._running -= 1
+        resident = self._resident.get(model)
+        if resident is not None:
+            resident.active_jobs -= 1
+            resident.last_used = time.monotonic()
+            if resident.active_jobs == 0 and self.idle_ttl is not None and resident.unload is not None:
+                resident.idle_timer = asyncio.get_running_loop().call_later(
+                    self.idle_ttl, self._on_idle_timeout, model)
+        self._dispatch()
+
+    def _evict(self, resident: ResidentModel) -> None:
+        """从驻留表中移除（显存随即视为可用，unload由获得显存的任务或空闲回收执行）"""
+        self._resident.pop(resident.name, None)
+        if resident.idle_timer is not None:
+            resident.idle_timer.cancel()
+            resident.idle_timer = None
+        metrics.incr("gpu.evicted")
+        logger.info(f"驱逐GPU模型: {resident.name}（{resident.footprint_mb} MB）")
+
+    def _on_idle_timeout(self, model: str) -> None:
+        resident = self._resident.get(model)
+        if resident is None or not resident.evictable:
+            return
+        self._evict(resident)
+        asyncio.get_running_loop().create_task(self._unload_all([resident]))
+        self._dispatch()
+
+    @staticmethod
+    async def _unload_all(victims: List[ResidentModel]) -> None:
+        for victim in victims:
+            try:
+                result = victim.unload()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"释放GPU模型失败 {victim.name}: {str(e)}")
+
+    def register_resident(self, model: str, footprint_mb: Optional[int] = None,
+                          unload: Optional[Callable[[], Any]] = None) -> None:
+        """登记调度器之外加载的常驻模型（如启动时加载的语音识别模型），计入显存占用"""
+        if not self.enabled:
+            return
+        footprint, _ = self._requirement(model, footprint_mb, 0)
+        self._resident[model] = ResidentModel(name=model, footprint_mb=footprint, unload=unload)
+
+    def forget(self, model: str) -> None:
+        """模型已在调度器之外释放（如工具关闭），从驻留表中移除"""
+        resident = self._resident.get(model)
+        if resident is None or resident.active_jobs:
+            return
+        if resident.idle_timer is not None:
+            resident.idle_timer.cancel()
+        del self._resident[model]
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """当前显存占用、驻留模型和排队情况"""
+        return {
+            "enabled": self.enabled,
+            "capacity_mb": self.capacity_mb,
+            "used_mb": self.used_mb,
+            "running": self._running,
+            "queue_depth": self.queue_depth,
+            "queued": [waiter.model for waiter in self._waiters],
+            "resident": {
+                model.name: {
+                    "footprint_mb": model.footprint_mb,
+                    "active_jobs": model.active_jobs,
+                    "idle_seconds": round(time.monotonic() - model.last_used, 1) if model.active_jobs == 0 else 0,
+                    "evictable": model.unload is not None
+                } for model in self._resident.values()
+            }
+        }
+
+
+# 全局GPU调度器
+gpu_scheduler = GPUScheduler()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from .loading import loadingInfo
+from .metrics import Metrics
+
+logger = loadingInfo("loop_monitor")
+
+
+class EventLoopLagMonitor:
+    """
+    事件循环延迟监测
+
+    后台任务每隔interval秒sleep一次，实际唤醒时间超出interval的部分即为事件循环被阻塞的时长
+    （同步调用、长时间的CPU计算等）。保留最近max_samples个样本用于计算分位数
+    """
+
+    def __init__(self, interval: float = 0.05, max_samples: int = 2000):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=max_samples)
+        self._max = 0.0
+        self._last = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> float:
+        """最近一次测得的延迟（秒）"""
+        return self._last
+
+    def recent_max(self, seconds: float) -> float:
+        """最近seconds秒内（按样本数估算）的最大延迟"""
+        count = max(1, int(seconds / self.interval))
+        values = list(self._samples)[-count:]
+        return max(values) if values else self._last
+
+    def start(self) -> None:
+        """在当前事件循环中启动监测，重复调用无效"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self) -> None:
+        """清空样本（如预热结束后开始正式测量）"""
+        self._samples.clear()
+        self._max = 0.0
+        self._last = 0.0
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self._last = lag
+            self._max = max(self._max, lag)
+            self._samples.append(lag)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """延迟统计（秒）"""
+        values = list(self._samples)
+        return {
+            "samples": len(values),
+            "mean": sum(values) / len(values) if values else 0.0,
+            "p50": Metrics._percentile(values, 50),
+            "p99": Metrics._percentile(values, 99),
+            "max": self._max
+        }
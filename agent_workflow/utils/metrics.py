@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any
+
+
+class Metrics:
+    """
+    进程内指标收集器
+
+    功能：
+    1. 计数器（缓存命中、重试次数等）
+    2. 耗时/数值统计（保留最近的样本用于计算分位数）
+    3. 导出当前指标快照
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
+        self._totals: Dict[str, float] = defaultdict(float)
+        self._counts: Dict[str, int] = defaultdict(int)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """增加计数器"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """记录一个数值样本（如耗时秒数）"""
+        with self._lock:
+            self._samples[name].append(value)
+            self._totals[name] += value
+            self._counts[name] += 1
+
+    def get_counter(self, name: str) -> float:
+        """获取计数器当前值"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def get_mean(self, name: str) -> float:
+        """获取数值样本的平均值"""
+        with self._lock:
+            count = self._counts.get(name, 0)
+            return self._totals[name] / count if count else 0.0
+
+    @staticmethod
+    def _percentile(values: list, percent: float) -> float:
+        """计算分位数（最近邻插值）"""
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """导出所有指标"""
+        with self._lock:
+            summaries = {}
+            for name, samples in self._samples.items():
+                values = list(samples)
+                summaries[name] = {
+                    "count": self._counts[name],
+                    "mean": self._totals[name] / self._counts[name] if self._counts[name] else 0.0,
+                    "p50": self._percentile(values, 50),
+                    "p95": self._percentile(values, 95),
+                    "p99": self._percentile(values, 99),
+                    "max": max(values) if values else 0.0,
+                }
+            return {
+                "counters": dict(self._counters),
+                "summaries": summaries
+            }
+
+    def reset(self) -> None:
+        """清空所有指标"""
+        with self._lock:
+            self._counters.clear()
+            self._samples.clear()
+            self._totals.clear()
+            self._counts.clear()
+
+
+# 全局指标实例
+metrics = Metrics()
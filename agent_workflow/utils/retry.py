@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import random
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from config.config import RETRY
+
+from .loading import loadingInfo
+from .metrics import metrics
+
+logger = loadingInfo("retry")
+
+# 重试无意义的异常：文件/权限问题、未实现
+_NON_RETRYABLE = (asyncio.CancelledError, FileNotFoundError, PermissionError, NotImplementedError)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    单层重试策略（意图解析、参数优化、工具执行、TTS请求等各自一份）
+
+    Attributes:
+        max_attempts: 最多尝试次数（含首次）
+        base_delay: 首次重试前的退避基数（秒）
+        max_delay: 单次退避上限（秒）
+        multiplier: 指数退避倍数
+        jitter: 是否加入随机抖动（full jitter：在[0, 退避时间]内均匀取值），避免同时失败的请求同时重试
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    multiplier: float = 2.0
+    jitter: bool = True
+
+    @classmethod
+    def named(cls, name: str) -> 'RetryPolicy':
+        """读取config中RETRY["policies"]的策略"""
+        return cls(**RETRY.get("policies", {}).get(name, {}))
+
+    def backoff(self, attempt: int) -> float:
+        """第attempt次失败后的等待时间（attempt从1开始）"""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** max(0, attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+class RetryBudget:
+    """
+    单个请求的重试预算，请求内各层共享
+
+    嵌套的重试（工具执行 × 参数优化 × 服务请求）次数相乘，预算限制整个请求的重试总次数和退避总时长，
+    用完后各层都不再重试，失败尽快返回
+    """
+
+    def __init__(self, max_retries: Optional[int] = None, max_total_delay: Optional[float] = None):
+        self.max_retries = max_retries if max_retries is not None else RETRY.get("budget", 6)
+        self.max_total_delay = max_total_delay if max_total_delay is not None else RETRY.get("max_total_delay", 20)
+        self.retries = 0
+        self.total_delay = 0.0
+        self._lock = threading.Lock()  # 工具可能在执行器线程中使用
+
+    @property
+    def exhausted(self) -> bool:
+        return self.retries >= self.max_retries or self.total_delay >= self.max_total_delay
+
+    def try_spend(self, delay: float) -> bool:
+        """占用一次重试和delay秒退避，预算不足时返回False"""
+        with self._lock:
+            if self.retries >= self.max_retries or self.total_delay + delay > self.max_total_delay:
+                return False
+            self.retries += 1
+            self.total_delay += delay
+            return True
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    判断异常是否值得重试
+
+    异常上的retryable属性优先（如熔断、参数错误可声明为False）；HTTP 4xx（408/429除外）不重试
+    """
+    retryable = getattr(error, "retryable", None)
+    if retryable is not None:
+        return bool(retryable)
+    if isinstance(error, _NON_RETRYABLE):
+        return False
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in (408, 429):
+        return False
+    return True
+
+
+def plan_retry(policy: RetryPolicy, attempt: int, error: Optional[BaseException] = None,
+               budget: Optional[RetryBudget] = None, remaining: Optional[float] = None,
+               name: str = "retry") -> Optional[float]:
+    """
+    判断能否重试，可以时占用预算并返回退避时间（由调用方等待）
+
+    Args:
+        policy: 重试策略
+        attempt: 已失败的次数（从1开始）
+        error: 本次失败的异常，None表示结果无效（如空结果）
+        budget: 请求的重试预算，None表示不限
+        remaining: 请求剩余时间（秒），退避会超过截止时间时不再重试
+        name: 调用方名称，用于日志和指标
+
+    Returns:
+        Optional[float]: 退避秒数，None表示应放弃
+    """
+    if attempt >= policy.max_attempts:
+        return None
+    if error is not None and not is_retryable(error):
+        metrics.incr(f"retry.{name}.not_retryable")
+        return None
+
+    delay = policy.backoff(attempt)
+    if remaining is not None and delay >= remaining:
+        metrics.incr(f"retry.{name}.deadline")
+        return None
+    if budget is not None and not budget.try_spend(delay):
+        metrics.incr("retry.budget_exhausted")
+        logger.warning(f"{name}: 请求的重试预算已用完，不再重试")
+        return None
+
+    metrics.observe("retry.backoff_seconds", delay)
+    return delay
+
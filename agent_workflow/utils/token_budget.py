@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+from typing import Any, Dict, List
+
+from .metrics import metrics
+from .read_files import enc
+
+# 单条内容剩余预算低于该值时不再截断保留，直接省略
+_MIN_KEEP_TOKENS = 32
+
+
+def count_tokens(text: Any) -> int:
+    """计算文本的token数量（cl100k_base编码）"""
+    return len(enc.encode(str(text), disallowed_special=()))
+
+
+def truncate_text(text: Any, max_tokens: int) -> str:
+    """
+    将文本截断到max_tokens以内
+
+    保留开头约2/3和结尾约1/3（结论、输出路径等通常在末尾），中间替换为省略说明
+    """
+    text = str(text)
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return f"（内容已省略，共{len(tokens)}个token）"
+
+    omitted = len(tokens) - max_tokens
+    head = max_tokens * 2 // 3
+    tail = max_tokens - head
+    # 截断点可能落在多字节字符中间，去掉解码产生的替换字符
+    head_text = enc.decode(tokens[:head]).replace('\ufffd', '')
+    tail_text = enc.decode(tokens[-tail:]).replace('\ufffd', '') if tail else ""
+    metrics.incr("token_budget.truncated")
+    metrics.incr("token_budget.saved_tokens", omitted)
+    return f"{head_text}\n……（中间省略{omitted}个token）……\n{tail_text}"
+
+
+def fit_tool_results(history: List[Dict[str, Any]], budget: int, per_result: int) -> List[Dict[str, Any]]:
+    """
+    将上游任务结果压缩到预算内
+
+    每个结果最多保留per_result个token；按从新到旧分配总预算，较早的结果在预算用完后只保留省略说明
+
+    Args:
+        history: [{"task_id", "tool_name", "result"}, ...]，按执行顺序排列
+        budget: 全部结果的token预算
+        per_result: 单个结果的token上限
+    """
+    remaining = budget
+    fitted = []
+    for item in reversed(history):
+        result = str(item.get("result", ""))
+        tokens = count_tokens(result)
+        allowed = min(per_result, remaining)
+        if tokens > allowed:
+            if allowed < _MIN_KEEP_TOKENS:
+                allowed = 0
+            result = truncate_text(result, allowed)
+        remaining = max(0, remaining - min(tokens, allowed))
+        fitted.append({**item, "result": result})
+    return list(reversed(fitted))
+
+
+def fit_history(history: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+    """
+    将对话历史压缩到预算内
+
+    从最近一轮开始保留，放不下的轮次截断其回答，预算用完后丢弃更早的轮次
+
+    Args:
+        history: [{"query", "response"}, ...]，按时间顺序排列
+        budget: 对话历史的token预算
+    """
+    if not history:
+        return history
+
+    remaining = budget
+    fitted = []
+    for message in reversed(history):
+        query = str(message.get("query", ""))
+        response = str(message.get("response", ""))
+        query_tokens = count_tokens(query)
+        response_tokens = count_tokens(response)
+        if query_tokens + response_tokens <= remaining:
+            fitted.append(message)
+            remaining -= query_tokens + response_tokens
+            continue
+
+        # 问题保留原文，回答截断到剩余预算
+        allowed = remaining - query_tokens
+        if allowed >= _MIN_KEEP_TOKENS:
+            fitted.append({**message, "response": truncate_text(response, allowed)})
+        break
+
+    dropped = len(history) - len(fitted)
+    if dropped:
+        metrics.incr("token_budget.dropped_messages", dropped)
+    return list(reversed(fitted))
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from .loading import loadingInfo
+
+logger = loadingInfo("tracing")
+
+
+@dataclass
+class Span:
+    """一个计时区间（请求、意图解析、参数优化的一次尝试、工具执行、LLM调用等）"""
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_time: float  # 墙钟时间（秒）
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    _start_perf: float = field(default_factory=time.perf_counter, repr=False)
+    _tracer: Any = field(default=None, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        """设置属性（如token数量）"""
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """结束区间，重复调用无效"""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start_perf
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+        if self._tracer is not None:
+            self._tracer._on_end(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": dict(self.attributes)
+        }
+
+
+class _NullSpan:
+    """追踪关闭或找不到所属请求时使用的空区间"""
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+@dataclass
+class _Trace:
+    trace_id: str
+    message_id: Optional[str]
+    root: Span
+    spans: List[Span] = field(default_factory=list)
+
+
+class JsonlExporter:
+    """
+    将结束的请求按区间逐行写入JSONL文件，写入在后台线程中进行
+
+    文件超过max_bytes时按RotatingFileHandler的方式轮转（traces.jsonl.1、.2……），
+    最多保留backup_count个旧文件；max_bytes为0时不限制大小
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._handler: Optional[RotatingFileHandler] = None
+        self._queue: queue.Queue = queue.Queue()
+        threading.Thread(target=self._worker, name="trace-jsonl", daemon=True).start()
+
+    def export(self, spans: List[Span], message_id: Optional[str]) -> None:
+        self._queue.put([{**span.to_dict(), "message_id": message_id} for span in spans])
+
+    def _open(self) -> RotatingFileHandler:
+        if self._handler is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes,
+                                                backupCount=self.backup_count, encoding='utf-8', delay=True)
+        return self._handler
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        handler = self._open()
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False, default=str)
+            handler.handle(logging.makeLogRecord({"msg": line}))
+
+    def _worker(self) -> None:
+        while True:
+            records = self._queue.get()
+            try:
+                self._write(records)
+            except Exception as e:
+                logger.error(f"写入追踪记录失败: {str(e)}")
+
+
+class OtlpHttpExporter:
+    """以OTLP/HTTP JSON格式发送到采集端（如OpenTelemetry Collector、Jaeger的 /v1/traces）"""
+
+    def __init__(self, endpoint: str, service_name: str = "agent_workflow", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue()
+        threading.Thread(target=self._worker, name="trace-otlp", daemon=True).start()
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _to_otlp(self, span: Span, message_id: Optional[str]) -> Dict[str, Any]:
+        start_ns = int(span.start_time * 1e9)
+        attributes = {**span.attributes, "message_id": message_id}
+        data = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((span.duration or 0) * 1e9)),
+            "attributes": [self._attribute(k, v) for k, v in attributes.items() if v is not None],
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1}
+        }
+        if span.parent_id:
+            data["parentSpanId"] = span.parent_id
+        return data
+
+    def export(self, spans: List[Span], message_id: Optional[str]) -> None:
+        self._queue.put({
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "agent_workflow.tracing"},
+                    "spans": [self._to_otlp(span, message_id) for span in spans]
+                }]
+            }]
+        })
+
+    def _worker(self) -> None:
+        while True:
+            payload = self._queue.get()
+            try:
+                requests.post(self.endpoint, json=payload, timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"发送追踪数据失败: {str(e)}")
+
+
+class Tracer:
+    """
+    请求链路追踪
+
+    每个请求（RequestContext.trace_id）对应一棵区间树，根区间由start_trace创建。
+    区间的父节点依次取：显式传入的parent、当前激活的区间（with span(...)期间）、请求的根区间。
+    请求结束后导出到各exporter，并在内存中保留最近max_traces个请求供调试接口查询。
+
+    注意：async生成器中跨yield的区间使用start_span/end，不要用with激活，避免contextvar泄漏到调用方
+    """
+
+    def __init__(self, max_traces: int = 200):
+        self.enabled = False
+        self.max_traces = max_traces
+        self.exporters: List[Any] = []
+        self._traces: "OrderedDict[str, _Trace]" = OrderedDict()
+        self._by_message: Dict[str, str] = {}
+        self._active: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("active_span", default=None)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = True, exporters: Optional[List[Any]] = None,
+                  max_traces: Optional[int] = None) -> None:
+        self.enabled = enabled
+        self.exporters = exporters or []
+        if max_traces is not None:
+            self.max_traces = max_traces
+
+    @staticmethod
+    def _new_id(length: int) -> str:
+        return uuid.uuid4().hex[:length]
+
+    def start_trace(self, ctx: Any, name: str = "request", **attributes: Any) -> Any:
+        """为请求创建根区间"""
+        if not self.enabled or ctx is None:
+            return NULL_SPAN
+        root = Span(
+            trace_id=ctx.trace_id,
+            span_id=self._new_id(16),
+            parent_id=None,
+            name=name,
+            start_time=time.time(),
+            _tracer=self
+        )
+        root.set(message_id=ctx.message_id, **attributes)
+        with self._lock:
+            self._traces[ctx.trace_id] = _Trace(trace_id=ctx.trace_id, message_id=ctx.message_id, root=root)
+            if ctx.message_id:
+                self._by_message[ctx.message_id] = ctx.trace_id
+            while len(self._traces) > self.max_traces:
+                _, old = self._traces.popitem(last=False)
+                self._by_message.pop(old.message_id, None)
+        return root
+
+    def start_span(self, name: str, ctx: Any = None, parent: Any = None, **attributes: Any) -> Any:
+        """创建并开始一个区间（不激活）"""
+        if not self.enabled:
+            return NULL_SPAN
+        if parent is None or parent is NULL_SPAN:
+            parent = self._active.get()
+            if ctx is not None and (parent is None or parent.trace_id != ctx.trace_id):
+                trace = self._traces.get(ctx.trace_id)
+                parent = trace.root if trace else None
+        if parent is None:
+            return NULL_SPAN
+
+        span = Span(
+            trace_id=parent.trace_id,
+            span_id=self._new_id(16),
+            parent_id=parent.span_id,
+            name=name,
+            start_time=time.time(),
+            _tracer=self
+        )
+        span.set(**attributes)
+        return span
+
+    @contextmanager
+    def activate(self, span: Any) -> Iterator[Any]:
+        """在with期间将区间设为当前区间，内部创建的区间以它为父节点"""
+        if span is NULL_SPAN:
+            yield span
+            return
+        token = self._active.set(span)
+        try:
+            yield span
+        finally:
+            self._active.reset(token)
+
+    @contextmanager
+    def span(self, name: str, ctx: Any = None, **attributes: Any) -> Iterator[Any]:
+        """创建、激活并在退出时结束区间，异常会记录到区间上"""
+        span = self.start_span(name, ctx, **attributes)
+        try:
+            with self.activate(span):
+                yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            span.end()
+
+    def _on_end(self, span: Span) -> None:
+        with self._lock:
+            trace = self._traces.get(span.trace_id)
+            if trace is None:
+                return
+            trace.spans.append(span)
+            finished = span is trace.root
+        if finished:
+            for exporter in self.exporters:
+                try:
+                    exporter.export(list(trace.spans), trace.message_id)
+                except Exception as e:
+                    logger.warning(f"导出追踪数据失败: {str(e)}")
+
+    def get_trace(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """返回消息对应请求的区间树"""
+        with self._lock:
+            trace = self._traces.get(self._by_message.get(message_id, ""))
+            if trace is None:
+                return None
+            spans = list(trace.spans)
+            if trace.root not in spans:
+                spans.append(trace.root)
+
+        nodes = {span.span_id: {**span.to_dict(), "children": []} for span in spans}
+        for span in sorted(spans, key=lambda x: x.start_time):
+            if span.parent_id in nodes:
+                nodes[span.parent_id]["children"].append(nodes[span.span_id])
+        return {
+            "trace_id": trace.trace_id,
+            "message_id": trace.message_id,
+            "root": nodes[trace.root.span_id]
+        }
+
+
+# 全局追踪实例
+tracer = Tracer()
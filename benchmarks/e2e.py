@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+离线端到端基准测试：启动本地模型服务替身，通过执行器（或MasterAgent.chat_ui_process）
+并发驱动多个会话，统计消息延迟分位数、每条消息的LLM调用次数和事件循环延迟。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.e2e --conversations 20 --messages 3 --scenario chain
+    python -m benchmarks.e2e --mode chat_ui --stream --output data/bench/e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.stub_server import StubConfig, StubLLMServer
+
+QUERY_TEMPLATE = "[bench:{scenario}] 第{turn}个问题：请简单介绍一下异步编程相比多线程的优点"
+
+
+def configure_backends(stub_url: str, plan_cache: bool) -> None:
+    """
+    把模型服务指向桩服务，并关闭依赖外部服务或会干扰测量的功能
+
+    必须在创建ToolExecutor之前调用：ChatOllama/OllamaEmbeddings创建时读取OLLAMA_HOST，
+    OpenAI客户端每次调用时读取OLLAMA_DATA["api_url"]
+    """
+    os.environ["OLLAMA_HOST"] = stub_url
+
+    from config.config import OLLAMA_DATA, PLAN_CACHE, TRACING
+    from config.tool_config import HEALTH_CHECKS
+
+    OLLAMA_DATA["url"] = f"{stub_url}/api/chat"
+    OLLAMA_DATA["api_url"] = f"{stub_url}/v1/"
+    # 基准测试只使用ChatTool，不探测其它后端
+    HEALTH_CHECKS["enabled"] = False
+    # 追踪保留在内存中，不写文件
+    TRACING["jsonl_path"] = None
+    TRACING["otlp_endpoint"] = None
+    PLAN_CACHE["enabled"] = plan_cache
+
+
+def build_executor(tool_names: List[str], fused: bool):
+    from agent_workflow.core.tool_executor import ToolExecutor, ToolRegistry
+
+    tools = ToolRegistry.scan_tools(relative_tool_dir="agent_workflow/tools/tool")
+    missing = [name for name in tool_names if name not in tools]
+    if missing:
+        raise SystemExit(f"未找到工具: {missing}")
+    return ToolExecutor(tools={name: tools[name] for name in tool_names}, verbose=False, fused_planning=fused)
+
+
+class MessageResult:
+    """单条消息的测量结果"""
+
+    def __init__(self):
+        self.status = "failed"  # ok / failed / rejected
+        self.latency: Optional[float] = None
+        self.first_event: Optional[float] = None
+        self.first_token: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+async def run_executor_message(executor, query: str, history: List[Dict[str, str]],
+                               conversation_id: str, stream: bool, timeout: Optional[float]) -> MessageResult:
+    """直接调用ToolExecutor.execute_tools处理一条消息"""
+    from agent_workflow.core.context import RequestContext
+    from agent_workflow.tools import MessageInput
+
+    result = MessageResult()
+    ctx = RequestContext.create(message_id=uuid.uuid4().hex, conversation_id=conversation_id,
+                                timeout=timeout, stream=stream)
+    start = time.perf_counter()
+    async for event in executor.execute_tools(query=MessageInput(query=query).process_input(), history=history,
+                                              chat_ui=stream, ctx=ctx):
+        elapsed = time.perf_counter() - start
+        if result.first_event is None:
+            result.first_event = elapsed
+        if not isinstance(event, dict):
+            continue
+        if event.get("type") == "delta" and result.first_token is None:
+            result.first_token = elapsed
+        if "error" in event or event.get("type") == "error":
+            result.error = str(event.get("error") or event.get("content"))
+            break
+        if event.get("status") == "success" and "result" in event:
+            result.status = "ok"
+            if result.first_token is None:
+                result.first_token = elapsed
+    result.latency = time.perf_counter() - start
+    return result
+
+
+async def run_chat_ui_message(agent, query: str, conversation_id: str, data_dir: Path,
+                              stream: bool, timeout: Optional[float]) -> MessageResult:
+    """通过MasterAgent.chat_ui_process处理一条消息（包含资源管理、历史读写）"""
+    from agent_workflow.core.context import RequestContext
+    from agent_workflow.tools import MessageInput
+
+    result = MessageResult()
+    message_id = uuid.uuid4().hex
+    ctx = RequestContext.create(message_id=message_id, conversation_id=conversation_id,
+                                timeout=timeout, stream=stream)
+    start = time.perf_counter()
+    async for event in agent.chat_ui_process(url="http://localhost", input_msg=MessageInput(query=query),
+                                             message_id=message_id, conversation_id=conversation_id,
+                                             data_dir=data_dir, context_length=5, history_mode="json",
+                                             chat_ui=stream, ctx=ctx):
+        elapsed = time.perf_counter() - start
+        if result.first_event is None:
+            result.first_event = elapsed
+        event_type = event.get("type")
+        if event_type == "delta" and result.first_token is None:
+            result.first_token = elapsed
+        elif event_type == "warning":
+            result.status = "rejected"
+            result.error = event.get("content")
+            break
+        elif event_type == "error":
+            result.error = event.get("content")
+            break
+        elif event_type == "result":
+            result.status = "ok"
+            if result.first_token is None:
+                result.first_token = elapsed
+    result.latency = time.perf_counter() - start
+    return result
+
+
+async def run_conversation(index: int, args, runner) -> List[MessageResult]:
+    """一个会话依次发送args.messages条消息，后续消息带上前面的对话历史"""
+    conversation_id = f"bench-{index}"
+    history: List[Dict[str, str]] = []
+    results = []
+    for turn in range(args.messages):
+        query = QUERY_TEMPLATE.format(scenario=args.scenario, turn=turn + 1)
+        try:
+            result = await runner(query, history, conversation_id)
+        except Exception as e:
+            result = MessageResult()
+            result.error = f"{type(e).__name__}: {e}"
+        results.append(result)
+        history.append({"query": query, "response": "这是离线基准测试的模拟回答。"})
+    return results
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    from agent_workflow.utils.metrics import Metrics
+
+    stats = Metrics()
+    for value in values:
+        stats.observe("value", value)
+    summary = stats.snapshot()["summaries"].get("value")
+    return summary or {"count": 0}
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    stub = StubLLMServer(StubConfig(
+        first_token_latency=args.latency,
+        token_rate=args.token_rate or None,
+        answer_tokens=args.answer_tokens,
+        error_rate=args.error_rate
+    ))
+    if args.plans:
+        with open(args.plans, "r", encoding="utf-8") as f:
+            stub.config.plans.update(json.load(f))
+    if args.scenario not in stub.config.plans:
+        raise SystemExit(f"未知场景: {args.scenario}，可选: {sorted(stub.config.plans)}")
+    stub.start()
+
+    from agent_workflow.utils.loop_monitor import EventLoopLagMonitor
+    from agent_workflow.utils.metrics import metrics
+
+    lag_monitor = EventLoopLagMonitor(interval=args.lag_interval)
+    data_dir = Path(tempfile.mkdtemp(prefix="bench_e2e_"))
+    executor = None
+    try:
+        configure_backends(stub.url, plan_cache=args.plan_cache)
+        executor = build_executor(args.tools, fused=args.fused)
+
+        if args.mode == "chat_ui":
+            from agent_workflow.core.task_agent import MasterAgent
+
+            agent = MasterAgent(tool_executor=executor, verbose=False)
+
+            async def runner(query, history, conversation_id):
+                return await run_chat_ui_message(agent, query, conversation_id, data_dir,
+                                                 args.stream, args.timeout)
+        else:
+            await executor.startup()
+
+            async def runner(query, history, conversation_id):
+                return await run_executor_message(executor, query, history, conversation_id,
+                                                  args.stream, args.timeout)
+
+        lag_monitor.start()
+        # 预热：首次导入工具模块、建立连接等不计入结果
+        for index in range(args.warmup):
+            await runner(QUERY_TEMPLATE.format(scenario=args.scenario, turn=0), [], f"bench-warmup-{index}")
+        await asyncio.sleep(args.lag_interval * 2)
+
+        lag_monitor.reset()
+        metrics.reset()
+        calls_before = stub.call_counts()
+        start = time.perf_counter()
+        conversations = await asyncio.gather(*(run_conversation(index, args, runner)
+                                               for index in range(args.conversations)))
+        duration = time.perf_counter() - start
+        calls_after = stub.call_counts()
+    finally:
+        await lag_monitor.stop()
+        if executor is not None:
+            await executor.shutdown()
+        stub.stop()
+
+    results = [result for conversation in conversations for result in conversation]
+    ok = [result for result in results if result.status == "ok"]
+    calls = {name: calls_after.get(name, 0) - calls_before.get(name, 0) for name in calls_after}
+    llm_calls = calls.get("ollama.chat", 0) + calls.get("openai.chat", 0)
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result.status != "ok":
+            key = (result.error or "unknown")[:120]
+            errors[key] = errors.get(key, 0) + 1
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "duration": duration,
+        "messages": {
+            "total": len(results),
+            "ok": len(ok),
+            "failed": sum(1 for result in results if result.status == "failed"),
+            "rejected": sum(1 for result in results if result.status == "rejected"),
+            "throughput": len(ok) / duration if duration else 0.0
+        },
+        "latency": summarize([result.latency for result in ok]),
+        "first_event": summarize([result.first_event for result in ok if result.first_event is not None]),
+        "first_token": summarize([result.first_token for result in ok if result.first_token is not None]),
+        "llm_calls": {
+            **calls,
+            "per_message": llm_calls / len(results) if results else 0.0
+        },
+        "event_loop_lag": lag_monitor.snapshot(),
+        "counters": metrics.snapshot()["counters"],
+        "errors": errors
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    def line(name: str, summary: Dict[str, Any], scale: float = 1000, unit: str = "ms") -> str:
+        if not summary.get("count", summary.get("samples")):
+            return f"{name:<16}-"
+        return (f"{name:<16}p50 {summary['p50'] * scale:9.1f}{unit}  "
+                + (f"p95 {summary['p95'] * scale:9.1f}{unit}  " if "p95" in summary else "")
+                + f"p99 {summary['p99'] * scale:9.1f}{unit}  max {summary['max'] * scale:9.1f}{unit}")
+
+    messages = report["messages"]
+    return "\n".join([
+        f"消息: {messages['total']} (成功 {messages['ok']}, 失败 {messages['failed']}, 拒绝 {messages['rejected']})"
+        f"  用时 {report['duration']:.2f}s  吞吐 {messages['throughput']:.2f} 条/秒",
+        line("消息延迟", report["latency"]),
+        line("首个事件", report["first_event"]),
+        line("首个token", report["first_token"]),
+        line("事件循环延迟", report["event_loop_lag"]),
+        f"LLM调用/消息   {report['llm_calls']['per_message']:.2f}  "
+        f"({', '.join(f'{k}={v}' for k, v in report['llm_calls'].items() if k != 'per_message')})",
+        *(f"错误 x{count}: {error}" for error, count in report["errors"].items())
+    ])
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="离线端到端基准测试（本地模型服务替身）")
+    parser.add_argument("--mode", choices=["executor", "chat_ui"], default="executor",
+                        help="executor: 直接调用ToolExecutor；chat_ui: 经过MasterAgent.chat_ui_process")
+    parser.add_argument("--conversations", type=int, default=10, help="并发会话数")
+    parser.add_argument("--messages", type=int, default=3, help="每个会话的消息数")
+    parser.add_argument("--scenario", default="chat", help="任务规划场景：chat / chain / parallel 或 --plans 中的名称")
+    parser.add_argument("--plans", help="自定义任务规划场景的JSON文件（场景名 -> 规划）")
+    parser.add_argument("--tools", nargs="+", default=["ChatTool"], help="注册的工具")
+    parser.add_argument("--stream", action="store_true", help="以流式方式调用（chat_ui增量输出）")
+    parser.add_argument("--fused", action="store_true", help="融合规划模式")
+    parser.add_argument("--plan-cache", action="store_true", help="开启任务规划缓存")
+    parser.add_argument("--latency", type=float, default=0.2, help="模型首token延迟（秒）")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="模型每秒输出token数，0表示不限速")
+    parser.add_argument("--answer-tokens", type=int, default=64, help="聊天回答的token数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模型服务随机返回500的比例")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单条消息的超时时间（秒）")
+    parser.add_argument("--warmup", type=int, default=1, help="预热消息数（不计入结果）")
+    parser.add_argument("--lag-interval", type=float, default=0.02, help="事件循环延迟的采样间隔（秒）")
+    parser.add_argument("--output", help="将报告写入JSON文件")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+    print(format_report(report))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+chat_ui接口的HTTP压测：上传附件（/api/upload），并发打开 /api/chat 的NDJSON流，
+统计首个事件时间、得到结果的时间和流中断（两行之间的间隔超过阈值）。
+
+默认在子进程中启动chat_ui应用（模型服务由本地替身代替），也可以用 --url 指向已启动的服务。
+报告为JSON，包含当前提交，便于在不同提交之间比较。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.load_test run --concurrency 20 --requests 200 --output data/bench/load.json
+    python -m benchmarks.load_test run --url http://localhost:8000 --concurrency 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.e2e import QUERY_TEMPLATE, build_executor, configure_backends, summarize
+from benchmarks.stub_server import StubConfig, StubLLMServer
+
+# 最小的1x1 PNG，用于图片上传
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+
+async def serve(args) -> None:
+    """启动模型服务替身和chat_ui应用（子进程中运行）"""
+    import uvicorn
+
+    stub = StubLLMServer(StubConfig(
+        first_token_latency=args.latency,
+        token_rate=args.token_rate or None,
+        answer_tokens=args.answer_tokens
+    ))
+    stub.start()
+    configure_backends(stub.url, plan_cache=args.plan_cache)
+
+    from agent_workflow.core.task_agent import MasterAgent
+
+    executor = build_executor(args.tools, fused=args.fused)
+    agent = MasterAgent(tool_executor=executor, verbose=False)
+    url = f"http://{args.host}:{args.port}"
+    app = agent.create_chat_ui_app(url=url, history_dir=args.history_dir or tempfile.mkdtemp(prefix="bench_load_"),
+                                   load_speech_model=False)
+    server = uvicorn.Server(uvicorn.Config(app, host=args.host, port=args.port, log_level="warning"))
+    try:
+        await server.serve()
+    finally:
+        await executor.shutdown()
+        stub.stop()
+
+
+class StreamResult:
+    """单个 /api/chat 请求的测量结果"""
+
+    def __init__(self):
+        self.status = "failed"  # ok / failed / rejected
+        self.upload: Optional[float] = None
+        self.first_event: Optional[float] = None
+        self.result: Optional[float] = None
+        self.total: Optional[float] = None
+        self.max_gap = 0.0
+        self.stalls = 0
+        self.events = 0
+        self.error: Optional[str] = None
+
+
+async def upload_attachments(client: httpx.AsyncClient, args, index: int) -> Dict[str, List[str]]:
+    """上传合成的附件，返回 /api/chat 使用的文件名"""
+    files = []
+    for n in range(args.files):
+        content = (f"load test attachment {index}-{n}\n" * (args.file_kb * 1024 // 32 + 1))[:args.file_kb * 1024]
+        files.append(("files", (f"bench_{uuid.uuid4().hex[:12]}.txt", content.encode("utf-8"), "text/plain")))
+    for n in range(args.images):
+        files.append(("images", (f"bench_{uuid.uuid4().hex[:12]}.png", TINY_PNG, "image/png")))
+    if not files:
+        return {"images": [], "files": []}
+
+    response = await client.post("/api/upload", files=files)
+    response.raise_for_status()
+    uploaded = {"images": [], "files": []}
+    for item in response.json().get("files", []):
+        key = "images" if item["path"].lower().endswith(".png") else "files"
+        uploaded[key].append(item["path"])
+    return uploaded
+
+
+async def run_stream(client: httpx.AsyncClient, args, index: int) -> StreamResult:
+    """上传附件后打开一个 /api/chat 流并读取到结束"""
+    result = StreamResult()
+    uploaded = {"images": [], "files": []}
+    start = time.perf_counter()
+    try:
+        uploaded = await upload_attachments(client, args, index)
+        result.upload = time.perf_counter() - start
+
+        data = {
+            "message_id": uuid.uuid4().hex,
+            "conversation_id": f"load-{index % max(1, args.conversations)}",
+            "query": QUERY_TEMPLATE.format(scenario=args.scenario, turn=index + 1),
+            "context_length": str(args.context_length),
+            "images": uploaded["images"],
+            "files": uploaded["files"]
+        }
+        stream_start = time.perf_counter()
+        last = stream_start
+        async with client.stream("POST", "/api/chat", data=data) as response:
+            if response.status_code != 200:
+                result.error = f"HTTP {response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                now = time.perf_counter()
+                gap = now - last
+                last = now
+                result.events += 1
+                if result.first_event is None:
+                    result.first_event = now - stream_start
+                else:
+                    result.max_gap = max(result.max_gap, gap)
+                    if gap > args.stall_threshold:
+                        result.stalls += 1
+
+                event = json.loads(line)
+                event_type = event.get("type")
+                if event_type == "result" and result.result is None:
+                    result.result = now - stream_start
+                    result.status = "ok"
+                elif event_type == "warning" and result.status != "ok":
+                    result.status = "rejected"
+                    result.error = str(event.get("content"))
+                elif event_type == "error":
+                    result.status = "failed"
+                    result.error = str(event.get("content"))
+    except Exception as e:
+        result.status = "failed"
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        result.total = time.perf_counter() - start
+        # 清理上传的附件
+        for path in uploaded["images"] + uploaded["files"]:
+            try:
+                await client.delete("/api/delete", params={"path": path})
+            except Exception:
+                pass
+    return result
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except Exception:
+        return None
+
+
+async def wait_ready(client: httpx.AsyncClient, process: Optional[subprocess.Popen], timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"chat_ui服务启动失败，退出码 {process.returncode}")
+        try:
+            response = await client.get("/api/metrics")
+            if response.status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("等待chat_ui服务就绪超时")
+
+
+async def run_load(args) -> Dict[str, Any]:
+    process = None
+    base_url = args.url
+    if base_url is None:
+        port = StubLLMServer._free_port("127.0.0.1")
+        base_url = f"http://127.0.0.1:{port}"
+        command = [sys.executable, "-m", "benchmarks.load_test", "serve", "--port", str(port),
+                   "--latency", str(args.latency), "--token-rate", str(args.token_rate),
+                   "--answer-tokens", str(args.answer_tokens), "--tools", *args.tools]
+        if args.fused:
+            command.append("--fused")
+        if args.plan_cache:
+            command.append("--plan-cache")
+        process = subprocess.Popen(command)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2 + 4, max_keepalive_connections=args.concurrency * 2)
+    timeout = httpx.Timeout(args.timeout, connect=10.0)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+            await wait_ready(client, process, args.startup_timeout)
+
+            # 预热：首次导入工具、建立连接等不计入结果
+            for index in range(args.warmup):
+                await run_stream(client, args, -1 - index)
+
+            counter = iter(range(args.requests))
+            results: List[StreamResult] = []
+
+            async def worker():
+                for index in counter:
+                    results.append(await run_stream(client, args, index))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            duration = time.perf_counter() - start
+
+            try:
+                server_metrics = (await client.get("/api/metrics")).json().get("metrics")
+            except Exception:
+                server_metrics = None
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    ok = [result for result in results if result.status == "ok"]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result.status != "ok":
+            key = (result.error or "unknown")[:120]
+            errors[key] = errors.get(key, 0) + 1
+
+    return {
+        "commit": current_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "target": args.url or "spawned",
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "command")},
+        "duration": duration,
+        "requests": {
+            "total": len(results),
+            "ok": len(ok),
+            "failed": sum(1 for result in results if result.status == "failed"),
+            "rejected": sum(1 for result in results if result.status == "rejected"),
+            "throughput": len(ok) / duration if duration else 0.0
+        },
+        "upload": summarize([result.upload for result in results if result.upload is not None]),
+        "time_to_first_event": summarize([result.first_event for result in ok]),
+        "time_to_result": summarize([result.result for result in ok]),
+        "total": summarize([result.total for result in ok]),
+        "max_gap": summarize([result.max_gap for result in ok]),
+        "stalls": {
+            "threshold": args.stall_threshold,
+            "count": sum(result.stalls for result in results),
+            "streams": sum(1 for result in results if result.stalls)
+        },
+        "errors": errors,
+        "server_metrics": server_metrics
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    def line(name: str, summary: Dict[str, Any]) -> str:
+        if not summary.get("count"):
+            return f"{name:<12}-"
+        return (f"{name:<12}p50 {summary['p50'] * 1000:9.1f}ms  p95 {summary['p95'] * 1000:9.1f}ms  "
+                f"p99 {summary['p99'] * 1000:9.1f}ms  max {summary['max'] * 1000:9.1f}ms")
+
+    requests = report["requests"]
+    stalls = report["stalls"]
+    return "\n".join([
+        f"提交 {report['commit']}  请求: {requests['total']} (成功 {requests['ok']}, 失败 {requests['failed']}, "
+        f"拒绝 {requests['rejected']})  用时 {report['duration']:.2f}s  吞吐 {requests['throughput']:.2f} 个/秒",
+        line("上传", report["upload"]),
+        line("首个事件", report["time_to_first_event"]),
+        line("得到结果", report["time_to_result"]),
+        line("最大间隔", report["max_gap"]),
+        f"流中断(>{stalls['threshold']}s) {stalls['count']} 次，涉及 {stalls['streams']} 个请求",
+        *(f"错误 x{count}: {error}" for error, count in report["errors"].items())
+    ])
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=0.2, help="模型首token延迟（秒）")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="模型每秒输出token数，0表示不限速")
+    parser.add_argument("--answer-tokens", type=int, default=64, help="聊天回答的token数")
+    parser.add_argument("--tools", nargs="+", default=["ChatTool"], help="注册的工具")
+    parser.add_argument("--fused", action="store_true", help="融合规划模式")
+    parser.add_argument("--plan-cache", action="store_true", help="开启任务规划缓存")
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="chat_ui接口HTTP压测")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="启动使用模型服务替身的chat_ui应用")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    serve_parser.add_argument("--history-dir", help="对话历史目录，默认使用临时目录")
+    add_stub_arguments(serve_parser)
+
+    run_parser = commands.add_parser("run", help="运行压测")
+    run_parser.add_argument("--url", help="已启动的chat_ui服务地址，不指定时在子进程中启动")
+    run_parser.add_argument("--concurrency", type=int, default=10, help="同时打开的 /api/chat 流数量")
+    run_parser.add_argument("--requests", type=int, default=100, help="请求总数")
+    run_parser.add_argument("--conversations", type=int, default=10, help="请求分布到的会话数")
+    run_parser.add_argument("--scenario", default="chat", help="任务规划场景：chat / chain / parallel")
+    run_parser.add_argument("--files", type=int, default=1, help="每个请求上传的文本附件数")
+    run_parser.add_argument("--file-kb", type=int, default=16, help="文本附件大小（KB）")
+    run_parser.add_argument("--images", type=int, default=0, help="每个请求上传的图片数")
+    run_parser.add_argument("--context-length", type=int, default=10, help="携带的历史消息数")
+    run_parser.add_argument("--stall-threshold", type=float, default=2.0, help="两行之间超过该间隔（秒）记为流中断")
+    run_parser.add_argument("--timeout", type=float, default=300.0, help="单个请求的读取超时（秒）")
+    run_parser.add_argument("--startup-timeout", type=float, default=120.0, help="等待服务就绪的时间（秒）")
+    run_parser.add_argument("--warmup", type=int, default=1, help="预热请求数（不计入结果）")
+    run_parser.add_argument("--output", help="将报告写入JSON文件")
+    add_stub_arguments(run_parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    args = parse_args(argv)
+    if args.command == "serve":
+        asyncio.run(serve(args))
+        return None
+
+    report = asyncio.run(run_load(args))
+    print(format_report(report))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+纯Python热点路径的微基准测试，使用不同规模的合成输入，用于证明算法改进、发现性能回退。
+
+每个用例是 bench_xxx(benchmark, size) 形式的函数，benchmark的调用方式与pytest-benchmark的夹具相同
+（benchmark(func, *args) / benchmark.pedantic(func, setup=...)），也可以由本文件自带的运行器执行。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.micro                          # 默认规模
+    python -m benchmarks.micro --large                  # 包含10万级的大规模输入
+    python -m benchmarks.micro -k adcode --json data/bench/micro.json
+    python -m benchmarks.micro --compare data/bench/micro.json --threshold 0.2  # 比基线慢20%以上时返回非0
+
+有用例出错，或基线中有结果的用例本次出错/跳过时同样返回非0
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 合成数据使用固定种子，保证各次运行的输入相同
+SEED = 20250111
+
+
+class Benchmark:
+    """
+    计时器，调用方式与pytest-benchmark的benchmark夹具一致
+
+    先校准每轮的调用次数，使一轮耗时不低于min_time / min_rounds，再在min_time内尽量多跑几轮，
+    记录每次调用的平均耗时
+    """
+
+    def __init__(self, min_time: float = 0.5, min_rounds: int = 3, max_rounds: int = 200):
+        self.min_time = min_time
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.samples: List[float] = []
+
+    def __call__(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        result = func(*args, **kwargs)  # 预热，同时得到返回值
+
+        # 校准每轮的调用次数
+        iterations = 1
+        target = self.min_time / max(1, self.min_rounds * 4)
+        while True:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            if elapsed >= target or iterations >= 1 << 20:
+                break
+            iterations *= 2
+
+        self.samples = []
+        deadline = time.perf_counter() + self.min_time
+        while len(self.samples) < self.min_rounds or (time.perf_counter() < deadline
+                                                      and len(self.samples) < self.max_rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func(*args, **kwargs)
+            self.samples.append((time.perf_counter() - start) / iterations)
+        return result
+
+    def pedantic(self, target: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+                 setup: Optional[Callable[[], Tuple[tuple, dict]]] = None, rounds: Optional[int] = None,
+                 iterations: int = 1) -> Any:
+        """
+        每轮调用前执行setup（不计时），适用于会修改输入的函数
+
+        setup返回(args, kwargs)时替换本轮的参数
+        """
+        rounds = rounds or self.min_rounds
+        self.samples = []
+        result = None
+        for _ in range(rounds):
+            call_args, call_kwargs = args, kwargs or {}
+            if setup is not None:
+                prepared = setup()
+                if prepared is not None:
+                    call_args, call_kwargs = prepared
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = target(*call_args, **call_kwargs)
+            self.samples.append((time.perf_counter() - start) / iterations)
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        samples = self.samples
+        return {
+            "rounds": len(samples),
+            "min": min(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.fmean(samples),
+            "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0
+        }
+
+
+@dataclass
+class Case:
+    """一个基准用例：函数和它的输入规模"""
+    name: str
+    func: Callable
+    sizes: List[int]
+    large_sizes: List[int] = field(default_factory=list)
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, sizes: List[int], large_sizes: Optional[List[int]] = None):
+    """注册基准用例，large_sizes只在 --large 时运行"""
+    def decorator(func):
+        CASES.append(Case(name=name, func=func, sizes=sizes, large_sizes=large_sizes or []))
+        return func
+    return decorator
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测函数中的print输出（如VectorStore.query会打印检索结果）"""
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# ---------------------------------------------------------------------- 合成数据
+
+_WORDS = ["异步", "编程", "事件循环", "协程", "任务", "调度", "agent", "workflow", "token", "向量",
+          "检索", "知识库", "模型", "推理", "并发", "latency", "throughput", "缓存", "文件", "解析"]
+
+
+def synthetic_text(lines: int, long_line_every: int = 200) -> str:
+    """中英混合文本，约每long_line_every行插入一个超过分块长度的长行"""
+    rng = random.Random(SEED)
+    result = []
+    for index in range(lines):
+        count = 400 if long_line_every and index % long_line_every == long_line_every - 1 else rng.randint(5, 20)
+        result.append(" ".join(rng.choice(_WORDS) for _ in range(count)))
+    return "\n".join(result)
+
+
+def synthetic_regions(count: int) -> Dict[str, Dict[str, str]]:
+    """
+    与citycode.xlsx结构相同的区域表：省（xx0000）、地级市（xxxx00）、区县（其它）
+
+    约每10个区县对应1个地级市，每10个地级市对应1个省
+    """
+    regions: Dict[str, Dict[str, str]] = {}
+    province = city = 0
+    index = 0
+    while len(regions) < count:
+        if index % 100 == 0:
+            province += 1
+            city = 0
+            regions[f"测试省{province}省"] = {"adcode": f"{province:02d}0000", "citycode": ""}
+        elif index % 10 == 0:
+            city += 1
+            regions[f"测试市{province}x{city}市"] = {"adcode": f"{province:02d}{city:02d}00", "citycode": ""}
+        else:
+            regions[f"样例{province}x{city}x{index % 10}区"] = {
+                "adcode": f"{province:02d}{city:02d}{index % 10:02d}", "citycode": ""
+            }
+        index += 1
+    return regions
+
+
+def synthetic_workflow(nodes: int) -> Dict[str, Any]:
+    """ComfyUI API格式的工作流，每个节点的inputs中包含需要替换的参数占位符"""
+    workflow = {}
+    placeholders = ["prompt_data_json_workflow", "negative_prompt_data_json_workflow",
+                    "width_data_json_workflow", "height_data_json_workflow", "steps_data_json_workflow"]
+    for index in range(nodes):
+        workflow[str(index)] = {
+            "class_type": "KSampler" if index % 5 == 0 else "CLIPTextEncode",
+            "inputs": {
+                "seed": "seed_data_json_workflow" if index % 5 == 0 else 0,
+                "cfg": "cfg_data_json_workflow" if index % 5 == 0 else 7,
+                "text": placeholders[index % len(placeholders)],
+                "clip": [str(max(0, index - 1)), 0],
+                "model": [str(max(0, index - 2)), 0],
+                "denoise": 1.0
+            },
+            "_meta": {"title": f"node {index}"}
+        }
+    return workflow
+
+
+def synthetic_llm_response(lines: int) -> str:
+    """带代码块标记、整行注释和行内注释的规划结果"""
+    body = ['```json', '{', '  "tasks": [']
+    for index in range(lines):
+        if index % 3 == 0:
+            body.append(f'    // 第{index}个任务的说明')
+        body.append(f'    {{"id": "task_{index}", "tool_name": "ChatTool", "reason": "说明 {index}", '
+                    f'"order": {index}, "depends_on": []}},  # 行内注释')
+    body += ['  ],', '  "execution_mode": "串行"', '}', '```']
+    return "\n".join(body)
+
+
+# ---------------------------------------------------------------------- 用例
+
+@case("read_files.get_chunk", sizes=[1_000, 10_000], large_sizes=[100_000])
+def bench_get_chunk(benchmark, size: int):
+    """ReadFiles.get_chunk：size行文本的分块（逐行tiktoken编码）"""
+    from agent_workflow.utils.read_files import ReadFiles
+
+    text = synthetic_text(size)
+    benchmark(ReadFiles.get_chunk, text, 600, 150)
+
+
+@case("vector_store.query", sizes=[1_000, 10_000], large_sizes=[100_000])
+def bench_vector_store_query(benchmark, size: int, dim: int = 128):
+    """VectorStore.query：size个向量的余弦相似度检索（向量为列表，与load_vector加载后相同）"""
+    from agent_workflow.rag.base import VectorStore
+
+    rng = random.Random(SEED)
+    store = VectorStore(model="bench", document=[f"文档片段{i}" for i in range(size)])
+    store.vectors = [[rng.uniform(-1, 1) for _ in range(dim)] for _ in range(size)]
+    query_vector = [rng.uniform(-1, 1) for _ in range(dim)]
+
+    class StaticEmbedding:
+        @staticmethod
+        def get_embedding(text, model=None):
+            return query_vector
+
+    with quiet():
+        benchmark(store.query, "查询", StaticEmbedding, 3)
+
+
+@case("weather_tool.get_adcode", sizes=[3_000], large_sizes=[30_000])
+def bench_get_adcode(benchmark, size: int):
+    """WeatherTool._get_adcode：精确、带"市"、模糊城市、区县和未命中（全表扫描）各一次"""
+    from agent_workflow.tools.tool.weather_tool import WeatherTool
+
+    tool = WeatherTool(api_key="bench")
+    tool.region_lookup = synthetic_regions(size)
+    provinces = size // 100 or 1
+    last_city = f"测试市{provinces}x1"
+    queries = [
+        f"测试省{provinces}省",  # 精确匹配
+        last_city,  # 补"市"后精确匹配
+        f"市{provinces}x1",  # 模糊匹配地级市（表尾）
+        f"样例{provinces}x1x3",  # 区县匹配
+        "不存在的地方"  # 未命中，两轮全表扫描
+    ]
+
+    def lookup_all():
+        return [tool._get_adcode(query) for query in queries]
+
+    benchmark(lookup_all)
+
+
+@case("message_input.process_input", sizes=[10, 100], large_sizes=[1_000])
+def bench_process_input(benchmark, size: int):
+    """MessageInput.process_input：size个图片、文件附件和URL的校验"""
+    from agent_workflow.tools.base import MessageInput
+
+    with tempfile.TemporaryDirectory(prefix="bench_micro_") as root:
+        images, files = [], []
+        for index in range(size):
+            for sub_dir, name, target in (("images", f"img_{index}.png", images),
+                                          ("files", f"doc_{index}.pdf", files)):
+                os.makedirs(os.path.join(root, "upload", sub_dir), exist_ok=True)
+                open(os.path.join(root, "upload", sub_dir, name), "wb").close()
+                target.append(f"{sub_dir}/{name}")
+        urls = [f"https://example.com/page/{index}?q=bench" for index in range(size)]
+        message = MessageInput(query="基准测试", images=images, files=files, urls=urls)
+
+        # validate_file按相对路径upload/...查找文件
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            with quiet():
+                benchmark(message.process_input)
+        finally:
+            os.chdir(cwd)
+
+
+@case("comfyui_api.update_workflow_params", sizes=[100, 1_000], large_sizes=[10_000])
+def bench_update_workflow_params(benchmark, size: int):
+    """ComfyuiAPI._update_workflow_params：size个节点的工作流参数替换（每轮使用新的工作流副本）"""
+    from agent_workflow.utils.comfyui_api import ComfyuiAPI
+
+    # 只测参数替换，不建立WebSocket连接
+    api = object.__new__(ComfyuiAPI)
+    template = json.dumps(synthetic_workflow(size))
+    params = {"prompt_data_json_workflow": "a cat", "negative_prompt_data_json_workflow": "nsfw",
+              "width_data_json_workflow": 1024, "height_data_json_workflow": 1024,
+              "steps_data_json_workflow": 20, "cfg_scale_data_json_workflow": 7.5}
+
+    benchmark.pedantic(api._update_workflow_params,
+                       setup=lambda: ((json.loads(template), params), {}),
+                       rounds=20)
+
+
+@case("intent_parser.clean_response", sizes=[1_000, 10_000], large_sizes=[100_000])
+def bench_clean_response(benchmark, size: int):
+    """ToolIntentParser._clean_response：size个任务行的规划结果去除代码块标记和注释"""
+    from agent_workflow.core.tool_executor import ToolIntentParser
+
+    # 只测响应清理，不创建LLM客户端
+    parser = object.__new__(ToolIntentParser)
+    content = synthetic_llm_response(size)
+    benchmark(parser._clean_response, content)
+
+
+# ---------------------------------------------------------------------- 运行器
+
+def run_cases(cases: List[Case], large: bool, min_time: float) -> List[Dict[str, Any]]:
+    results = []
+    for item in cases:
+        for size in item.sizes + (item.large_sizes if large else []):
+            benchmark = Benchmark(min_time=min_time)
+            record: Dict[str, Any] = {"name": item.name, "size": size}
+            gc.collect()
+            try:
+                item.func(benchmark, size)
+                record.update(benchmark.stats())
+            except ImportError as e:
+                record["skipped"] = f"{type(e).__name__}: {e}"
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            results.append(record)
+            print(format_record(record), flush=True)
+    return results
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f}{unit}"
+    return f"{seconds / 1e-9:8.0f}ns"
+
+
+def format_record(record: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    label = f"{record['name']:<38}{record['size']:>8}"
+    if "skipped" in record:
+        return f"{label}  跳过: {record['skipped']}"
+    if "error" in record:
+        return f"{label}  出错: {record['error']}"
+    text = (f"{label}  中位数 {format_time(record['median'])}  最小 {format_time(record['min'])}  "
+            f"标准差 {format_time(record['stddev'])}  轮数 {record['rounds']}")
+    if baseline and baseline.get("median"):
+        text += f"  基线比 {record['median'] / baseline['median']:.2f}x"
+    return text
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> List[str]:
+    """与基线比较中位数，返回慢于基线(1 + threshold)倍的用例，基线有结果而本次出错或跳过的也视为回退"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(item["name"], item["size"]): item for item in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\n与基线比较: {baseline_path}")
+    for record in results:
+        base = baseline.get((record["name"], record["size"]))
+        if base is None:
+            continue
+        if "median" not in record:
+            if base.get("median"):
+                print(format_record(record))
+                regressions.append(f"{record['name']}[{record['size']}] 无结果")
+            continue
+        print(format_record(record, base))
+        if base.get("median") and record["median"] > base["median"] * (1 + threshold):
+            regressions.append(f"{record['name']}[{record['size']}] "
+                               f"{record['median'] / base['median']:.2f}x")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="热点路径微基准测试")
+    parser.add_argument("-k", "--filter", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--large", action="store_true", help="包含大规模输入（耗时较长）")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个用例每种规模的最短计时时间（秒）")
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="中位数慢于基线该比例时视为回退")
+    args = parser.parse_args(argv)
+
+    cases = [item for item in CASES if not args.filter or args.filter in item.name]
+    results = run_cases(cases, large=args.large, min_time=args.min_time)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "timestamp": time.time(), "results": results},
+                      f, ensure_ascii=False, indent=2)
+
+    failed = False
+    errors = [f"{record['name']}[{record['size']}]" for record in results if "error" in record]
+    if errors:
+        print(f"\n用例出错: {', '.join(errors)}")
+        failed = True
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n性能回退（>{args.threshold:.0%}）: {', '.join(regressions)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
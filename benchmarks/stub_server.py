@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 查询中的场景标记，如"[bench:chain] 介绍一下..."，桩服务据此返回对应的任务规划
+SCENARIO_PATTERN = re.compile(r"\[bench:([\w-]+)]")
+
+# 内置的任务规划场景（只使用ChatTool，无需其它后端服务）
+DEFAULT_PLANS: Dict[str, Dict[str, Any]] = {
+    # 单个任务
+    "chat": {
+        "tasks": [
+            {"id": "task_1", "tool_name": "ChatTool", "reason": "基准测试：聊天", "order": 1, "depends_on": []}
+        ],
+        "execution_mode": "串行",
+        "execution_strategy": {"parallel_groups": [], "reason": "单个任务"}
+    },
+    # 两个串行任务，第二个依赖第一个的结果（触发参数优化和预执行）
+    "chain": {
+        "tasks": [
+            {"id": "task_1", "tool_name": "ChatTool", "reason": "基准测试：第一步", "order": 1, "depends_on": []},
+            {"id": "task_2", "tool_name": "ChatTool", "reason": "基准测试：第二步", "order": 2,
+             "depends_on": ["task_1"]}
+        ],
+        "execution_mode": "串行",
+        "execution_strategy": {"parallel_groups": [], "reason": "第二步依赖第一步"}
+    },
+    # 两个互不依赖的任务并行执行
+    "parallel": {
+        "tasks": [
+            {"id": "task_1", "tool_name": "ChatTool", "reason": "基准测试：并行任务一", "order": 1, "depends_on": []},
+            {"id": "task_2", "tool_name": "ChatTool", "reason": "基准测试：并行任务二", "order": 1, "depends_on": []}
+        ],
+        "execution_mode": "并行",
+        "execution_strategy": {"parallel_groups": [["task_1", "task_2"]], "reason": "任务互不依赖"}
+    }
+}
+
+
+@dataclass
+class StubConfig:
+    """
+    桩服务的行为配置
+
+    一次生成的耗时 = first_token_latency + 输出token数 / token_rate，
+    token按chars_per_token个字符切分，流式响应逐token输出
+    """
+    first_token_latency: float = 0.2  # 首token延迟（秒），模拟提示词预填充
+    token_rate: Optional[float] = 50.0  # 每秒输出token数，None表示不限速
+    chars_per_token: int = 2
+    answer_tokens: int = 64  # 聊天回答的token数
+    embedding_dim: int = 64
+    error_rate: float = 0.0  # 随机返回500的比例，用于观察重试行为
+    model: str = "stub"
+    plans: Dict[str, Dict[str, Any]] = field(default_factory=lambda: dict(DEFAULT_PLANS))
+    default_scenario: str = "chat"
+
+
+def _message_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+        parts.append(str(content or ""))
+    return "\n".join(parts)
+
+
+def _fill_schema(schema: Dict[str, Any], text: str) -> Any:
+    """按JSON Schema生成一个满足约束的值，字符串取用户输入"""
+    if not isinstance(schema, dict):
+        return text
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if schema.get("anyOf"):
+        return _fill_schema(schema["anyOf"][0], text)
+    schema_type = schema.get("type")
+    if schema_type == "object" or "properties" in schema:
+        properties = schema.get("properties") or {}
+        required = schema.get("required") or list(properties)
+        return {name: _fill_schema(properties.get(name, {}), text) for name in required}
+    if schema_type == "array":
+        return []
+    if schema_type in ("number", "integer"):
+        return 1
+    if schema_type == "boolean":
+        return False
+    if schema_type == "null":
+        return None
+    return text
+
+
+class StubLLMServer:
+    """
+    本地模型服务替身，用于离线压测
+
+    支持OpenAI兼容的 /v1/chat/completions（ChatTool使用）和Ollama的 /api/chat、/api/embed
+    （意图解析、参数优化、向量检索使用）。按请求内容返回预置的任务规划、参数或聊天回答，
+    并统计各接口的调用次数。服务运行在独立线程的事件循环中，不占用被测进程的事件循环
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: Optional[int] = None):
+        self.config = config or StubConfig()
+        self.host = host
+        self.port = port or self._free_port(host)
+        self.calls: Counter = Counter()
+        self._calls_lock = threading.Lock()
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.app = self._create_app()
+
+    @staticmethod
+    def _free_port(host: str) -> int:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind((host, 0))
+            return sock.getsockname()[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0) -> None:
+        """在后台线程中启动服务，等待端口可用后返回"""
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="stub-llm", daemon=True)
+        self._thread.start()
+
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"桩服务启动失败: {self.url}")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def call_counts(self) -> Dict[str, int]:
+        with self._calls_lock:
+            return dict(self.calls)
+
+    def _count(self, name: str) -> None:
+        with self._calls_lock:
+            self.calls[name] += 1
+
+    # ------------------------------------------------------------------ 响应内容
+
+    def _scenario(self, text: str) -> str:
+        match = SCENARIO_PATTERN.search(text)
+        if match and match.group(1) in self.config.plans:
+            return match.group(1)
+        return self.config.default_scenario
+
+    def _plan(self, text: str, fused: bool) -> Dict[str, Any]:
+        plan = json.loads(json.dumps(self.config.plans[self._scenario(text)]))
+        if fused:
+            query = self._query(text)
+            for task in plan["tasks"]:
+                # 依赖上游结果的任务参数留空，由参数优化生成
+                task["parameters"] = None if task.get("depends_on") else {"message": query, "context": []}
+        return plan
+
+    @staticmethod
+    def _query(text: str) -> str:
+        match = re.search(r"用户输入[:：]\s*(.+)", text)
+        return match.group(1).strip() if match else "benchmark"
+
+    def _json_reply(self, messages: List[Dict[str, Any]], schema: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        意图解析和参数优化请求返回JSON，其它请求返回None（按聊天回答处理）
+
+        请求带format时按schema判断，否则按提示词判断
+        """
+        text = _message_text(messages)
+        if isinstance(schema, dict):
+            properties = schema.get("properties") or {}
+            if "tasks" in properties:
+                task_schema = properties["tasks"].get("items", {})
+                fused = "parameters" in (task_schema.get("properties") or {})
+                return json.dumps(self._plan(text, fused), ensure_ascii=False)
+            if "explanation" in properties:
+                tool_name = next(name for name in properties if name != "explanation")
+                parameters = _fill_schema(properties[tool_name], self._query(text))
+                return json.dumps({tool_name: parameters, "explanation": "基准测试参数"}, ensure_ascii=False)
+            return json.dumps(_fill_schema(schema, self._query(text)), ensure_ascii=False)
+
+        if "任务规划器" in text:
+            return json.dumps(self._plan(text, fused="配置工具参数" in text), ensure_ascii=False)
+        if "参数优化专家" in text:
+            match = re.search(r"工具名称[:：]\s*(\w+)", text)
+            tool_name = match.group(1) if match else "ChatTool"
+            parameters = {"message": self._query(text), "context": []}
+            return json.dumps({tool_name: parameters, "explanation": "基准测试参数"}, ensure_ascii=False)
+        return None
+
+    def _answer(self) -> str:
+        sentence = "这是离线基准测试的模拟回答。"
+        size = self.config.answer_tokens * self.config.chars_per_token
+        return (sentence * (size // len(sentence) + 1))[:size]
+
+    def _tokens(self, content: str) -> List[str]:
+        step = max(1, self.config.chars_per_token)
+        return [content[i:i + step] for i in range(0, len(content), step)] or [""]
+
+    def _embedding(self, text: str) -> List[float]:
+        """由文本哈希生成的确定性单位向量，相同文本得到相同向量"""
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.uniform(-1, 1) for _ in range(self.config.embedding_dim)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    async def _generate(self, content: str):
+        """按首token延迟和输出速率逐token产出"""
+        await asyncio.sleep(self.config.first_token_latency)
+        interval = 1 / self.config.token_rate if self.config.token_rate else 0
+        for index, token in enumerate(self._tokens(content)):
+            if index and interval:
+                await asyncio.sleep(interval)
+            yield token
+
+    def _should_fail(self) -> bool:
+        return self.config.error_rate > 0 and random.random() < self.config.error_rate
+
+    # ------------------------------------------------------------------ 接口
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/")
+        async def root():
+            return {"status": "ok"}
+
+        @app.get("/api/tags")
+        async def tags():
+            return {"models": [{"name": self.config.model, "model": self.config.model}]}
+
+        @app.post("/api/chat")
+        async def ollama_chat(request: Request):
+            body = await request.json()
+            self._count("ollama.chat")
+            if self._should_fail():
+                return JSONResponse({"error": "stub error"}, status_code=500)
+
+            messages = body.get("messages") or []
+            content = self._json_reply(messages, body.get("format"))
+            if content is None:
+                content = self._answer()
+            model = body.get("model") or self.config.model
+            prompt_tokens = len(_message_text(messages)) // max(1, self.config.chars_per_token)
+            tokens = self._tokens(content)
+
+            def chunk(text: str, done: bool) -> Dict[str, Any]:
+                data = {
+                    "model": model,
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "message": {"role": "assistant", "content": text},
+                    "done": done
+                }
+                if done:
+                    data.update(done_reason="stop", prompt_eval_count=prompt_tokens, eval_count=len(tokens))
+                return data
+
+            if body.get("stream", True):
+                async def stream():
+                    async for token in self._generate(content):
+                        yield json.dumps(chunk(token, False), ensure_ascii=False) + "\n"
+                    yield json.dumps(chunk("", True), ensure_ascii=False) + "\n"
+
+                return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+            parts = [token async for token in self._generate(content)]
+            return chunk("".join(parts), True)
+
+        @app.post("/api/embed")
+        async def ollama_embed(request: Request):
+            body = await request.json()
+            self._count("ollama.embed")
+            inputs = body.get("input") or []
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            return {"model": body.get("model") or self.config.model,
+                    "embeddings": [self._embedding(text) for text in inputs]}
+
+        @app.post("/api/embeddings")
+        async def ollama_embeddings(request: Request):
+            body = await request.json()
+            self._count("ollama.embed")
+            return {"embedding": self._embedding(body.get("prompt", ""))}
+
+        @app.post("/v1/chat/completions")
+        async def openai_chat(request: Request):
+            body = await request.json()
+            self._count("openai.chat")
+            if self._should_fail():
+                return JSONResponse({"error": {"message": "stub error"}}, status_code=500)
+
+            messages = body.get("messages") or []
+            content = self._json_reply(messages, None) or self._answer()
+            model = body.get("model") or self.config.model
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            created = int(time.time())
+            prompt_tokens = len(_message_text(messages)) // max(1, self.config.chars_per_token)
+
+            if body.get("stream"):
+                async def stream():
+                    first = True
+                    async for token in self._generate(content):
+                        delta = {"role": "assistant", "content": token} if first else {"content": token}
+                        first = False
+                        data = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                                "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                        yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                    data = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                            "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+                    yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                    yield "data: [DONE]\n\n"
+
+                return StreamingResponse(stream(), media_type="text/event-stream")
+
+            parts = [token async for token in self._generate(content)]
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(parts),
+                          "total_tokens": prompt_tokens + len(parts)}
+            }
+
+        return app
@@ -210,6 +210,29 @@ const handleSend = async (message) => {
                     }
                   }];
 
+                case 'delta':
+                  if (lastMessage?.type === 'assistant') {
+                    const currentContent = typeof lastMessage.content === 'object' && lastMessage.content !== null
+                      ? lastMessage.content
+                      : { type: 'mixed', text: '', files: [], images: [] };
+                    const updatedMessage = {
+                      ...lastMessage,
+                      content: {
+                        ...currentContent,
+                        text: (currentContent.text || '') + data.content
+                      }
+                    };
+                    return [...prev.slice(0, -1), updatedMessage];
+                  }
+                  return prev;
+
+                case 'delta_reset':
+                  // 工具重试会重新流式输出，清空上一次尝试已显示的内容
+                  if (lastMessage?.type === 'assistant' && typeof lastMessage.content === 'object' && lastMessage.content !== null) {
+                    return [...prev.slice(0, -1), { ...lastMessage, content: { ...lastMessage.content, text: '' } }];
+                  }
+                  return prev;
+
                 case 'thinking_process':
                   if (lastMessage?.type === 'assistant') {
                     return [...prev.slice(0, -1), { ...lastMessage, thinkingProcess: data.content }];
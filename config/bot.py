@@ -124,9 +124,10 @@ TOOL_INTENT_PARSER = """
     - 多任务时规划正确的执行顺序
     
     3. 执行规划
-    - 设置清晰的任务依赖关系
+    - 设置清晰的任务依赖关系，depends_on填写所依赖任务的id
     - 确保执行顺序合理可行
-    - 当前仅支持串行执行
+    - 互不依赖的任务（如查询天气、搜索新闻、生成图片）使用"并行"模式，parallel_groups填写可同时执行的任务id分组，如[["task_1", "task_2"]]
+    - 需要使用前一个任务结果的任务必须在depends_on中声明依赖
     
     返回JSON格式：
     {{
@@ -149,8 +150,65 @@ TOOL_INTENT_PARSER = """
     注意：
     1. tasks列表至少包含一个任务
     2. reason必须清晰说明选择原因
-    3. 设置正确的依赖关系
-    4. 仅支持串行执行
+    3. 设置正确的依赖关系，禁止出现循环依赖
+    4. execution_mode只能是"串行"或"并行"，存在相互独立的任务时使用"并行"
+    """
+
+# 融合规划提示词：一次调用同时完成任务规划和参数配置
+FUSED_TOOL_PLANNER = """
+    你是一个任务规划器，负责分析用户需求、规划工具的执行顺序，并直接为每个任务配置工具参数。请遵循以下规则：
+    
+    1. 基本原则：
+    - 必须至少规划一个任务，不允许返回空任务列表
+    - 当用户要分析历史内容时，优先使用ChatTool
+    - 当用户要求重新执行或获取新信息时，使用对应专业工具
+    - 图片生成使用ImageGeneratorTool，搜索使用SearchTool
+    
+    2. 参数配置原则：
+    - 参数必须符合工具的参数要求（必需参数、类型、有效值）
+    - 遵守工具的参数规则，不要在参数中构造回复内容
+    - 需要使用其它任务结果的任务，必须在depends_on中声明依赖，parameters设置为null，执行时再根据上游结果配置
+    
+    <工具信息>
+    可用工具:
+    {tool_list}
+    </工具信息>
+    
+    <输入信息>
+    用户输入: {query}
+    对话历史记录: {history}
+    </输入信息>
+    
+    执行规划：
+    - 设置清晰的任务依赖关系，depends_on填写所依赖任务的id
+    - 互不依赖的任务使用"并行"模式，parallel_groups填写可同时执行的任务id分组，如[["task_1", "task_2"]]
+    
+    返回JSON格式：
+    {{
+        "tasks": [
+            {{
+                "id": "task_1",
+                "tool_name": "工具名称",
+                "reason": "为什么需要使用这个工具",
+                "order": 1,
+                "depends_on": [],
+                "parameters": {{
+                    // 该工具的参数
+                }}
+            }}
+        ],
+        "execution_mode": "串行",
+        "execution_strategy": {{
+            "parallel_groups": [],
+            "reason": "执行策略的原因"
+        }}
+    }}
+    
+    注意：
+    1. tasks列表至少包含一个任务
+    2. reason必须清晰说明选择原因
+    3. 设置正确的依赖关系，禁止出现循环依赖
+    4. execution_mode只能是"串行"或"并行"，存在相互独立的任务时使用"并行"
     """
 
 # 参数优化器提示词
@@ -434,3 +492,34 @@ TOOL_RULES = {
           * 从用户输入中准确提取地点信息
         """
 }
+
+# 快速路由规则：命中时跳过任务规划和参数优化，直接执行单个工具
+# patterns为正则表达式，parameters为参数模板，{query}为用户输入，其它占位符取自正则中的命名分组
+ROUTER_RULES = [
+    {
+        "tool_name": "ChatTool",
+        "patterns": [
+            # 问候语
+            r"^(你好|您好|hi|hello|hey|嗨|哈喽|哈啰|在吗|早|早上好|早安|中午好|下午好|晚上好|晚安)[呀啊吖哇!！~～。.,，\s]*$",
+            # 感谢与告别
+            r"^(谢谢|谢啦|多谢|感谢|thanks|thank you|再见|拜拜|bye|明白了|知道了|收到)[呀啊吖哇!！~～。.,，\s]*$",
+            # 身份与能力询问
+            r"^(你是谁|你叫什么(名字)?|你是什么|你会什么|你能做什么|你有什么功能)[呀啊吖呢?？!！~～。.\s]*$",
+        ],
+        "parameters": {
+            "message": "{query}",
+            "context": []
+        }
+    },
+    {
+        "tool_name": "WeatherTool",
+        "patterns": [
+            # 只路由查询当前天气、且包含地名的问题：出现预报类时间词时交给任务规划，
+            # 地名不能包含时间词和"外面""这里"等代词，至少两个字
+            r"^(?!.*(?:明天|明日|后天|明早|明晚|下周|下星期|本周|这周|周末|未来|预报))(帮我|请问|请|麻烦)?(查一下|查查|查询|看一下|看看)?(今天|今日|现在|当前)?(?P<location>(?:(?!今天|今日|现在|当前|外面|这里|这边|那里|本地|附近|天气|气温|[和与跟及的])[一-龥]){2,10}?)(今天|今日|现在|当前)?的?(天气|气温)(怎么样|如何|咋样|情况)?[呀啊呢?？!！。.\s]*$",
+        ],
+        "parameters": {
+            "location": "{location}"
+        }
+    },
+]
@@ -91,5 +91,150 @@ SEARCH_TOOL_EMBEDDING_CONFIG = {
     "model": "bge-m3:latest"
 }
 
-# 任务允许资源数
-MAX_CONCURRENT = 3
+# 任务允许资源数（执行器按请求上下文执行，不再共享请求状态，可同时处理多个请求）
+MAX_CONCURRENT = 6
+
+#########################################  性能信息  #########################################
+
+# 并行模式下同时执行的工具任务数上限
+TOOL_PARALLEL_LIMIT = 3
+
+# 单个请求的超时时间（秒），为None表示不限时
+REQUEST_TIMEOUT = 600
+
+# 系统负载采样：后台定时在线程中采样CPU、内存、磁盘，并记录事件循环延迟和排队数，
+# 接收请求时只读取最近一次的采样结果，不阻塞事件循环
+SYSTEM_MONITOR = {
+    "sample_interval": 1.0,  # 采样间隔（秒），CPU使用率为两次采样之间的平均值
+    "log_interval": 5.0,  # 过载告警日志的最小间隔（秒）
+    "stale_after": 10.0,  # 采样结果超过该时长未更新时不再据此拒绝请求（秒）
+    "cpu_threshold": 80.0,
+    "memory_threshold": 85.0,
+    "disk_threshold": 90.0,
+    "loop_lag_threshold": None,  # 事件循环延迟阈值（秒），None表示不检查（启用时建议0.5）
+    "queue_depth_threshold": None  # 排队请求数阈值，None表示不检查
+}
+
+# 任务规划缓存配置
+PLAN_CACHE = {
+    "enabled": True,
+    "path": "data/plan_cache.json",  # 相对项目根目录
+    "max_entries": 1000,
+    "ttl": 7 * 24 * 3600,  # 缓存有效期（秒）
+    "similarity_threshold": None,  # 语义匹配阈值（如0.92），None表示只做精确匹配
+    "history_turns": 2  # 计入缓存键的最近对话轮数，依赖上文的问题只在上文相同时命中；0表示不区分对话历史
+}
+
+# 工具实例策略覆盖，未配置的工具使用工具类上声明的instance_policy
+# 例：{"ImageGeneratorTool": {"policy": "pooled", "pool_size": 2}, "WeatherTool": {"policy": "singleton"}}
+TOOL_INSTANCE_POLICIES = {}
+# 工具结果缓存，缓存策略由工具类的cache_policy声明（未声明的工具不缓存）
+TOOL_RESULT_CACHE = {
+    "enabled": True,
+    "dir": "data/tool_cache"  # 磁盘缓存目录，相对项目根目录
+}
+# 启动时是否对单例/池化工具执行warmup
+TOOL_WARMUP_ON_STARTUP = True
+
+# 工具清单，记录工具描述和模块指纹，启动时不导入未修改的工具模块
+TOOL_MANIFEST = {
+    "enabled": True,
+    "path": "data/tool_manifest.json"  # 相对项目根目录
+}
+# 启动时预加载的工具（其余工具在任务选中时才导入）
+TOOL_PRELOAD = ["ChatTool"]
+
+# 融合规划模式：任务规划时同时生成每个任务的参数，不依赖上游结果的任务跳过参数优化
+FUSED_PLANNING = False
+
+# 参数优化预执行：执行计划确定后，依赖已满足的任务提前在后台优化参数，与工具执行重叠
+SPECULATIVE_PARAMETERS = {
+    "enabled": True,
+    "max_concurrent": 2  # 单个请求同时进行的预执行数量上限
+}
+
+# 结构化输出：任务规划和参数优化请求模型按JSON Schema输出（Ollama format参数），减少解析失败重试
+STRUCTURED_OUTPUT = {
+    "enabled": True
+}
+
+# 上下文token预算：对话历史和上游工具结果按阶段压缩，提示词预填充时间不随上游输出增长
+TOKEN_BUDGETS = {
+    "enabled": True,
+    "planner_history": 1500,  # 意图解析提示词中的对话历史
+    "tool_history": 2000,  # 传给工具（如ChatTool）的对话历史
+    "optimizer_context": 2000,  # 参数优化提示词中全部上游任务结果
+    "per_result": 800  # 单个上游任务结果
+}
+
+# 工具执行器：阻塞I/O使用线程池，CPU密集计算使用进程池，GPU推理使用单独的执行器
+EXECUTORS = {
+    "io_workers": 16,
+    "cpu_workers": None,  # None表示使用CPU核心数
+    "gpu_workers": 2  # GPU任务的并发上限，显存准入由GPU_SCHEDULER负责
+}
+
+# GPU调度：按模型显存占用做准入，放得下的模型同时驻留，显存不足时驱逐空闲模型或排队
+GPU_SCHEDULER = {
+    "enabled": True,
+    "total_memory_mb": None,  # 显存预算，None表示从CUDA读取；无GPU的机器可填写模拟值进行测试
+    "reserve_mb": 1024,  # 预留给CUDA上下文、碎片等
+    "idle_ttl": 300,  # 模型空闲多久后释放（秒），None表示只在显存不足时释放
+    "queue_timeout": 600,  # 排队的最长时间（秒），None表示一直等待
+    "default_footprint_mb": 8192,  # 未登记模型的显存占用
+    # 各模型的显存占用（MB，估计值，可按实际情况调整）：footprint_mb为权重常驻显存，workspace_mb为单次任务的工作显存
+    "models": {
+        "flux": {"footprint_mb": 12288, "workspace_mb": 4096},  # 开启了CPU offload
+        "sd3": {"footprint_mb": 10240, "workspace_mb": 3072},  # 4bit量化
+        "glm-edge-v-5b": {"footprint_mb": 11264, "workspace_mb": 1536},
+        "OpenBMB/MiniCPM-V-2_6": {"footprint_mb": 16384, "workspace_mb": 2048},
+        "faster-whisper-large-v3": {"footprint_mb": 3584, "workspace_mb": 1024},  # 聊天界面的语音识别
+        "whisper-turbo": {"footprint_mb": 6144, "workspace_mb": 1024}  # 知识库的音频解析
+    }
+}
+
+# 重试：各层（意图解析、参数优化、工具执行、服务请求）按各自策略指数退避并加随机抖动，
+# 同一请求各层的重试共享预算，限制最坏情况下的耗时和对后端的放大请求
+RETRY = {
+    "budget": 6,  # 单个请求的重试总次数上限
+    "max_total_delay": 20,  # 单个请求的退避总时长上限（秒）
+    "policies": {
+        # max_attempts含首次尝试；第n次失败后等待[0, min(max_delay, base_delay * multiplier^(n-1))]内的随机时间
+        "intent": {"max_attempts": 3, "base_delay": 0.5, "max_delay": 4},
+        "optimizer": {"max_attempts": 3, "base_delay": 0.2, "max_delay": 2},
+        "tool": {"max_attempts": 3, "base_delay": 1, "max_delay": 8},
+        "tts": {"max_attempts": 3, "base_delay": 1, "max_delay": 8}
+    }
+}
+
+# 请求取消：聊天客户端断开后取消请求的任务树，工具收到取消后通过cancel钩子中止外部任务
+CANCELLATION = {
+    "disconnect_poll_interval": 0.5,  # 检测客户端断开的间隔（秒）
+    "tool_cancel_timeout": 5  # 等待工具cancel钩子完成的最长时间（秒）
+}
+
+# 链路追踪：记录每个请求各阶段（意图解析、参数优化、工具执行、格式化、保存历史、LLM调用）的耗时
+TRACING = {
+    "enabled": True,
+    "jsonl_path": "data/traces.jsonl",  # 相对项目根目录，None表示不写文件
+    "jsonl_max_bytes": 50 * 1024 * 1024,  # 单个文件上限，超过后轮转为traces.jsonl.1等，0表示不限制
+    "jsonl_backup_count": 3,  # 保留的轮转文件数
+    "otlp_endpoint": None,  # OTLP/HTTP JSON采集地址，如 "http://localhost:4318/v1/traces"
+    "service_name": "agent_workflow",
+    "max_traces": 200  # 内存中保留的最近请求数，供 /api/debug/trace 查询
+}
+
+# 意图快速路由配置（规则见config/bot.py中的ROUTER_RULES）
+ROUTER = {
+    "enabled": True,
+    "embedding_threshold": None,  # 向量分类器相似度阈值（如0.8），None表示只使用规则
+    "embedding_margin": 0.05  # 第一名需领先第二名的相似度差值
+}
+
+# 工具检索配置：按查询检索相关工具放入规划提示词，控制提示词长度
+TOOL_RETRIEVAL = {
+    "enabled": True,
+    "top_k": 5,  # 检索的工具数量
+    "always_include": ["ChatTool"],  # 始终放入提示词的工具
+    "min_tools": 12  # 注册工具数不超过该值时不检索，直接使用全部工具
+}
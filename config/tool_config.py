@@ -44,9 +44,29 @@ COMFYUI_MODEL = "dreamshaper.safetensors"  # 包含.safetensors
 #########################################  参数信息  #########################################
 IMAGE_GEN_TOOL_DATA={
     "model_type":"comfyui", # 可选择comfyui、sdwebui_forge、flux、sd3
-    "prompt_mode":"none" # 可选择rag、llm、none  可以选择none，参数优化会自动设置质量高的提示词
+    "prompt_mode":"none", # 可选择rag、llm、none  可以选择none，参数优化会自动设置质量高的提示词
+    "catalog_refresh_interval":300 # 可用模型/LoRA列表的后台刷新间隔（秒）
 }
 
 DESCRIPTION_IMAGE_TOOL_DATA={
     "model":"llama3.2-vision" # 可选择glm-edge-v-5b、OpenBMB/MiniCPM-V-2_6、llama3.2-vision 除了llama3.2的模型ollama支持，另外两个需要手动下载模型
 }
+
+# 后端服务健康检查与熔断：工具通过backends声明依赖的服务，服务熔断时工具不参与任务规划，执行时直接失败
+HEALTH_CHECKS = {
+    "enabled": True,
+    "interval": 30,  # 正常服务的探测间隔（秒）
+    "open_interval": 10,  # 熔断中服务的探测间隔（秒），探测成功立即恢复
+    "probe_timeout": 3,  # 单次探测超时（秒）
+    "failure_threshold": 3,  # 连续连接失败多少次后熔断
+    "recovery_timeout": 30,  # 没有探测地址的服务熔断多久后放行试探请求（秒）
+    # 探测地址：能连接且未返回5xx即视为可用，None表示只根据请求结果熔断
+    "backends": {
+        "comfyui": {"url": f"http://127.0.0.1:{COMFYUI_PORT}/system_stats"},
+        "forge": {"url": f"http://127.0.0.1:{FORGE_SDWEBUI_PORT}/"},
+        "perplexica": {"url": "http://localhost:3001/api/models"},
+        "gaode": {"url": "https://restapi.amap.com/v3/weather/weatherInfo"},
+        "f5_tts": {"url": f"http://127.0.0.1:{F5_TTS_PORT}/"},
+        "gpt_sovits": {"url": f"http://127.0.0.1:{GPT_SoVITS_PORT}/"}
+    }
+}
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+GPU调度器测试，使用模拟显存预算（total_memory_mb），无需GPU
+
+运行：python -m pytest tests/test_gpu_scheduler.py
+"""
+import asyncio
+
+import pytest
+
+from agent_workflow.utils.gpu_scheduler import GPUMemoryError, GPUScheduler
+
+
+def make_scheduler(total_memory_mb: int = 1000, **kwargs) -> GPUScheduler:
+    scheduler = GPUScheduler()
+    scheduler.configure(enabled=True, total_memory_mb=total_memory_mb, **kwargs)
+    return scheduler
+
+
+async def hold(scheduler: GPUScheduler, model: str, release: asyncio.Event, unloaded: list,
+               footprint_mb: int = 400, workspace_mb: int = 0) -> None:
+    """占用模型直到release被设置"""
+    async with scheduler.job(model, unload=lambda: unloaded.append(model),
+                             footprint_mb=footprint_mb, workspace_mb=workspace_mb):
+        await release.wait()
+
+
+async def wait_until(predicate, timeout: float = 1.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "等待条件超时"
+        await asyncio.sleep(0.001)
+
+
+def test_admission_runs_fitting_models_together_and_queues_the_rest():
+    async def main():
+        scheduler, unloaded = make_scheduler(), []
+        release_a, release_b, release_c = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        a = asyncio.create_task(hold(scheduler, "a", release_a, unloaded))
+        b = asyncio.create_task(hold(scheduler, "b", release_b, unloaded))
+        await wait_until(lambda: scheduler.stats()["running"] == 2)
+        assert scheduler.used_mb == 800
+
+        # 剩余200MB放不下c，且a、b都在运行不可驱逐
+        c = asyncio.create_task(hold(scheduler, "c", release_c, unloaded))
+        await wait_until(lambda: scheduler.queue_depth == 1)
+        assert scheduler.stats()["queued"] == ["c"]
+
+        # a结束后变为空闲，被驱逐给c腾出显存
+        release_a.set()
+        await a
+        await wait_until(lambda: unloaded == ["a"])
+        assert scheduler.stats()["running"] == 2
+        assert set(scheduler.stats()["resident"]) == {"b", "c"}
+        assert scheduler.queue_depth == 0
+
+        release_b.set()
+        release_c.set()
+        await asyncio.gather(b, c)
+        assert scheduler.stats()["running"] == 0
+        assert scheduler.used_mb == 800  # 空闲模型保持驻留
+
+    asyncio.run(main())
+
+
+def test_workspace_is_released_after_job():
+    async def main():
+        scheduler, unloaded = make_scheduler(), []
+        release = asyncio.Event()
+        task = asyncio.create_task(hold(scheduler, "a", release, unloaded, footprint_mb=300, workspace_mb=200))
+        await wait_until(lambda: scheduler.stats()["running"] == 1)
+        assert scheduler.used_mb == 500
+        release.set()
+        await task
+        assert scheduler.used_mb == 300
+
+    asyncio.run(main())
+
+
+def test_lru_eviction_evicts_least_recently_used_idle_model():
+    async def main():
+        scheduler, unloaded = make_scheduler(), []
+        for model in ("a", "b"):
+            release = asyncio.Event()
+            release.set()
+            await hold(scheduler, model, release, unloaded)
+            await asyncio.sleep(0.01)
+
+        # 再次使用a后，b成为最久未使用的模型
+        release = asyncio.Event()
+        release.set()
+        await hold(scheduler, "a", release, unloaded)
+        await hold(scheduler, "c", release, unloaded)
+
+        assert unloaded == ["b"]
+        assert set(scheduler.stats()["resident"]) == {"a", "c"}
+
+    asyncio.run(main())
+
+
+def test_resident_model_without_unload_is_never_evicted():
+    async def main():
+        scheduler, unloaded = make_scheduler(), []
+        scheduler.register_resident("asr", footprint_mb=600)
+        release = asyncio.Event()
+        release.set()
+        await hold(scheduler, "a", release, unloaded)
+        await hold(scheduler, "b", release, unloaded)
+
+        assert unloaded == ["a"]
+        assert set(scheduler.stats()["resident"]) == {"asr", "b"}
+
+    asyncio.run(main())
+
+
+def test_idle_ttl_unloads_idle_model():
+    async def main():
+        scheduler, unloaded = make_scheduler(idle_ttl=0.05), []
+        release = asyncio.Event()
+        release.set()
+        await hold(scheduler, "a", release, unloaded)
+        assert "a" in scheduler.stats()["resident"]
+
+        await wait_until(lambda: unloaded == ["a"])
+        assert scheduler.stats()["resident"] == {}
+        assert scheduler.used_mb == 0
+
+    asyncio.run(main())
+
+
+def test_idle_ttl_timer_is_cancelled_when_model_is_reused():
+    async def main():
+        scheduler, unloaded = make_scheduler(idle_ttl=0.05), []
+        release = asyncio.Event()
+        release.set()
+        await hold(scheduler, "a", release, unloaded)
+
+        busy = asyncio.Event()
+        task = asyncio.create_task(hold(scheduler, "a", busy, unloaded))
+        await asyncio.sleep(0.1)
+        assert unloaded == []  # 运行中的模型不会因空闲超时被驱逐
+        busy.set()
+        await task
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_queue_without_leaking_memory():
+    async def main():
+        scheduler, unloaded = make_scheduler(), []
+        release_a = asyncio.Event()
+        a = asyncio.create_task(hold(scheduler, "a", release_a, unloaded, footprint_mb=800))
+        await wait_until(lambda: scheduler.stats()["running"] == 1)
+
+        waiting = asyncio.create_task(hold(scheduler, "b", asyncio.Event(), unloaded))
+        await wait_until(lambda: scheduler.queue_depth == 1)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.queue_depth == 0
+
+        release_a.set()
+        await a
+        stats = scheduler.stats()
+        assert stats["running"] == 0
+        assert stats["used_mb"] == 800
+        assert set(stats["resident"]) == {"a"}
+        assert unloaded == []
+
+        # 后续任务照常准入
+        release = asyncio.Event()
+        release.set()
+        await hold(scheduler, "c", release, unloaded)
+        assert unloaded == ["a"]
+
+    asyncio.run(main())
+
+
+def test_queue_timeout_raises_gpu_memory_error():
+    async def main():
+        scheduler, unloaded = make_scheduler(queue_timeout=0.05), []
+        release_a = asyncio.Event()
+        a = asyncio.create_task(hold(scheduler, "a", release_a, unloaded, footprint_mb=800))
+        await wait_until(lambda: scheduler.stats()["running"] == 1)
+
+        with pytest.raises(GPUMemoryError):
+            await hold(scheduler, "b", asyncio.Event(), unloaded)
+        assert scheduler.queue_depth == 0
+
+        release_a.set()
+        await a
+
+    asyncio.run(main())
+
+
+def test_disabled_scheduler_does_not_track_jobs():
+    async def main():
+        scheduler = GPUScheduler()
+        async with scheduler.job("a", footprint_mb=10 ** 6):
+            assert scheduler.used_mb == 0
+
+    asyncio.run(main())
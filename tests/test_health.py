@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+服务健康监测与熔断测试（不发起探测请求）
+
+运行：python -m pytest tests/test_health.py
+"""
+import pytest
+
+from agent_workflow.core import health as health_module
+from agent_workflow.core.health import BackendUnavailableError, BreakerState, HealthMonitor
+from agent_workflow.tools.tool.weather_tool import WeatherTool
+
+
+def make_monitor(tools, backends=("gaode",), failure_threshold: int = 3) -> HealthMonitor:
+    return HealthMonitor(tools=tools, backends={name: {"url": None} for name in backends},
+                         failure_threshold=failure_threshold, recovery_timeout=30)
+
+
+class FakeClock:
+    """可手动推进的单调时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(health_module, "time", fake)
+    return fake
+
+
+def test_breaker_opens_after_consecutive_backend_errors():
+    monitor = make_monitor({"WeatherTool": WeatherTool})
+    breaker = monitor.breakers["gaode"]
+    for _ in range(2):
+        monitor.record_failure("WeatherTool", ConnectionError("Connection refused"))
+    assert breaker.state == BreakerState.CLOSED
+    monitor.check("WeatherTool")
+
+    # 参数错误等非后端异常不计入
+    monitor.record_failure("WeatherTool", ValueError("缺少参数"))
+    assert breaker.state == BreakerState.CLOSED
+
+    monitor.record_failure("WeatherTool", TimeoutError())
+    assert breaker.state == BreakerState.OPEN
+    with pytest.raises(BackendUnavailableError):
+        monitor.check("WeatherTool")
+
+
+def test_open_breaker_half_opens_after_recovery_timeout(clock):
+    monitor = make_monitor({"WeatherTool": WeatherTool})
+    breaker = monitor.breakers["gaode"]
+    breaker.trip("Connection refused")
+
+    clock.now += 29
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow_request()
+    # 熔断前发出、熔断后才返回的成功请求不关闭熔断
+    monitor.record_success("WeatherTool")
+    assert breaker.state == BreakerState.OPEN
+
+    clock.now += 1
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.allow_request()
+    assert monitor.unavailable_tools() == []
+
+
+def test_half_open_failure_reopens_immediately(clock):
+    monitor = make_monitor({"WeatherTool": WeatherTool}, failure_threshold=3)
+    breaker = monitor.breakers["gaode"]
+    breaker.trip("Connection refused")
+    clock.now += 30
+
+    # 试探请求失败一次即重新熔断，并重新计算恢复时间
+    monitor.record_failure("WeatherTool", ConnectionError("Connection refused"))
+    assert breaker.state == BreakerState.OPEN
+    clock.now += 29
+    assert breaker.state == BreakerState.OPEN
+    clock.now += 1
+    assert breaker.state == BreakerState.HALF_OPEN
+
+
+def test_half_open_success_closes(clock):
+    monitor = make_monitor({"WeatherTool": WeatherTool})
+    breaker = monitor.breakers["gaode"]
+    breaker.trip("Connection refused")
+    clock.now += 30
+
+    monitor.record_result("WeatherTool", "====\n北京天气信息\n====")
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.failures == 0
+    assert breaker.last_error is None
+
+
+@pytest.mark.parametrize("result", [
+    "未找到火星市的区域编码",
+    "错误：未提供位置参数",
+])
+def test_input_errors_do_not_open_breaker(result):
+    monitor = make_monitor({"WeatherTool": WeatherTool})
+    for _ in range(5):
+        monitor.record_result("WeatherTool", result)
+    assert monitor.unavailable_tools() == []
+
+
+@pytest.mark.parametrize("result", [
+    "天气查询失败：ConnectError: [Errno 111] Connection refused",
+    "获取天气信息失败",
+])
+def test_backend_failure_results_open_breaker(result):
+    monitor = make_monitor({"WeatherTool": WeatherTool})
+    for _ in range(3):
+        monitor.record_result("WeatherTool", result)
+    assert monitor.unavailable_tools() == ["WeatherTool"]
+    assert not WeatherTool.is_result_reusable(result)
+
+
+def test_success_result_resets_failure_count():
+    monitor = make_monitor({"WeatherTool": WeatherTool})
+    monitor.record_result("WeatherTool", "获取天气信息失败")
+    monitor.record_result("WeatherTool", "获取天气信息失败")
+    monitor.record_result("WeatherTool", "====\n北京天气信息\n====")
+    monitor.record_result("WeatherTool", "获取天气信息失败")
+    assert monitor.unavailable_tools() == []
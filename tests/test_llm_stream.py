@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+异步流式对话测试：客户端复用、流式响应在取消时关闭（使用模拟的HTTP传输，不连接模型服务）
+
+运行：python -m pytest tests/test_llm_stream.py
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from agent_workflow.llm import LLM, close_async_llm_instances, get_async_llm_instance
+from agent_workflow.llm import llm as llm_module
+from agent_workflow.tools.tool.base import StreamingResult
+
+
+class EndlessSSE(httpx.AsyncByteStream):
+    """先返回两段增量文本，之后一直等待（模拟生成中的长回答），记录是否被关闭"""
+
+    def __init__(self):
+        self.closed = False
+
+    async def __aiter__(self):
+        for text in ("你", "好"):
+            chunk = {"id": "1", "object": "chat.completion.chunk", "created": 0, "model": "m",
+                     "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+        await asyncio.Event().wait()
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def sse_client(monkeypatch):
+    stream = EndlessSSE()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=stream)
+
+    client = AsyncOpenAI(base_url="http://llm.test/v1", api_key="test",
+                         http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm_module, "get_async_llm_instance", lambda model, key: (client, model, key))
+    return stream
+
+
+def test_stream_is_closed_when_cancelled_mid_stream(sse_client):
+    received = []
+
+    async def consume():
+        async for chunk in LLM.__new__(LLM).astream_chat("系统提示", "你好"):
+            received.append(chunk)
+
+    async def main():
+        task = asyncio.create_task(consume())
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # 取消后立即关闭，而不是等事件循环结束时才回收
+        assert sse_client.closed
+
+    asyncio.run(main())
+    assert received == ["你", "好"]
+
+
+def test_stream_is_closed_when_consumer_stops_early(sse_client):
+    async def main():
+        stream = LLM.__new__(LLM).astream_chat("系统提示", "你好")
+        assert await stream.__anext__() == "你"
+        await stream.aclose()
+        assert sse_client.closed
+
+    asyncio.run(main())
+
+
+def test_streaming_result_aclose_closes_llm_stream(sse_client):
+    async def main():
+        result = StreamingResult(LLM.__new__(LLM).astream_chat("系统提示", "你好"))
+        async for chunk in result:
+            break
+        # 执行器中途停止消费（如请求取消）时显式关闭
+        await result.aclose()
+        assert sse_client.closed
+        assert result.text == "你"
+
+    asyncio.run(main())
+
+
+def test_async_client_is_reused_within_event_loop():
+    async def main():
+        first, _, _ = get_async_llm_instance("qwen2.5", "none")
+        second, _, _ = get_async_llm_instance("qwen2.5", "none")
+        assert first is second
+        await close_async_llm_instances()
+        third, _, _ = get_async_llm_instance("qwen2.5", "none")
+        assert third is not first
+        await close_async_llm_instances()
+
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+任务规划缓存测试
+
+运行：python -m pytest tests/test_plan_cache.py
+"""
+import asyncio
+
+import pytest
+
+from agent_workflow.core import plan_cache as plan_cache_module
+from agent_workflow.core.context import RequestContext
+from agent_workflow.core.health import HealthMonitor
+from agent_workflow.core.plan_cache import PlanCache
+from agent_workflow.core.tool_executor import ParameterOptimizer, ToolExecutor, ToolIntentParser
+from agent_workflow.tools.tool.chat_tool import ChatTool
+from agent_workflow.tools.tool.weather_tool import WeatherTool
+
+
+class EchoChatTool(ChatTool):
+    """与ChatTool描述相同，但不调用LLM的聊天工具"""
+
+    async def run(self, **kwargs) -> str:
+        return f"回复: {kwargs['message']}"
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(plan_cache_module, "time", fake)
+    return fake
+
+
+def make_plan(tool_name: str) -> dict:
+    return {"tasks": [{"id": "task_1", "tool_name": tool_name, "order": 1, "depends_on": []}],
+            "execution_mode": "串行"}
+
+
+TOOLS = ["ChatTool", "WeatherTool"]
+
+
+def test_equivalent_queries_share_entry(tmp_path):
+    cache = PlanCache(path=str(tmp_path / "plan_cache.json"))
+
+    async def main():
+        await cache.put("今天北京天气", TOOLS, make_plan("WeatherTool"))
+        assert await cache.get("  今天北京天气？", TOOLS) == make_plan("WeatherTool")
+
+    asyncio.run(main())
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    path = str(tmp_path / "plan_cache.json")
+    cache = PlanCache(path=path, ttl=60)
+
+    async def main():
+        await cache.put("你好", TOOLS, make_plan("ChatTool"))
+        clock.now += 59
+        assert await cache.get("你好", TOOLS) is not None
+        clock.now += 2
+        assert await cache.get("你好", TOOLS) is None
+        assert len(cache) == 0
+
+    asyncio.run(main())
+    # 重新加载时丢弃磁盘上的过期条目
+    assert len(PlanCache(path=path, ttl=60)) == 0
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    cache = PlanCache(path=str(tmp_path / "plan_cache.json"), max_entries=2)
+
+    async def main():
+        await cache.put("问题一", TOOLS, make_plan("ChatTool"))
+        await cache.put("问题二", TOOLS, make_plan("ChatTool"))
+        # 命中后移到最近使用
+        assert await cache.get("问题一", TOOLS) is not None
+        await cache.put("问题三", TOOLS, make_plan("ChatTool"))
+        assert await cache.get("问题二", TOOLS) is None
+        assert await cache.get("问题一", TOOLS) is not None
+        assert await cache.get("问题三", TOOLS) is not None
+
+    asyncio.run(main())
+
+
+def test_tool_set_change_invalidates_entries(tmp_path):
+    path = str(tmp_path / "plan_cache.json")
+    cache = PlanCache(path=path)
+
+    async def main():
+        await cache.put("画一只猫", TOOLS, make_plan("ChatTool"))
+        # 工具顺序不影响签名，新增或移除工具后不再命中
+        assert await cache.get("画一只猫", list(reversed(TOOLS))) is not None
+        assert await cache.get("画一只猫", TOOLS + ["ImageGeneratorTool"]) is None
+        assert await cache.get("画一只猫", ["ChatTool"]) is None
+        # 持久化后依然按签名匹配
+        reloaded = PlanCache(path=path)
+        assert await reloaded.get("画一只猫", TOOLS) is not None
+        assert await reloaded.get("画一只猫", TOOLS + ["ImageGeneratorTool"]) is None
+
+    asyncio.run(main())
+
+
+def test_history_is_part_of_key(tmp_path):
+    cache = PlanCache(path=str(tmp_path / "plan_cache.json"), history_turns=2)
+    history = [{"role": "user", "content": "北京天气"}]
+
+    async def main():
+        await cache.put("再详细一点", TOOLS, make_plan("WeatherTool"), history=history)
+        assert await cache.get("再详细一点", TOOLS, history=history) is not None
+        assert await cache.get("再详细一点", TOOLS) is None
+        assert await cache.get("再详细一点", TOOLS, history=[{"role": "user", "content": "写首诗"}]) is None
+
+    asyncio.run(main())
+
+
+def test_degraded_plan_is_not_replayed_after_backend_recovers(tmp_path, monkeypatch):
+    tools = {"ChatTool": EchoChatTool, "WeatherTool": WeatherTool}
+    executor = ToolExecutor(tools=tools)
+    executor.router = None
+    executor.result_cache = None
+    executor.plan_cache = PlanCache(path=str(tmp_path / "plan_cache.json"))
+    executor.health = HealthMonitor(tools=tools, backends={"gaode": {"url": None}}, failure_threshold=1)
+    executor.intent_parser.health_monitor = executor.health
+
+    planned_with = []
+
+    async def parse_intent(self, query, history, verbose, fused=False, tool_names=None, ctx=None):
+        unavailable = set(self.health_monitor.unavailable_tools())
+        planned_with.append(sorted(name for name in tools if name not in unavailable))
+        return {
+            "tasks": [{"id": "task_1", "tool_name": "ChatTool", "reason": "", "order": 1, "depends_on": [],
+                       "parameters": {"message": "北京天气", "context": []}}],
+            "execution_mode": "串行",
+            "execution_strategy": {"parallel_groups": [], "reason": ""}
+        }
+
+    async def optimize_parameters(self, tool_name, *args, **kwargs):
+        # 命中缓存的规划不含参数，由参数优化器生成
+        yield {"type": "result", "content": {tool_name: {"message": "北京天气", "context": []}}}
+
+    monkeypatch.setattr(ToolIntentParser, "parse_intent", parse_intent)
+    monkeypatch.setattr(ParameterOptimizer, "optimize_parameters", optimize_parameters)
+
+    async def run():
+        return [event async for event in executor.execute_tools("北京今天适合出门吗", history=[], chat_ui=False,
+                                                                ctx=RequestContext.create())]
+
+    # 熔断期间生成的规划不含WeatherTool
+    executor.health.breakers["gaode"].trip("Connection refused")
+    asyncio.run(run())
+    asyncio.run(run())
+    assert planned_with == [["ChatTool"]]
+
+    # 服务恢复后重新规划，而不是重放降级规划
+    executor.health.breakers["gaode"].record_success()
+    asyncio.run(run())
+    assert planned_with == [["ChatTool"], ["ChatTool", "WeatherTool"]]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+工具结果缓存测试：缓存键、bypass_params、LRU淘汰（参数优化器被替换，不调用LLM）
+
+运行：python -m pytest tests/test_result_cache.py
+"""
+import asyncio
+
+import pytest
+
+from agent_workflow.core.context import RequestContext
+from agent_workflow.core.result_cache import ToolResultCache
+from agent_workflow.core.tool_executor import ParameterOptimizer, ToolExecutor
+from agent_workflow.tools.tool.base import ToolCachePolicy
+from agent_workflow.tools.tool.chat_tool import ChatTool
+
+
+class DocumentTool(ChatTool):
+    """读取本地文件或远程URL的工具，记录实际执行次数"""
+    cache_policy = ToolCachePolicy(ttl=600, max_entries=8, file_params=("file",), bypass_params=("url",))
+    calls = 0
+
+    async def run(self, **kwargs) -> str:
+        DocumentTool.calls += 1
+        return f"第{DocumentTool.calls}次读取"
+
+
+@pytest.fixture
+def run_tool(tmp_path, monkeypatch):
+    monkeypatch.setattr(DocumentTool, "calls", 0)
+    parameters = {}
+
+    async def optimize_parameters(self, tool_name, *args, **kwargs):
+        yield {"type": "result", "content": {tool_name: dict(parameters)}}
+
+    monkeypatch.setattr(ParameterOptimizer, "optimize_parameters", optimize_parameters)
+
+    executor = ToolExecutor(tools={"DocumentTool": DocumentTool})
+    executor.health = None
+    executor.result_cache = ToolResultCache(cache_dir=str(tmp_path / "tool_cache"))
+    task = {"id": "task_1", "tool_name": "DocumentTool", "reason": "", "order": 1, "depends_on": []}
+
+    def run(**params):
+        parameters.clear()
+        parameters.update(params)
+
+        async def main():
+            return [event async for event in executor._execute_single_tool(
+                task, {}, False, "读取文档", [], {"tasks": [task]}, False, RequestContext.create())]
+
+        events = asyncio.run(main())
+        return events[-1]["result"]["result"]
+
+    return run
+
+
+def test_same_parameters_hit_cache(run_tool):
+    assert run_tool(file="", message=" 总结 ") == "第1次读取"
+    # 参数规范化后相同（去除首尾空白、None值）
+    assert run_tool(file="", message="总结", url=None) == "第1次读取"
+    assert DocumentTool.calls == 1
+
+
+def test_bypass_params_skip_cache(run_tool):
+    assert run_tool(url="https://example.com/a.pdf", message="总结") == "第1次读取"
+    # 远程URL内容可能变化，既不命中也不写入缓存
+    assert run_tool(url="https://example.com/a.pdf", message="总结") == "第2次读取"
+    assert run_tool(url="", message="总结") == "第3次读取"
+    assert run_tool(url="", message="总结") == "第3次读取"
+    assert DocumentTool.calls == 3
+
+
+def test_file_content_change_invalidates_key(run_tool, tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_text("第一版", encoding="utf-8")
+    assert run_tool(file=str(path)) == "第1次读取"
+    assert run_tool(file=str(path)) == "第1次读取"
+    path.write_text("第二版，内容更长", encoding="utf-8")
+    assert run_tool(file=str(path)) == "第2次读取"
+
+
+def test_partition_evicts_least_recently_used(tmp_path):
+    cache = ToolResultCache(cache_dir=str(tmp_path))
+    policy = ToolCachePolicy(max_entries=2)
+
+    async def main():
+        keys = [await cache.make_key("DocumentTool", policy, {"message": str(i)}) for i in range(3)]
+        await cache.put("DocumentTool", policy, keys[0], "0")
+        await cache.put("DocumentTool", policy, keys[1], "1")
+        assert await cache.get("DocumentTool", policy, keys[0], lambda result: True) == (True, "0")
+        await cache.put("DocumentTool", policy, keys[2], "2")
+        assert (await cache.get("DocumentTool", policy, keys[1], lambda result: True))[0] is False
+        assert (await cache.get("DocumentTool", policy, keys[0], lambda result: True))[0] is True
+
+    asyncio.run(main())
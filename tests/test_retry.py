@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+重试策略与请求级重试预算测试
+
+运行：python -m pytest tests/test_retry.py
+"""
+import asyncio
+import dataclasses
+
+import pytest
+
+from agent_workflow.core.context import RequestContext
+from agent_workflow.core.tool_executor import ParameterOptimizer, ToolExecutor
+from agent_workflow.tools.tool.chat_tool import ChatTool
+from agent_workflow.utils.metrics import metrics
+from agent_workflow.utils.retry import RetryBudget, RetryPolicy, plan_retry
+
+# 不抖动、不等待，便于断言
+NO_WAIT = RetryPolicy(max_attempts=10, base_delay=0, jitter=False)
+
+
+def test_budget_limits_retries_across_layers():
+    budget = RetryBudget(max_retries=3, max_total_delay=100)
+    exhausted = metrics.get_counter("retry.budget_exhausted")
+
+    # 不同层共享同一个预算
+    assert plan_retry(NO_WAIT, 1, ConnectionError(), budget, name="tool") == 0
+    assert plan_retry(NO_WAIT, 1, ConnectionError(), budget, name="optimizer") == 0
+    assert plan_retry(NO_WAIT, 2, ConnectionError(), budget, name="tool") == 0
+    assert budget.exhausted
+    assert plan_retry(NO_WAIT, 1, ConnectionError(), budget, name="tts") is None
+    assert budget.retries == 3
+    assert metrics.get_counter("retry.budget_exhausted") == exhausted + 1
+
+
+def test_budget_limits_total_backoff():
+    policy = RetryPolicy(max_attempts=10, base_delay=1, multiplier=1, jitter=False)
+    budget = RetryBudget(max_retries=10, max_total_delay=2.5)
+
+    assert plan_retry(policy, 1, None, budget) == 1
+    assert plan_retry(policy, 2, None, budget) == 1
+    # 再退避1秒会超出总时长
+    assert plan_retry(policy, 3, None, budget) is None
+    assert budget.total_delay == 2
+
+
+@pytest.mark.parametrize("attempt, error", [
+    (10, ConnectionError()),           # 已达最大尝试次数
+    (1, FileNotFoundError()),          # 不可重试的异常
+])
+def test_refused_retry_does_not_spend_budget(attempt, error):
+    budget = RetryBudget(max_retries=1, max_total_delay=100)
+    assert plan_retry(NO_WAIT, attempt, error, budget) is None
+    assert budget.retries == 0
+
+
+def test_deadline_stops_retry_before_budget():
+    policy = RetryPolicy(max_attempts=3, base_delay=5, jitter=False)
+    budget = RetryBudget(max_retries=3, max_total_delay=100)
+    assert plan_retry(policy, 1, None, budget, remaining=1) is None
+    assert budget.retries == 0
+
+
+class FlakyTool(ChatTool):
+    """总是连接失败的工具，记录调用次数"""
+    calls = 0
+
+    async def run(self, **kwargs) -> str:
+        FlakyTool.calls += 1
+        raise ConnectionError("Connection refused")
+
+
+def test_tool_stops_retrying_when_request_budget_is_exhausted(monkeypatch):
+    monkeypatch.setattr(FlakyTool, "calls", 0)
+    monkeypatch.setattr(RetryPolicy, "named", classmethod(lambda cls, name: NO_WAIT))
+
+    async def optimize_parameters(self, tool_name, *args, **kwargs):
+        yield {"type": "result", "content": {tool_name: {"message": "你好", "context": []}}}
+
+    monkeypatch.setattr(ParameterOptimizer, "optimize_parameters", optimize_parameters)
+
+    executor = ToolExecutor(tools={"FlakyTool": FlakyTool})
+    executor.health = None
+    executor.result_cache = None
+    ctx = dataclasses.replace(RequestContext.create(), retry_budget=RetryBudget(max_retries=2, max_total_delay=100))
+    task = {"id": "task_1", "tool_name": "FlakyTool", "reason": "", "order": 1, "depends_on": []}
+    intent_result = {"tasks": [task]}
+
+    async def main():
+        async for _ in executor._execute_single_tool(task, {}, False, "你好", [], intent_result, False, ctx):
+            pass
+
+    with pytest.raises(Exception, match="已尝试 3 次"):
+        asyncio.run(main())
+    # 策略允许10次，预算只允许重试2次
+    assert FlakyTool.calls == 3
+    assert ctx.retry_budget.exhausted
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+意图快速路由测试：规则命中时生成可直接执行的参数，整个请求不调用LLM
+
+运行：python -m pytest tests/test_router.py
+"""
+import asyncio
+
+import pytest
+from langchain_ollama import ChatOllama
+
+from agent_workflow.core.context import RequestContext
+from agent_workflow.core.router import IntentRouter
+from agent_workflow.core.tool_descriptions import ToolDescriptionCache
+from agent_workflow.core.tool_executor import ToolExecutor
+from agent_workflow.tools.tool.chat_tool import ChatTool
+from agent_workflow.utils.metrics import metrics
+
+
+class EchoChatTool(ChatTool):
+    """与ChatTool描述相同，但不调用LLM的聊天工具"""
+
+    async def run(self, **kwargs) -> str:
+        return f"回复: {kwargs['message']}"
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """统计ChatOllama的调用次数（任务规划和参数优化都经过它）"""
+    calls = []
+
+    async def ainvoke(self, *args, **kwargs):
+        calls.append(("ainvoke", args, kwargs))
+        raise AssertionError("快速路由命中时不应调用LLM")
+
+    async def astream(self, *args, **kwargs):
+        calls.append(("astream", args, kwargs))
+        raise AssertionError("快速路由命中时不应调用LLM")
+        yield
+
+    monkeypatch.setattr(ChatOllama, "ainvoke", ainvoke)
+    monkeypatch.setattr(ChatOllama, "astream", astream)
+    return calls
+
+
+def make_router(rules=None) -> IntentRouter:
+    tools = {"ChatTool": EchoChatTool}
+    return IntentRouter(tools, ToolDescriptionCache(tools), rules=rules)
+
+
+def test_rule_hit_fills_required_parameters_from_description_defaults():
+    router = make_router(rules=[{"tool_name": "ChatTool", "patterns": [r"^你好$"],
+                                 "parameters": {"message": "{query}"}}])
+    route = asyncio.run(router.route("你好"))
+
+    assert route is not None and route.source == "rule"
+    assert route.parameters == {"message": "你好", "context": []}
+    task = route.to_plan()["tasks"][0]
+    assert task["routed"] is True
+
+
+def test_rule_miss_returns_none():
+    router = make_router()
+    assert asyncio.run(router.route("帮我写一份关于新能源汽车的市场分析报告")) is None
+
+
+def test_greeting_is_answered_without_llm_calls(llm_calls):
+    executor = ToolExecutor(tools={"ChatTool": EchoChatTool})
+    executor.plan_cache = None
+    executor.result_cache = None
+    executor.health = None
+    assert executor.router is not None
+
+    used_before = metrics.get_counter("router.parameters_used")
+    fused_before = metrics.get_counter("planner.fused_parameters_fallback")
+
+    async def run():
+        return [event async for event in executor.execute_tools("你好", history=[], chat_ui=False,
+                                                                ctx=RequestContext.create())]
+
+    events = asyncio.run(run())
+
+    assert llm_calls == []
+    assert any(event.get("status") == "success" for event in events), events
+    assert metrics.get_counter("router.parameters_used") == used_before + 1
+    assert metrics.get_counter("planner.fused_parameters_fallback") == fused_before
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+并行执行（DAG调度）测试：依赖顺序、失败向下游传递（参数优化器被替换，不调用LLM）
+
+运行：python -m pytest tests/test_tool_executor.py
+"""
+import asyncio
+import dataclasses
+
+import pytest
+
+from agent_workflow.core.context import RequestContext
+from agent_workflow.core.tool_executor import ParameterOptimizer, ToolExecutor
+from agent_workflow.tools.tool.chat_tool import ChatTool
+from agent_workflow.utils.retry import RetryBudget
+
+
+class RecordingTool(ChatTool):
+    """记录开始、结束顺序的工具，message为任务名"""
+    log: list = []
+
+    async def run(self, message: str, **kwargs) -> str:
+        self.log.append(("start", message))
+        await asyncio.sleep(0.05)
+        self.log.append(("end", message))
+        return f"{message} 完成"
+
+
+class BrokenTool(ChatTool):
+    """后端服务不可用的工具"""
+
+    async def run(self, message: str, **kwargs) -> str:
+        RecordingTool.log.append(("start", message))
+        raise ConnectionError("Connection refused")
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setattr(RecordingTool, "log", [])
+
+    async def optimize_parameters(self, tool_name, *args, **kwargs):
+        yield {"type": "result", "content": {tool_name: {"message": tool_name, "context": []}}}
+
+    monkeypatch.setattr(ParameterOptimizer, "optimize_parameters", optimize_parameters)
+
+    tools = {"Fetch1": RecordingTool, "Fetch2": RecordingTool, "Merge": RecordingTool, "Broken": BrokenTool}
+    executor = ToolExecutor(tools=tools)
+    executor.health = None
+    executor.result_cache = None
+    return executor
+
+
+def make_plan(*tasks):
+    return {
+        "tasks": [{"id": task_id, "tool_name": tool_name, "reason": "", "order": order, "depends_on": list(deps)}
+                  for order, (task_id, tool_name, deps) in enumerate(tasks, start=1)],
+        "execution_mode": "并行",
+        "execution_strategy": {"parallel_groups": [], "reason": ""}
+    }
+
+
+def run_plan(executor, plan):
+    # 不重试，失败立即向下游传递
+    ctx = dataclasses.replace(RequestContext.create(), retry_budget=RetryBudget(max_retries=0))
+
+    async def main():
+        return [event async for event in executor.parallel_execute_tools(plan, "查询", [], False, ctx)]
+
+    return asyncio.run(main())
+
+
+def test_independent_tasks_run_concurrently_and_dependents_wait(executor):
+    plan = make_plan(("task_1", "Fetch1", ()), ("task_2", "Fetch2", ()), ("task_3", "Merge", ("task_1", "task_2")))
+    events = run_plan(executor, plan)
+
+    log = RecordingTool.log
+    # 互不依赖的任务都在任一任务结束前开始
+    assert {item for item in log[:2]} == {("start", "Fetch1"), ("start", "Fetch2")}
+    # 下游任务在所有依赖完成后才开始
+    assert log.index(("start", "Merge")) > max(log.index(("end", "Fetch1")), log.index(("end", "Fetch2")))
+
+    final = events[-1]
+    assert final["status"] == "success"
+    assert list(final["result"]) == ["task_1", "task_2", "task_3"]
+    assert "failed" not in final
+
+
+def test_cyclic_plan_falls_back_to_serial(executor):
+    plan = make_plan(("task_1", "Fetch1", ("task_2",)), ("task_2", "Fetch2", ("task_1",)))
+    assert executor._topological_order(plan["tasks"]) is None
+
+
+def test_failure_skips_dependents_and_fails_final_task(executor):
+    plan = make_plan(("task_1", "Broken", ()), ("task_2", "Fetch2", ()), ("task_3", "Merge", ("task_1", "task_2")))
+    events = run_plan(executor, plan)
+
+    # 依赖失败的任务不执行，独立任务照常完成
+    started = [name for kind, name in RecordingTool.log if kind == "start"]
+    assert "Merge" not in started
+    assert "Fetch2" in started
+    assert any("task_3" in event.get("error", "") for event in events if event.get("type") == "thinking_process")
+
+    final = events[-1]
+    assert final["error"].startswith("执行失败: 任务 task_3")
+    assert "task_1" in final["error"]
+
+
+def test_intermediate_failure_is_reported_with_final_result(executor):
+    plan = make_plan(("task_1", "Broken", ()), ("task_2", "Fetch2", ()), ("task_3", "Merge", ("task_2",)))
+    events = run_plan(executor, plan)
+
+    final = events[-1]
+    assert final["status"] == "success"
+    assert list(final["result"]) == ["task_2", "task_3"]
+    assert list(final["failed"]) == ["task_1"]
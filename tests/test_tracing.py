@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@author: [PanXingFeng]
+@contact: [1115005803@qq.com、canomiguelittle@gmail.com]
+@date: 2025-1-11
+@version: 2.0.0
+@license: MIT License
+Copyright (c) 2024 [PanXingFeng]
+All rights reserved.
+
+链路追踪JSONL导出测试：文件大小上限与轮转
+
+运行：python -m pytest tests/test_tracing.py
+"""
+import json
+import time
+
+from agent_workflow.utils.tracing import JsonlExporter, Span
+
+
+def make_spans(count: int) -> list:
+    return [Span(trace_id="t" * 32, span_id=f"{i:016x}", parent_id=None, name="tool.run",
+                 start_time=time.time(), attributes={"tool": "ChatTool"}, duration=0.1)
+            for i in range(count)]
+
+
+def test_file_rotates_at_size_cap(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlExporter(str(path), max_bytes=2000, backup_count=2)
+    for _ in range(20):
+        exporter._write([{**span.to_dict(), "message_id": "m1"} for span in make_spans(5)])
+
+    files = sorted(tmp_path.iterdir())
+    assert [item.name for item in files] == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    for item in files:
+        assert item.stat().st_size <= 2000
+        # 轮转只发生在行之间，每行都是完整的记录
+        for line in item.read_text(encoding="utf-8").splitlines():
+            assert json.loads(line)["message_id"] == "m1"
+
+
+def test_export_writes_in_background(tmp_path):
+    path = tmp_path / "logs" / "traces.jsonl"
+    exporter = JsonlExporter(str(path))
+    exporter.export(make_spans(3), "m2")
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not (path.exists() and len(path.read_text(encoding="utf-8").splitlines()) == 3):
+        time.sleep(0.01)
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [record["message_id"] for record in records] == ["m2"] * 3